@@ -0,0 +1,47 @@
+from fastapi import Depends, Request
+
+from app.clients import GoogleClientRegistry, FeedbackMirror, SheetPartitions
+from app.constant import AppStatus
+from app.core import error_exception_handler, settings
+from app.core.deadline import deadline
+from app.services import FeedbackService, FeedbackQueue, IdempotencyCache, ImagePreprocessor
+
+
+def get_google_clients(request: Request) -> GoogleClientRegistry:
+    return request.app.state.google_clients
+
+
+def get_image_preprocessor(request: Request) -> ImagePreprocessor | None:
+    return getattr(request.app.state, "image_preprocessor", None)
+
+
+def get_feedback_service(clients: GoogleClientRegistry = Depends(get_google_clients),
+                         image_preprocessor: ImagePreprocessor | None = Depends(get_image_preprocessor)
+                         ) -> FeedbackService:
+    return FeedbackService(clients=clients, image_preprocessor=image_preprocessor)
+
+
+def get_feedback_queue(request: Request) -> FeedbackQueue | None:
+    return getattr(request.app.state, "feedback_queue", None)
+
+
+def get_idempotency_cache(request: Request) -> IdempotencyCache:
+    return request.app.state.idempotency_cache
+
+
+def get_feedback_mirror(clients: GoogleClientRegistry = Depends(get_google_clients)) -> FeedbackMirror:
+    if clients.feedback_mirror is None:
+        raise error_exception_handler(app_status=AppStatus.ERROR_404_NOT_FOUND,
+                                      description="FEEDBACK_MIRROR_ENABLED is off")
+    return clients.feedback_mirror
+
+
+def get_sheet_partitions(clients: GoogleClientRegistry = Depends(get_google_clients)) -> SheetPartitions:
+    return clients.sheet_partitions
+
+
+async def google_request_budget(request: Request):
+    """Bound the Google calls a submission makes to GOOGLE_REQUEST_BUDGET (GOOGLE_UPLOAD_REQUEST_BUDGET with files)."""
+    multipart = request.headers.get("content-type", "").startswith("multipart/")
+    with deadline(settings.GOOGLE_UPLOAD_REQUEST_BUDGET if multipart else settings.GOOGLE_REQUEST_BUDGET):
+        yield
@@ -1 +1,3 @@
-from .feedback_endponts import router as feedback_routes
\ No newline at end of file
+from .feedback_endponts import router as feedback_routes
+from .health_endpoints import router as health_routes
+from .metrics_endpoints import router as metrics_routes
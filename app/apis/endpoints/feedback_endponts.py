@@ -1,22 +1,95 @@
+import json
 import logging
+import tempfile
+from datetime import datetime
 
-from fastapi import APIRouter, Form,UploadFile, File
+from fastapi import APIRouter, Depends, Form, Header, Query, Request, UploadFile, File
+from fastapi.responses import StreamingResponse
+from starlette import status
+from starlette.background import BackgroundTask
 
-from app.constant import UrgencyLevelEnum
+from app.apis.dependencies import (get_feedback_service, get_feedback_queue, get_idempotency_cache, get_feedback_mirror,
+                                   get_sheet_partitions, google_request_budget)
+from app.clients import FeedbackMirror, SheetPartitions
+from app.constant import AppStatus, FeedbackTypeEnum, UrgencyLevelEnum
+from app.core import FastJSONResponse, encode_response_object, error_exception_handler, settings
 from app.core.exceptions import make_response_object
+from app.core.timing import TimedRoute, span
 from app.schemas.feedback_schemas import ConsultationCreate, WarrantyCreate, ComplaintCreate
-from app.services import FeedbackService
+from app.schemas.upload_schemas import FileUploadResult
+from app.services import FeedbackService, FeedbackQueue, IdempotencyCache, make_idempotency_key, payload_digest
+from app.utils import iter_ndjson_lines
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 logger = logging.getLogger(__name__)
 
-@router.post("/consultation")
-async def create_consultation(feedback_data: ConsultationCreate):
-    feedback_service = FeedbackService()
-    await feedback_service.create_consultation(feedback_data=feedback_data)
-    return make_response_object(data="Gửi phản hồi tư vấn dịch vụ thành công")
 
-@router.post("/warranty")
+async def submit_feedback(feedback_service: FeedbackService, feedback_queue: FeedbackQueue | None,
+                          idempotency_cache: IdempotencyCache, idempotency_key: str | None, kind: FeedbackTypeEnum,
+                          message: str, feedback_data, files: list[UploadFile] = None) -> FastJSONResponse:
+    # Bodies are stored encoded, so replaying one costs no serialization
+    async def handle():
+        # Without FEEDBACK_QUEUE_ENABLED the queue only takes submissions a circuit breaker would refuse
+        if feedback_queue and (settings.FEEDBACK_QUEUE_ENABLED or not feedback_service.google_available(files)):
+            if not settings.FEEDBACK_QUEUE_ENABLED:
+                logger.warning("Google circuit breaker is open; journaling %s submission for later delivery",
+                               kind.value)
+            ticket_id = await feedback_queue.enqueue(kind, feedback_data, files)
+            return status.HTTP_202_ACCEPTED, encode_response_object(data=message, meta={"ticket_id": ticket_id})
+        upload_results = await FeedbackQueue.dispatch(feedback_service, kind, feedback_data, files)
+        return status.HTTP_200_OK, encode_response_object(data=message, meta=upload_meta(upload_results))
+
+    digest = await payload_digest(feedback_data, files)
+    key = make_idempotency_key(kind, idempotency_key, feedback_data, digest)
+    (status_code, body), replayed = await idempotency_cache.run(key, digest, handle)
+    headers = None
+    if replayed:
+        logger.info("Replaying stored response for duplicate %s submission %s", kind.value, key)
+        headers = {"Idempotent-Replayed": "true"}
+    return FastJSONResponse(content=body, status_code=status_code, headers=headers)
+
+
+def upload_meta(upload_results: list[FileUploadResult]) -> dict:
+    if not upload_results:
+        return {}
+    return {
+        "files": [result.dict() for result in upload_results],
+        "failed_files": sum(1 for result in upload_results if result.error),
+    }
+
+
+@router.post("/consultation", dependencies=[Depends(google_request_budget)])
+async def create_consultation(feedback_data: ConsultationCreate,
+    feedback_service: FeedbackService = Depends(get_feedback_service),
+    feedback_queue: FeedbackQueue | None = Depends(get_feedback_queue),
+    idempotency_cache: IdempotencyCache = Depends(get_idempotency_cache),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key")):
+    message = "Gửi phản hồi tư vấn dịch vụ thành công"
+    return await submit_feedback(feedback_service, feedback_queue, idempotency_cache, idempotency_key,
+                                 FeedbackTypeEnum.CONSULTATION, message, feedback_data)
+
+@router.post("/consultation/batch")
+async def import_consultations(request: Request,
+    feedback_service: FeedbackService = Depends(get_feedback_service)):
+    """
+    Newline-delimited ConsultationCreate objects in, one NDJSON result per line out, followed by
+    a summary line. The body is parsed as it streams in and results are spooled (to disk past
+    CONSULTATION_BATCH_RESULT_SPOOL_SIZE), so memory stays bounded whatever the body size.
+    """
+    results = tempfile.SpooledTemporaryFile(max_size=settings.CONSULTATION_BATCH_RESULT_SPOOL_SIZE)
+    summary = {"accepted": 0, "rejected": 0, "failed": 0}
+    lines = iter_ndjson_lines(request.stream(), settings.CONSULTATION_BATCH_MAX_LINE_BYTES)
+    async for result in feedback_service.import_consultations(lines):
+        summary[result["status"]] += 1
+        results.write(json.dumps(result, ensure_ascii=False).encode() + b"\n")
+    results.write(json.dumps({"summary": summary}).encode() + b"\n")
+    results.seek(0)
+    logger.info(f"Imported consultation batch: {summary}")
+    # The body is fully read by now, so streaming the response can't compete with it for receive()
+    return StreamingResponse(iter(lambda: results.read(64 * 1024), b""), media_type="application/x-ndjson",
+                             background=BackgroundTask(results.close))
+
+@router.post("/warranty", dependencies=[Depends(google_request_budget)])
 async def create_warranty(full_name: str = Form(...),
     phone_number: str = Form(None),
     email: str = Form(None),
@@ -24,36 +97,87 @@ async def create_warranty(full_name: str = Form(...),
     product_type: str = Form(...),
     start_date: str = Form(...),
     issue_description: str = Form(...),
-    files: list[UploadFile] = File(None)):
-    feedback_data = WarrantyCreate(
-        full_name=full_name,
-        phone_number=phone_number,
-        email=email,
-        conversation_code=conversation_code,
-        product_type=product_type,
-        start_date=start_date,
-        issue_description=issue_description,
-    )
-    feedback_service = FeedbackService()
-    await feedback_service.create_warranty(feedback_data=feedback_data,files=files)
-    return make_response_object(data="Gửi phản hồi bảo hành thành công")
-
-@router.post("/complaint")
+    files: list[UploadFile] = File(None),
+    feedback_service: FeedbackService = Depends(get_feedback_service),
+    feedback_queue: FeedbackQueue | None = Depends(get_feedback_queue),
+    idempotency_cache: IdempotencyCache = Depends(get_idempotency_cache),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key")):
+    with span("validate"):
+        feedback_data = WarrantyCreate(
+            full_name=full_name,
+            phone_number=phone_number,
+            email=email,
+            conversation_code=conversation_code,
+            product_type=product_type,
+            start_date=start_date,
+            issue_description=issue_description,
+        )
+    message = "Gửi phản hồi bảo hành thành công"
+    return await submit_feedback(feedback_service, feedback_queue, idempotency_cache, idempotency_key,
+                                 FeedbackTypeEnum.WARRANTY, message, feedback_data, files)
+
+@router.post("/complaint", dependencies=[Depends(google_request_budget)])
 async def create_complaint(full_name: str = Form(...),
     phone_number: str = Form(None),
     email: str = Form(None),
     conversation_code: str = Form(...),
     complaint_issue: str = Form(...),
     urgency_level: UrgencyLevelEnum = Form(...),
-    files: list[UploadFile] = File(None)):
-    feedback_data = ComplaintCreate(
-        full_name=full_name,
-        phone_number=phone_number,
-        email=email,
-        conversation_code=conversation_code,
-        complaint_issue=complaint_issue,
-        urgency_level=urgency_level,
-    )
-    feedback_service = FeedbackService()
-    await feedback_service.create_complaint(feedback_data=feedback_data,files=files)
-    return make_response_object(data="Gửi phản hồi khiếu nại thành công")
\ No newline at end of file
+    files: list[UploadFile] = File(None),
+    feedback_service: FeedbackService = Depends(get_feedback_service),
+    feedback_queue: FeedbackQueue | None = Depends(get_feedback_queue),
+    idempotency_cache: IdempotencyCache = Depends(get_idempotency_cache),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key")):
+    with span("validate"):
+        feedback_data = ComplaintCreate(
+            full_name=full_name,
+            phone_number=phone_number,
+            email=email,
+            conversation_code=conversation_code,
+            complaint_issue=complaint_issue,
+            urgency_level=urgency_level,
+        )
+    message = "Gửi phản hồi khiếu nại thành công"
+    return await submit_feedback(feedback_service, feedback_queue, idempotency_cache, idempotency_key,
+                                 FeedbackTypeEnum.COMPLAINT, message, feedback_data, files)
+
+@router.get("/tickets/{ticket_id}")
+async def get_ticket(ticket_id: str, feedback_queue: FeedbackQueue | None = Depends(get_feedback_queue)):
+    ticket = await feedback_queue.get(ticket_id) if feedback_queue else None
+    if not ticket:
+        raise error_exception_handler(app_status=AppStatus.ERROR_404_NOT_FOUND, description=ticket_id)
+    return make_response_object(data=ticket)
+
+@router.get("/partitions")
+async def list_partitions(kind: FeedbackTypeEnum = None,
+    sheet_partitions: SheetPartitions = Depends(get_sheet_partitions)):
+    """Partition tabs from the manifest, oldest first per kind; `current` marks the one new rows go to."""
+    partitions = sheet_partitions.partitions(kind)
+    return FastJSONResponse(content=make_response_object(data=partitions, meta={"count": len(partitions)}))
+
+
+@router.get("")
+async def list_feedbacks(conversation_code: str = None,
+    kind: FeedbackTypeEnum = None,
+    urgency_level: UrgencyLevelEnum = None,
+    created_from: datetime = None,
+    created_to: datetime = None,
+    cursor: str = None,
+    limit: int = Query(None, ge=1, le=settings.FEEDBACK_MIRROR_MAX_PAGE_SIZE),
+    feedback_mirror: FeedbackMirror = Depends(get_feedback_mirror)):
+    """Feedbacks from the local mirror, newest first; pass meta.next_cursor back as `cursor` for the next page."""
+    try:
+        items, next_cursor = await feedback_mirror.query(
+            conversation_code=conversation_code,
+            kind=kind.value if kind else None,
+            urgency_level=urgency_level.value if urgency_level else None,
+            created_from=created_from.timestamp() if created_from else None,
+            created_to=created_to.timestamp() if created_to else None,
+            cursor=cursor,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise error_exception_handler(app_status=AppStatus.ERROR_400_INVALID_DATA, description=str(e))
+    # Plain JSON types only, so jsonable_encoder can be skipped for pages of up to FEEDBACK_MIRROR_MAX_PAGE_SIZE rows
+    meta = {"count": len(items), "next_cursor": next_cursor}
+    return FastJSONResponse(content=make_response_object(data=items, meta=meta))
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends
+
+from app.apis.dependencies import get_google_clients, get_feedback_queue, get_image_preprocessor
+from app.clients import GoogleClientRegistry
+from app.constant import AppStatus
+from app.core import error_exception_handler, settings
+from app.core.exceptions import make_response_object
+from app.services import FeedbackQueue, ImagePreprocessor
+
+router = APIRouter()
+
+
+@router.get("/ready")
+async def readiness(clients: GoogleClientRegistry = Depends(get_google_clients)):
+    if not clients.ready:
+        raise error_exception_handler(app_status=AppStatus.ERROR_503_NOT_READY)
+    return make_response_object(data={"ready": True, "warm_up_seconds": clients.warm_up_seconds})
+
+
+@router.get("/google")
+async def google_clients_health(clients: GoogleClientRegistry = Depends(get_google_clients)):
+    return make_response_object(data=clients.stats())
+
+
+@router.get("/queue")
+async def feedback_queue_health(feedback_queue: FeedbackQueue | None = Depends(get_feedback_queue)):
+    return make_response_object(data={"enabled": feedback_queue is not None and settings.FEEDBACK_QUEUE_ENABLED,
+                                      "fallback": feedback_queue is not None and not settings.FEEDBACK_QUEUE_ENABLED,
+                                      **(await feedback_queue.stats() if feedback_queue else {})})
+
+
+@router.get("/images")
+async def image_preprocessor_health(image_preprocessor: ImagePreprocessor | None = Depends(get_image_preprocessor)):
+    return make_response_object(data={"enabled": image_preprocessor is not None,
+                                      **(image_preprocessor.stats() if image_preprocessor else {})})
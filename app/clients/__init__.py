@@ -0,0 +1,12 @@
+from .google_clients import GoogleClientRegistry, build_credentials
+from .google_executor import GoogleExecutor
+from .errors import GoogleApiError, GoogleApiTimeout, GoogleDeadlineExceeded
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .rate_limiter import GoogleCallScheduler, TokenBucket
+from .sheet_batcher import SheetAppendBatcher
+from .sheet_tabs import SheetTabCache
+from .token_manager import TokenManager
+from .sheet_partitions import SheetPartition, SheetPartitions
+from .folder_cache import DriveFolderCache
+from .attachment_index import AttachmentIndex
+from .feedback_mirror import FeedbackMirror
@@ -0,0 +1,124 @@
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import weakref
+from pathlib import Path
+
+from app.core import settings
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_stream(stream) -> str:
+    """sha256 of a seekable stream, read in fixed-size chunks; the stream position is restored."""
+    position = stream.tell()
+    digest = hashlib.sha256()
+    while chunk := stream.read(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    stream.seek(position)
+    return digest.hexdigest()
+
+
+# Digests of the upload streams already read, so the idempotency key and the index share one pass
+_stream_digests: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+async def hash_upload(stream) -> str:
+    """`hash_stream` off the event loop, computed once per stream."""
+    digest = _stream_digests.get(stream)
+    if digest is None:
+        digest = _stream_digests[stream] = await asyncio.to_thread(hash_stream, stream)
+    return digest
+
+
+class AttachmentIndex:
+    """
+    Persistent content-hash -> Drive file id index (SQLite, shared by all workers) used to turn
+    re-submitted attachments into Drive shortcuts instead of new uploads. Bounded by
+    ATTACHMENT_INDEX_MAX_ENTRIES (least recently used evicted first) and ATTACHMENT_INDEX_TTL.
+    """
+
+    def __init__(self, path: str = None, max_entries: int = None, ttl: float = None):
+        self.path = Path(path or settings.ATTACHMENT_INDEX_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries or settings.ATTACHMENT_INDEX_MAX_ENTRIES
+        self.ttl = ttl or settings.ATTACHMENT_INDEX_TTL
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS attachments (
+                sha256 TEXT PRIMARY KEY,
+                file_id TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_attachments_last_used ON attachments (last_used_at)")
+        self._lookups = 0
+        self._hits = 0
+        self._evictions = 0
+
+    def _get(self, sha256: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT file_id, created_at FROM attachments WHERE sha256 = ?",
+                                     (sha256,)).fetchone()
+            self._lookups += 1
+            if not row:
+                return None
+            if now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM attachments WHERE sha256 = ?", (sha256,))
+                self._evictions += 1
+                return None
+            self._conn.execute("UPDATE attachments SET last_used_at = ? WHERE sha256 = ?", (now, sha256))
+            self._hits += 1
+            return row[0]
+
+    def _put(self, sha256: str, file_id: str, size: int):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO attachments VALUES (?, ?, ?, ?, ?)",
+                               (sha256, file_id, size, now, now))
+            cursor = self._conn.execute(
+                "DELETE FROM attachments WHERE created_at < ? OR sha256 IN ("
+                " SELECT sha256 FROM attachments ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+                (now - self.ttl, self.max_entries))
+            self._evictions += cursor.rowcount
+
+    def _delete(self, sha256: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM attachments WHERE sha256 = ?", (sha256,))
+
+    async def hash(self, stream) -> str:
+        return await hash_upload(stream)
+
+    async def get(self, sha256: str) -> str | None:
+        return await asyncio.to_thread(self._get, sha256)
+
+    async def put(self, sha256: str, file_id: str, size: int):
+        await asyncio.to_thread(self._put, sha256, file_id, size)
+
+    async def evict(self, sha256: str):
+        await asyncio.to_thread(self._delete, sha256)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM attachments").fetchone()[0]
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "lookups": self._lookups,
+            "hits": self._hits,
+            "hit_rate": round(self._hits / self._lookups, 3) if self._lookups else 0,
+            "evictions": self._evictions,
+        }
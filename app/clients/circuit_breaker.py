@@ -0,0 +1,123 @@
+import logging
+import time
+
+from app.clients.errors import GoogleApiError, GoogleApiTimeout
+from app.constant import CircuitState
+from app.core import settings
+from app.core.metrics import GOOGLE_CIRCUIT_STATE
+
+logger = logging.getLogger(__name__)
+
+STATE_VALUES = {CircuitState.CLOSED: 0, CircuitState.HALF_OPEN: 1, CircuitState.OPEN: 2}
+
+
+class CircuitOpenError(GoogleApiError):
+    """A call refused without being attempted because the API's circuit breaker is open."""
+
+    def __init__(self, api: str, operation: str = None, retry_after: float = None):
+        super().__init__(503, f"{api} circuit breaker is open", reason="circuitOpen", retry_after=retry_after,
+                         operation=operation)
+        self.api = api
+
+
+def is_outage(error: GoogleApiError) -> bool:
+    """Timeouts, transport errors and 5xx count against the breaker; 4xx and 429s mean the API is answering."""
+    return isinstance(error, GoogleApiTimeout) or error.status >= 500
+
+
+class CircuitBreaker:
+    """
+    Fails calls to one Google API fast once it looks down, instead of letting every request wait
+    out its timeouts and retries. After `failure_threshold` consecutive outage errors the
+    breaker opens and refuses calls with CircuitOpenError; after `reset_timeout` seconds it
+    half-opens and lets a single probe call through, which closes it again on success or
+    reopens it on failure. A threshold of 0 disables the breaker. Per worker process, like the
+    rate limiter it lives in, and only touched from the event loop.
+    """
+
+    def __init__(self, api: str, failure_threshold: int = None, reset_timeout: float = None):
+        self.api = api
+        self.failure_threshold = settings.GOOGLE_BREAKER_FAILURE_THRESHOLD if failure_threshold is None \
+            else failure_threshold
+        self.reset_timeout = settings.GOOGLE_BREAKER_RESET_TIMEOUT if reset_timeout is None else reset_timeout
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._opened = 0
+        self._rejected = 0
+        self._last_failure = None
+        GOOGLE_CIRCUIT_STATE.labels(api).set(STATE_VALUES[self._state])
+
+    def _set_state(self, state: CircuitState):
+        if state is self._state:
+            return
+        logger.warning(f"{self.api} circuit breaker {self._state.value} -> {state.value}"
+                       + (f" after {self._failures} consecutive failures ({self._last_failure})"
+                          if state is CircuitState.OPEN else ""))
+        self._state = state
+        GOOGLE_CIRCUIT_STATE.labels(self.api).set(STATE_VALUES[state])
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state is CircuitState.OPEN and self.retry_after == 0:
+            return CircuitState.HALF_OPEN
+        return self._state
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until an open breaker lets a probe through."""
+        if self._state is not CircuitState.OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    @property
+    def available(self) -> bool:
+        """Whether a call made now would be attempted; callers with a fallback check this first."""
+        if not self.failure_threshold:
+            return True
+        state = self.state
+        return state is CircuitState.CLOSED or (state is CircuitState.HALF_OPEN and not self._probing)
+
+    def before_call(self, operation: str = None):
+        """Raise CircuitOpenError unless the call may go ahead; in half-open, the caller becomes the probe."""
+        if not self.failure_threshold:
+            return
+        if not self.available:
+            self._rejected += 1
+            raise CircuitOpenError(self.api, operation, retry_after=self.retry_after or self.reset_timeout)
+        if self.state is CircuitState.HALF_OPEN:
+            self._set_state(CircuitState.HALF_OPEN)
+            self._probing = True
+
+    def record(self, error: GoogleApiError = None):
+        """Outcome of a call `before_call` let through: None for success, or the error it raised."""
+        self._probing = False
+        if error is None or not is_outage(error):
+            self._failures = 0
+            self._set_state(CircuitState.CLOSED)
+            return
+        self._last_failure = str(error)
+        if self._state is CircuitState.OPEN:
+            # A call that was already in flight when the breaker opened
+            return
+        self._failures += 1
+        if self._state is CircuitState.HALF_OPEN or \
+                (self.failure_threshold and self._failures >= self.failure_threshold):
+            self._opened += 1
+            self._opened_at = time.monotonic()
+            self._set_state(CircuitState.OPEN)
+
+    def abandon(self):
+        """The call was cancelled or failed locally before reaching Google; free the probe slot."""
+        self._probing = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state.value,
+            "consecutive_failures": self._failures,
+            "retry_after_seconds": round(self.retry_after, 1),
+            "opened": self._opened,
+            "rejected": self._rejected,
+            "last_failure": self._last_failure,
+        }
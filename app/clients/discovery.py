@@ -0,0 +1,81 @@
+"""
+Bundled, trimmed discovery documents for the Drive v3 / Sheets v4 methods the backends call.
+
+The full documents googleapiclient ships are ~200-300 KB each, and every
+`sheets.spreadsheets()` / `drive.files()` call builds a Resource that compiles every method of
+the collection and pretty-prints the request/response schemas into docstrings: ~20 ms of CPU
+per Google call. The trimmed documents keep only the methods in DISCOVERY_METHODS, with bodies
+typed as plain objects and descriptions dropped, which makes both `build` and the per-call
+resource construction sub-millisecond.
+
+Regenerate after upgrading google-api-python-client or when a backend starts using a new method:
+
+    python -m app.clients.discovery
+"""
+import copy
+import json
+from pathlib import Path
+
+DISCOVERY_DOCUMENTS_DIR = Path(__file__).parent / "discovery_documents"
+
+# (service, version) -> {resource path: [methods]}
+DISCOVERY_METHODS = {
+    ("drive", "v3"): {"files": ["list", "create"]},
+    ("sheets", "v4"): {"spreadsheets": ["get", "batchUpdate"], "spreadsheets.values": ["append", "get"]},
+}
+
+_DOCUMENTATION_KEYS = {"description", "enumDescriptions", "enumDeprecated", "deprecated", "icons",
+                       "documentationLink", "title", "canonicalName", "ownerDomain", "ownerName", "revision"}
+
+
+def _strip_documentation(value):
+    if isinstance(value, dict):
+        return {key: _strip_documentation(item) for key, item in value.items() if key not in _DOCUMENTATION_KEYS}
+    if isinstance(value, list):
+        return [_strip_documentation(item) for item in value]
+    return value
+
+
+def trim_discovery_document(document: dict, methods: dict[str, list[str]]) -> dict:
+    trimmed = {key: value for key, value in document.items() if key not in ("resources", "schemas")}
+    trimmed["schemas"] = {}
+    for path, names in methods.items():
+        source, target = document, trimmed
+        for part in path.split("."):
+            source = source["resources"][part]
+            target = target.setdefault("resources", {}).setdefault(part, {})
+        for name in names:
+            method = copy.deepcopy(source["methods"][name])
+            # The client only needs the schemas for docstrings; the JSON model sends bodies as-is
+            for key in ("request", "response"):
+                if key in method:
+                    method[key] = {"type": "object"}
+            target.setdefault("methods", {})[name] = method
+    return _strip_documentation(trimmed)
+
+
+def load_discovery_document(service: str, version: str) -> dict:
+    with open(DISCOVERY_DOCUMENTS_DIR / f"{service}.{version}.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_resource(service: str, version: str, http, api_endpoint: str):
+    from googleapiclient.discovery import build_from_document
+
+    return build_from_document(load_discovery_document(service, version), http=http,
+                               client_options={"api_endpoint": api_endpoint})
+
+
+def main():
+    from googleapiclient.discovery_cache import get_static_doc
+
+    DISCOVERY_DOCUMENTS_DIR.mkdir(exist_ok=True)
+    for (service, version), methods in DISCOVERY_METHODS.items():
+        document = trim_discovery_document(json.loads(get_static_doc(service, version)), methods)
+        path = DISCOVERY_DOCUMENTS_DIR / f"{service}.{version}.json"
+        path.write_text(json.dumps(document, indent=1, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"Wrote {path} ({path.stat().st_size} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import json
+
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded", "RESOURCE_EXHAUSTED"}
+# Transport failures before any of the request was sent (refused, unresolvable, no pooled connection)
+CONNECT_ERROR_REASON = "connectError"
+
+
+class GoogleApiError(Exception):
+    """Backend-neutral error for a failed Sheets/Drive call."""
+
+    def __init__(self, status: int, message: str, reason: str = None, retry_after: float = None,
+                 operation: str = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.reason = reason
+        self.retry_after = retry_after
+        self.operation = operation
+
+    @property
+    def is_missing_range(self) -> bool:
+        return self.status == 400 and "Unable to parse range" in (self.message or "")
+
+    @property
+    def is_rate_limited(self) -> bool:
+        return self.status == 429 or (self.status == 403 and self.reason in RATE_LIMIT_REASONS)
+
+    @property
+    def is_unsent(self) -> bool:
+        """Google never received the request, so retrying can't apply it twice."""
+        return self.reason == CONNECT_ERROR_REASON
+
+    @property
+    def is_retryable(self) -> bool:
+        return self.status in RETRYABLE_STATUSES or self.is_rate_limited
+
+    def __str__(self):
+        return f"{self.operation or 'google'} failed ({self.status}): {self.message}"
+
+    @staticmethod
+    def parse_retry_after(value) -> float | None:
+        try:
+            return float(value) if value is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    @classmethod
+    def from_payload(cls, status: int, content: bytes | str, retry_after=None, operation: str = None):
+        message, reason = str(status), None
+        try:
+            error = json.loads(content).get("error", {})
+            message = error.get("message", message)
+            errors = error.get("errors") or []
+            reason = errors[0].get("reason") if errors else error.get("status")
+        except (ValueError, AttributeError):
+            if content:
+                message = content.decode("utf-8", "replace") if isinstance(content, bytes) else content
+        return cls(status, message, reason=reason, retry_after=cls.parse_retry_after(retry_after),
+                   operation=operation)
+
+
+class GoogleApiTimeout(GoogleApiError):
+
+    def __init__(self, operation: str, timeout: float = None):
+        super().__init__(504, f"timed out after {timeout}s" if timeout else "timed out", operation=operation)
+
+
+class GoogleDeadlineExceeded(GoogleApiTimeout):
+    """The request's Google budget (GOOGLE_REQUEST_BUDGET) ran out before or between attempts."""
+
+    def __init__(self, operation: str):
+        GoogleApiError.__init__(self, 504, "request deadline exceeded", reason="deadlineExceeded", operation=operation)
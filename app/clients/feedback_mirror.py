@@ -0,0 +1,246 @@
+import asyncio
+import base64
+import binascii
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+
+from app.clients.errors import GoogleApiError
+from app.clients.sheet_partitions import partition_kind
+from app.constant import FEEDBACK_SHEET_COLUMNS, FeedbackTypeEnum
+from app.core import settings
+
+logger = logging.getLogger(__name__)
+
+UPDATED_RANGE = re.compile(r"![A-Z]+(\d+)")
+HYPERLINK = re.compile(r'^=HYPERLINK\("([^"]*)"')
+CREATED_AT_FORMAT = "%H:%M:%S %d/%m/%Y"
+
+
+def first_updated_row(append_response: dict) -> int | None:
+    """Sheet row number of the first row a values.append wrote, from its `updates.updatedRange`."""
+    updated_range = (append_response or {}).get("updates", {}).get("updatedRange", "")
+    match = UPDATED_RANGE.search(updated_range)
+    return int(match.group(1)) if match else None
+
+
+def parse_created_at(value: str) -> float:
+    try:
+        return datetime.strptime(value, CREATED_AT_FORMAT).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def encode_cursor(created_ts: float, row_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([created_ts, row_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        created_ts, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(created_ts), int(row_id)
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+class FeedbackMirror:
+    """
+    Local SQLite copy of the feedback sheets (shared by all workers), indexed for lookups by
+    conversation_code, created_at and urgency_level so GET /api/feedbacks never reads Google.
+    Rows are written through after every successful append, keyed by (sheet, sheet_row) from the
+    append response, and rows that reach the sheet some other way (other deployments, manual
+    entry, history from before the mirror existed) are backfilled incrementally from the last
+    synced row. Edits and deletions made directly in the sheet are not picked up.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = Path(path or settings.FEEDBACK_MIRROR_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS feedbacks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                sheet TEXT NOT NULL,
+                sheet_row INTEGER,
+                conversation_code TEXT,
+                urgency_level TEXT,
+                created_ts REAL NOT NULL,
+                data TEXT NOT NULL,
+                UNIQUE (sheet, sheet_row)
+            )""")
+        for name, columns in (("conversation_code", "conversation_code, created_ts, id"),
+                              ("created", "created_ts, id"),
+                              ("urgency_level", "urgency_level, created_ts, id"),
+                              ("kind", "kind, created_ts, id")):
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS ix_feedbacks_{name} ON feedbacks ({columns})")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sync_state (
+                sheet TEXT PRIMARY KEY,
+                last_row INTEGER NOT NULL,
+                synced_at REAL NOT NULL
+            )""")
+        self._written = 0
+        self._backfilled = 0
+        self._queries = 0
+        self._last_sync = None
+
+    @staticmethod
+    def _record(kind: FeedbackTypeEnum, sheet: str, sheet_row: int | None, row: list) -> tuple:
+        data = {column: "" if value is None else str(value.value if isinstance(value, Enum) else value)
+                for column, value in zip(FEEDBACK_SHEET_COLUMNS[kind], row)}
+        if link := HYPERLINK.match(data.get("image_urls", "")):
+            data["image_urls"] = link.group(1)
+        return (kind.value, sheet, sheet_row, data.get("conversation_code") or None,
+                data.get("urgency_level") or None, parse_created_at(data.get("created_at")),
+                json.dumps(data, ensure_ascii=False))
+
+    def _insert(self, records: list[tuple]) -> int:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                inserted = 0
+                for record in records:
+                    inserted += self._conn.execute(
+                        "INSERT OR IGNORE INTO feedbacks (kind, sheet, sheet_row, conversation_code, urgency_level,"
+                        " created_ts, data) VALUES (?, ?, ?, ?, ?, ?, ?)", record).rowcount
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return inserted
+
+    async def record(self, sheet: str, rows: list[list], first_row: int | None):
+        """Mirror rows just appended to `sheet`; `first_row` is None if the append response had no range."""
+        kind = partition_kind(sheet)
+        if kind is None:
+            return
+        records = [self._record(kind, sheet, first_row + offset if first_row else None, row)
+                   for offset, row in enumerate(rows)]
+        self._written += await asyncio.to_thread(self._insert, records)
+
+    def _claim_sync(self, sheet: str, interval: float) -> int | None:
+        """Take the sheet's sync turn for this interval (one worker wins) and return its last synced row."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO sync_state VALUES (?, 0, 0)", (sheet,))
+            claimed = self._conn.execute("UPDATE sync_state SET synced_at = ? WHERE sheet = ? AND synced_at <= ?",
+                                         (now, sheet, now - interval)).rowcount
+            if not claimed:
+                return None
+            return self._conn.execute("SELECT last_row FROM sync_state WHERE sheet = ?", (sheet,)).fetchone()[0]
+
+    def _advance(self, sheet: str, last_row: int):
+        with self._lock:
+            self._conn.execute("UPDATE sync_state SET last_row = ?, synced_at = ? WHERE sheet = ?",
+                               (last_row, time.time(), sheet))
+
+    async def sync(self, backend, spreadsheet_id: str, sheet: str, interval: float = 0) -> int:
+        """Backfill `sheet` from the row after the last synced one; returns the number of new rows."""
+        kind = partition_kind(sheet)
+        last_row = await asyncio.to_thread(self._claim_sync, sheet, interval) if kind else None
+        if last_row is None:
+            return 0
+        page_rows = settings.FEEDBACK_MIRROR_SYNC_PAGE_ROWS
+        last_column = chr(ord("A") + len(FEEDBACK_SHEET_COLUMNS[kind]) - 1)
+        inserted = 0
+        while True:
+            range_ = f"'{sheet}'!A{last_row + 1}:{last_column}{last_row + page_rows}"
+            try:
+                values = (await backend.get_values(spreadsheet_id, range_)).get("values", [])
+            except GoogleApiError as e:
+                if e.is_missing_range:
+                    return inserted
+                raise
+            records = [self._record(kind, sheet, last_row + 1 + offset, row)
+                       for offset, row in enumerate(values) if any(row)]
+            inserted += await asyncio.to_thread(self._insert, records)
+            last_row += len(values)
+            await asyncio.to_thread(self._advance, sheet, last_row)
+            if len(values) < page_rows:
+                break
+        self._backfilled += inserted
+        if inserted:
+            logger.info(f"Backfilled {inserted} rows of '{sheet}' into the feedback mirror (up to row {last_row}).")
+        return inserted
+
+    async def sync_forever(self, backend, sheet_partitions, interval: float = None):
+        """Periodically backfill every feedback tab and partition; started as a task in the application lifespan."""
+        interval = interval or settings.FEEDBACK_MIRROR_SYNC_INTERVAL
+        while True:
+            try:
+                await sheet_partitions.tabs(sheet_partitions.primary_id).refresh()
+                for spreadsheet_id, sheet in sheet_partitions.sources():
+                    await self.sync(backend, spreadsheet_id, sheet, interval=interval)
+                self._last_sync = time.time()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Feedback mirror sync failed: {e}")
+            await asyncio.sleep(interval)
+
+    def _query(self, conversation_code: str | None, kind: str | None, urgency_level: str | None,
+               created_from: float | None, created_to: float | None, cursor: tuple[float, int] | None,
+               limit: int) -> list[tuple]:
+        clauses, params = [], []
+        for column, value in (("conversation_code", conversation_code), ("kind", kind),
+                              ("urgency_level", urgency_level)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if created_from is not None:
+            clauses.append("created_ts >= ?")
+            params.append(created_from)
+        if created_to is not None:
+            clauses.append("created_ts < ?")
+            params.append(created_to)
+        if cursor is not None:
+            # Newest first; the id breaks ties between rows created in the same second
+            clauses.append("(created_ts < ? OR (created_ts = ? AND id < ?))")
+            params += [cursor[0], cursor[0], cursor[1]]
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT id, kind, sheet, sheet_row, created_ts, data FROM feedbacks {where}"
+                f" ORDER BY created_ts DESC, id DESC LIMIT ?", (*params, limit + 1)).fetchall()
+
+    async def query(self, conversation_code: str = None, kind: str = None, urgency_level: str = None,
+                    created_from: float = None, created_to: float = None, cursor: str = None,
+                    limit: int = None) -> tuple[list[dict], str | None]:
+        """Matching feedbacks, newest first, and the cursor of the next page (None on the last one)."""
+        limit = min(limit or settings.FEEDBACK_MIRROR_PAGE_SIZE, settings.FEEDBACK_MIRROR_MAX_PAGE_SIZE)
+        position = decode_cursor(cursor) if cursor else None
+        rows = await asyncio.to_thread(self._query, conversation_code, kind, urgency_level, created_from,
+                                       created_to, position, limit)
+        self._queries += 1
+        items = [{"id": row_id, "kind": row_kind, "sheet": sheet, "sheet_row": sheet_row, **json.loads(data)}
+                 for row_id, row_kind, sheet, sheet_row, _, data in rows[:limit]]
+        next_cursor = encode_cursor(rows[limit - 1][4], rows[limit - 1][0]) if len(rows) > limit else None
+        return items, next_cursor
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM feedbacks").fetchone()[0]
+            sheets = {sheet: last_row for sheet, last_row in
+                      self._conn.execute("SELECT sheet, last_row FROM sync_state").fetchall()}
+        return {
+            "entries": entries,
+            "written": self._written,
+            "backfilled": self._backfilled,
+            "queries": self._queries,
+            "synced_rows": sheets,
+            "last_sync": datetime.fromtimestamp(self._last_sync).isoformat(timespec="seconds")
+            if self._last_sync else None,
+        }
@@ -0,0 +1,102 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+from pathlib import Path
+
+from app.core import settings
+
+logger = logging.getLogger(__name__)
+
+
+class DriveFolderCache:
+    """
+    name -> folderId cache for the long-lived parent folders ("Warranty", "Complaint"). Entries
+    live in a small JSON file guarded by an flock, so they survive restarts and are shared by
+    every gunicorn worker. A miss is resolved once per process (single-flight) and under the
+    file lock across processes, so concurrent requests never create duplicate folders.
+    """
+
+    def __init__(self, path: str = None, parent_id: str = None):
+        self.path = Path(path or settings.DRIVE_FOLDER_CACHE_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock_path = self.path.with_suffix(self.path.suffix + ".lock")
+        self.parent_id = parent_id or settings.GOOGLE_DRIVE_FOLDER_ID
+        self._folders: dict[str, str] = {}
+        self._resolving: dict[str, asyncio.Task] = {}
+        self._hits = 0
+        self._misses = 0
+
+    def _key(self, name: str) -> str:
+        return f"{self.parent_id}/{name}"
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write(self, folders: dict):
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(folders, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def _lock(self):
+        lock_file = open(self.lock_path, "a")
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    @staticmethod
+    def _unlock(lock_file):
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
+
+    async def get_or_create(self, name: str, resolve) -> str:
+        """Return the cached id for `name`, awaiting `resolve(name)` (lookup/create in Drive) on a miss."""
+        key = self._key(name)
+        if key in self._folders:
+            self._hits += 1
+            return self._folders[key]
+
+        task = self._resolving.get(key)
+        if task is None:
+            task = asyncio.create_task(self._resolve(key, name, resolve))
+            self._resolving[key] = task
+            task.add_done_callback(lambda _: self._resolving.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _resolve(self, key: str, name: str, resolve) -> str:
+        folders = await asyncio.to_thread(self._read)
+        if key not in folders:
+            self._misses += 1
+            lock_file = await asyncio.to_thread(self._lock)
+            try:
+                folders = await asyncio.to_thread(self._read)
+                if key not in folders:
+                    folders[key] = await resolve(name)
+                    await asyncio.to_thread(self._write, folders)
+            finally:
+                await asyncio.to_thread(self._unlock, lock_file)
+        else:
+            self._hits += 1
+        self._folders[key] = folders[key]
+        return folders[key]
+
+    async def invalidate(self, name: str):
+        key = self._key(name)
+        self._folders.pop(key, None)
+        lock_file = await asyncio.to_thread(self._lock)
+        try:
+            folders = await asyncio.to_thread(self._read)
+            if folders.pop(key, None):
+                await asyncio.to_thread(self._write, folders)
+        finally:
+            await asyncio.to_thread(self._unlock, lock_file)
+
+    def stats(self) -> dict:
+        return {"folders": len(self._folders), "hits": self._hits, "misses": self._misses}
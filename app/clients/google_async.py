@@ -0,0 +1,214 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from urllib.parse import quote
+
+import httpx
+from google.auth import jwt
+
+from app.clients.errors import CONNECT_ERROR_REASON, GoogleApiError, GoogleApiTimeout
+from app.clients.rate_limiter import GoogleCallScheduler
+from app.clients.token_manager import TokenManager
+from app.clients.uploads import RETRYABLE_UPLOAD_STATUSES, chunk_retry_delay, stream_size, upload_chunk_size
+from app.constant import GoogleBackendType
+from app.core import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+JWT_BEARER_GRANT = "urn:ietf:params:oauth:grant-type:jwt-bearer"
+TOKEN_LIFETIME = 3600
+
+
+class AsyncGoogleBackend:
+    """
+    Native asyncio transport for the handful of Sheets v4 / Drive v3 REST calls FeedbackService
+    makes. One keep-alive connection pool (HTTP/2 when `h2` is installed) is shared by every
+    request, so Drive and Sheets work runs concurrently without a thread per call. Every call
+    goes through the GoogleCallScheduler for pacing and retries.
+    """
+    name = GoogleBackendType.ASYNC
+
+    def __init__(self, credentials, client: httpx.AsyncClient = None, scheduler: GoogleCallScheduler = None):
+        self.client = client or httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(settings.GOOGLE_HTTP_TIMEOUT),
+            limits=httpx.Limits(max_connections=settings.GOOGLE_HTTP_POOL_SIZE,
+                                max_keepalive_connections=settings.GOOGLE_HTTP_POOL_SIZE),
+        )
+        self.credentials = credentials
+        self.token_uri = settings.GOOGLE_TOKEN_URI
+        self.tokens = TokenManager(credentials, self.mint_token)
+        self.scheduler = scheduler or GoogleCallScheduler()
+        self.sheets_url = f"{settings.GOOGLE_SHEETS_API_URL}/v4/spreadsheets"
+        self.drive_url = f"{settings.GOOGLE_DRIVE_API_URL}/drive/v3/files"
+        self.upload_url = f"{settings.GOOGLE_DRIVE_API_URL}/upload/drive/v3/files"
+
+    async def _request(self, operation: str, method: str, url: str, timeout: float = None,
+                       headers: dict = None, retry: bool = True, **kwargs) -> httpx.Response:
+        return await self.scheduler.call(operation, self._send, operation, method, url, timeout=timeout,
+                                         headers=headers, retry=retry, **kwargs)
+
+    async def _send(self, operation: str, method: str, url: str, timeout: float = None,
+                    headers: dict = None, **kwargs) -> httpx.Response:
+        timeout = timeout or settings.GOOGLE_CALL_TIMEOUT
+        headers = {"Authorization": f"Bearer {await self.tokens.get()}", **(headers or {})}
+        try:
+            response = await asyncio.wait_for(self.client.request(method, url, headers=headers, **kwargs), timeout)
+        except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+            raise GoogleApiError(503, str(e) or type(e).__name__, reason=CONNECT_ERROR_REASON, operation=operation)
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            raise GoogleApiTimeout(operation, timeout)
+        except httpx.TransportError as e:
+            raise GoogleApiError(503, str(e) or type(e).__name__, reason="transportError", operation=operation)
+        if response.status_code >= 400:
+            raise GoogleApiError.from_payload(response.status_code, response.content,
+                                              retry_after=response.headers.get("retry-after"), operation=operation)
+        return response
+
+    async def mint_token(self) -> tuple[str, float]:
+        """(access token, expiry timestamp) for a signed JWT assertion, posted through the shared client."""
+        now = int(time.time())
+        payload = {
+            "iss": self.credentials.service_account_email,
+            "scope": " ".join(self.credentials.scopes or []),
+            "aud": self.token_uri,
+            "iat": now,
+            "exp": now + TOKEN_LIFETIME,
+        }
+        assertion = jwt.encode(self.credentials.signer, payload, key_id=self.credentials.signer.key_id)
+        response = await self.client.post(self.token_uri, data={"grant_type": JWT_BEARER_GRANT,
+                                                                 "assertion": assertion.decode("ascii")},
+                                          timeout=settings.GOOGLE_CALL_TIMEOUT)
+        if response.status_code >= 400:
+            raise GoogleApiError.from_payload(response.status_code, response.content, operation="oauth2.token")
+        data = response.json()
+        return data["access_token"], now + int(data.get("expires_in", TOKEN_LIFETIME))
+
+    async def get_spreadsheet(self, spreadsheet_id: str, fields: str = None) -> dict:
+        params = {"fields": fields} if fields else None
+        response = await self._request("sheets.spreadsheets.get", "GET", f"{self.sheets_url}/{spreadsheet_id}",
+                                       params=params)
+        return response.json()
+
+    async def append_values(self, spreadsheet_id: str, range_: str, values: list[list]) -> dict:
+        response = await self._request(
+            "sheets.spreadsheets.values.append", "POST",
+            f"{self.sheets_url}/{spreadsheet_id}/values/{quote(range_, safe='')}:append",
+            params={"valueInputOption": "USER_ENTERED", "insertDataOption": "INSERT_ROWS"},
+            json={"values": values},
+        )
+        return response.json()
+
+    async def get_values(self, spreadsheet_id: str, range_: str) -> dict:
+        response = await self._request(
+            "sheets.spreadsheets.values.get", "GET",
+            f"{self.sheets_url}/{spreadsheet_id}/values/{quote(range_, safe='')}",
+            params={"valueRenderOption": "FORMULA", "dateTimeRenderOption": "FORMATTED_STRING"},
+        )
+        return response.json()
+
+    async def batch_update(self, spreadsheet_id: str, requests: list[dict]) -> dict:
+        response = await self._request("sheets.spreadsheets.batchUpdate", "POST",
+                                       f"{self.sheets_url}/{spreadsheet_id}:batchUpdate", json={"requests": requests})
+        return response.json()
+
+    async def list_files(self, q: str, fields: str = "files(id, name)") -> dict:
+        response = await self._request("drive.files.list", "GET", self.drive_url, params={"q": q, "fields": fields})
+        return response.json()
+
+    async def create_file(self, metadata: dict, fields: str = 'id') -> dict:
+        response = await self._request("drive.files.create", "POST", self.drive_url, params={"fields": fields},
+                                       json=metadata)
+        return response.json()
+
+    async def upload_file(self, metadata: dict, stream, size: int = None, mimetype: str = 'application/octet-stream',
+                          fields: str = 'id, webViewLink') -> dict:
+        size = stream_size(stream) if size is None else size
+        if size <= settings.GOOGLE_MULTIPART_UPLOAD_MAX_SIZE:
+            return await self._upload_multipart(metadata, await asyncio.to_thread(stream.read), mimetype, fields)
+        return await self._upload_resumable(metadata, stream, size, mimetype, fields)
+
+    async def _upload_multipart(self, metadata: dict, data: bytes, mimetype: str, fields: str) -> dict:
+        boundary = uuid.uuid4().hex
+        body = b"".join([
+            f"--{boundary}\r\nContent-Type: application/json; charset=UTF-8\r\n\r\n".encode(),
+            json.dumps(metadata).encode(),
+            f"\r\n--{boundary}\r\nContent-Type: {mimetype}\r\n\r\n".encode(),
+            data,
+            f"\r\n--{boundary}--".encode(),
+        ])
+        response = await self._request("drive.files.upload", "POST", self.upload_url,
+                                       timeout=settings.GOOGLE_UPLOAD_TIMEOUT,
+                                       params={"uploadType": "multipart", "fields": fields},
+                                       headers={"Content-Type": f"multipart/related; boundary={boundary}"},
+                                       content=body)
+        return response.json()
+
+    @staticmethod
+    def _committed_offset(response: httpx.Response) -> int:
+        # 308 Resume Incomplete carries "Range: bytes=0-<last committed byte>" once anything is stored
+        committed = response.headers.get("range")
+        return int(committed.rsplit("-", 1)[1]) + 1 if committed else 0
+
+    @staticmethod
+    def _read_chunk(stream, offset: int, length: int) -> bytes:
+        stream.seek(offset)
+        return stream.read(length)
+
+    async def _upload_resumable(self, metadata: dict, stream, size: int, mimetype: str, fields: str) -> dict:
+        """
+        Drive resumable upload session fed chunk by chunk from the (spooled) stream, so memory
+        stays at one chunk whatever the file size. A failed chunk is retried from the offset
+        Drive reports as committed.
+        """
+        operation = "drive.files.upload"
+        session = await self._request(operation, "POST", self.upload_url,
+                                      params={"uploadType": "resumable", "fields": fields},
+                                      headers={"X-Upload-Content-Type": mimetype,
+                                               "X-Upload-Content-Length": str(size)},
+                                      json=metadata)
+        session_uri = session.headers["location"]
+        chunk_size = upload_chunk_size()
+        base = stream.tell()
+        offset, failures = 0, 0
+        while True:
+            chunk = await asyncio.to_thread(self._read_chunk, stream, base + offset, chunk_size)
+            content_range = f"bytes {offset}-{offset + len(chunk) - 1}/{size}" if chunk else f"bytes */{size}"
+            try:
+                response = await self._request(operation, "PUT", session_uri, content=chunk,
+                                               timeout=settings.GOOGLE_UPLOAD_TIMEOUT,
+                                               headers={"Content-Range": content_range}, retry=False)
+            except GoogleApiError as e:
+                failures += 1
+                if e.status not in RETRYABLE_UPLOAD_STATUSES or failures > settings.GOOGLE_UPLOAD_MAX_CHUNK_RETRIES:
+                    raise
+                logger.warning(f"Upload chunk of '{metadata.get('name')}' failed at {offset}/{size} bytes ({e}), "
+                               f"resuming")
+                await asyncio.sleep(chunk_retry_delay(failures))
+                status = await self._request(operation, "PUT", session_uri,
+                                             headers={"Content-Range": f"bytes */{size}"}, retry=False)
+                if status.status_code != 308:
+                    return status.json()
+                offset = self._committed_offset(status)
+                continue
+            del chunk
+            if response.status_code != 308:
+                return response.json()
+            failures = 0
+            offset = self._committed_offset(response)
+
+    async def aclose(self):
+        await self.tokens.stop()
+        await self.client.aclose()
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "http2": HTTP2_AVAILABLE, "max_connections": settings.GOOGLE_HTTP_POOL_SIZE,
+                "token": self.tokens.stats()}
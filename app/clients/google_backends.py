@@ -0,0 +1,145 @@
+import asyncio
+import copy
+import logging
+import socket
+import ssl
+import time
+from datetime import timezone
+
+import google_auth_httplib2
+import httplib2
+from googleapiclient.errors import HttpError
+from httplib2 import HttpLib2Error
+from googleapiclient.http import MediaIoBaseUpload
+
+from app.clients.errors import CONNECT_ERROR_REASON, GoogleApiError, GoogleApiTimeout
+from app.clients.google_executor import GoogleExecutor
+from app.clients.rate_limiter import GoogleCallScheduler
+from app.clients.token_manager import TokenManager
+from app.clients.uploads import RETRYABLE_UPLOAD_STATUSES, chunk_retry_delay, stream_size, upload_chunk_size
+from app.constant import GoogleBackendType
+from app.core import settings
+
+logger = logging.getLogger(__name__)
+
+TRANSPORT_ERRORS = (ConnectionError, TimeoutError, socket.gaierror, ssl.SSLError, HttpLib2Error)
+CONNECT_ERRORS = (ConnectionRefusedError, socket.gaierror, httplib2.ServerNotFoundError)
+
+
+class DiscoveryGoogleBackend:
+    """
+    Sheets/Drive backend built on the googleapiclient discovery resources. The blocking
+    httplib2 round-trips run on the GoogleExecutor thread pool, paced and retried by the
+    GoogleCallScheduler. The resources authorize with `credentials`, whose token the
+    TokenManager keeps fresh before every call.
+    """
+    name = GoogleBackendType.DISCOVERY
+
+    def __init__(self, sheets, drive, executor: GoogleExecutor, credentials, scheduler: GoogleCallScheduler = None):
+        self.sheets = sheets
+        self.drive = drive
+        self.executor = executor
+        self.credentials = credentials
+        self.scheduler = scheduler or GoogleCallScheduler()
+        self.tokens = TokenManager(credentials, self.mint_token)
+
+    async def _run(self, operation: str, fn, *args, timeout: float = None, retry: bool = True):
+        return await self.scheduler.call(operation, self._call, operation, fn, *args, timeout=timeout, retry=retry)
+
+    async def _call(self, operation: str, fn, *args, timeout: float = None):
+        await self.tokens.get()
+        try:
+            return await self.executor.run(fn, *args, timeout=timeout)
+        except asyncio.TimeoutError:
+            raise GoogleApiTimeout(operation, timeout or self.executor.timeout)
+        except HttpError as e:
+            raise GoogleApiError.from_payload(e.resp.status, e.content, retry_after=e.resp.get('retry-after'),
+                                              operation=operation)
+        except TRANSPORT_ERRORS as e:
+            # Connection failures count against the circuit breaker like the async backend's transport errors
+            reason = CONNECT_ERROR_REASON if isinstance(e, CONNECT_ERRORS) else "transportError"
+            raise GoogleApiError(503, str(e) or type(e).__name__, reason=reason, operation=operation)
+
+    async def mint_token(self) -> tuple[str, float]:
+        """(access token, expiry timestamp), refreshed on a copy so the shared credentials only change once it is cached."""
+        def refresh():
+            credentials = copy.copy(self.credentials)
+            credentials.refresh(google_auth_httplib2.Request(httplib2.Http(timeout=settings.GOOGLE_HTTP_TIMEOUT)))
+            return credentials.token, credentials.expiry.replace(tzinfo=timezone.utc).timestamp()
+        return await self.executor.run(refresh, timeout=settings.GOOGLE_CALL_TIMEOUT)
+
+    async def _execute(self, request, timeout: float = None):
+        return await self._run(request.methodId, request.execute, timeout=timeout)
+
+    async def get_spreadsheet(self, spreadsheet_id: str, fields: str = None) -> dict:
+        return await self._execute(self.sheets.spreadsheets().get(spreadsheetId=spreadsheet_id, fields=fields))
+
+    async def append_values(self, spreadsheet_id: str, range_: str, values: list[list]) -> dict:
+        return await self._execute(self.sheets.spreadsheets().values().append(
+            spreadsheetId=spreadsheet_id,
+            range=range_,
+            valueInputOption="USER_ENTERED",
+            body={'values': values},
+            insertDataOption="INSERT_ROWS"
+        ))
+
+    async def get_values(self, spreadsheet_id: str, range_: str) -> dict:
+        return await self._execute(self.sheets.spreadsheets().values().get(
+            spreadsheetId=spreadsheet_id,
+            range=range_,
+            valueRenderOption="FORMULA",
+            dateTimeRenderOption="FORMATTED_STRING"
+        ))
+
+    async def batch_update(self, spreadsheet_id: str, requests: list[dict]) -> dict:
+        return await self._execute(self.sheets.spreadsheets().batchUpdate(
+            spreadsheetId=spreadsheet_id,
+            body={'requests': requests}
+        ))
+
+    async def list_files(self, q: str, fields: str = "files(id, name)") -> dict:
+        return await self._execute(self.drive.files().list(q=q, fields=fields))
+
+    async def create_file(self, metadata: dict, fields: str = 'id') -> dict:
+        return await self._execute(self.drive.files().create(body=metadata, fields=fields))
+
+    def _upload(self, metadata: dict, stream, base: int, size: int, mimetype: str, fields: str):
+        # Rewind in case the scheduler is retrying a failed multipart upload
+        stream.seek(base)
+        if size <= settings.GOOGLE_MULTIPART_UPLOAD_MAX_SIZE:
+            media = MediaIoBaseUpload(stream, mimetype=mimetype)
+            return self.drive.files().create(body=metadata, media_body=media, fields=fields).execute()
+
+        # MediaIoBaseUpload seeks and reads one chunk at a time straight from the spooled file,
+        # and after a failed chunk next_chunk() asks Drive for the committed offset and resumes there.
+        media = MediaIoBaseUpload(stream, mimetype=mimetype, chunksize=upload_chunk_size(), resumable=True)
+        request = self.drive.files().create(body=metadata, media_body=media, fields=fields)
+        response, failures = None, 0
+        while response is None:
+            try:
+                _, response = request.next_chunk()
+                failures = 0
+            except (HttpError, OSError) as e:
+                status = e.resp.status if isinstance(e, HttpError) else None
+                failures += 1
+                if (status is not None and status not in RETRYABLE_UPLOAD_STATUSES) or \
+                        failures > settings.GOOGLE_UPLOAD_MAX_CHUNK_RETRIES:
+                    raise
+                logger.warning(f"Upload chunk of '{metadata.get('name')}' failed at "
+                               f"{request.resumable_progress}/{size} bytes ({e}), resuming")
+                time.sleep(chunk_retry_delay(failures))
+        return response
+
+    async def upload_file(self, metadata: dict, stream, size: int = None, mimetype: str = 'application/octet-stream',
+                          fields: str = 'id, webViewLink') -> dict:
+        size = stream_size(stream) if size is None else size
+        # Resumable uploads retry their own chunks; restarting the whole session would resend everything
+        return await self._run("drive.files.upload", self._upload, metadata, stream, stream.tell(), size, mimetype,
+                               fields, timeout=settings.GOOGLE_UPLOAD_TIMEOUT,
+                               retry=size <= settings.GOOGLE_MULTIPART_UPLOAD_MAX_SIZE)
+
+    async def aclose(self):
+        await self.tokens.stop()
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "executor": self.executor.stats(), "token": self.tokens.stats()}
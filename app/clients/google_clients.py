@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import queue
+import random
+import threading
+import time
+
+from app.clients.attachment_index import AttachmentIndex
+from app.clients.feedback_mirror import FeedbackMirror
+from app.clients.folder_cache import DriveFolderCache
+from app.clients.google_executor import GoogleExecutor
+from app.clients.rate_limiter import GoogleCallScheduler
+from app.clients.sheet_batcher import SheetAppendBatcher
+from app.clients.sheet_partitions import SheetPartitions
+from app.clients.sheet_tabs import SheetTabCache
+from app.constant import GOOGLE_SCOPES, GoogleBackendType
+from app.core import settings
+
+logger = logging.getLogger(__name__)
+
+WARM_UP_MAX_RETRY_DELAY = 60
+
+
+# google-auth, httplib2, googleapiclient and httpx are imported where they are first used, in the
+# application lifespan, so importing app.main (and every gunicorn worker boot) doesn't pay for them.
+def build_credentials():
+    from google.oauth2.service_account import Credentials
+
+    return Credentials.from_service_account_info(
+        {
+            "type": "service_account",
+            "project_id": settings.GOOGLE_PROJECT_ID,
+            "private_key_id": settings.GOOGLE_PRIVATE_KEY_ID,
+            "private_key": settings.GOOGLE_PRIVATE_KEY.replace('\\n', '\n'),
+            "client_email": settings.GOOGLE_CLIENT_EMAIL,
+            "client_id": settings.GOOGLE_CLIENT_ID,
+            "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+            "token_uri": settings.GOOGLE_TOKEN_URI,
+            "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
+            "client_x509_cert_url": settings.GOOGLE_CLIENT_X509_CERT_URL,
+            "universe_domain": "googleapis.com"
+        },
+        scopes=GOOGLE_SCOPES
+    )
+
+
+class _PooledHttp:
+    """
+    httplib2.Http stand-in handed to the discovery resources. Every request borrows an
+    authorized connection from the registry pool, so the prebuilt Drive/Sheets resources
+    can be shared between threads (a bare httplib2.Http is not thread-safe).
+    """
+
+    def __init__(self, registry):
+        self._registry = registry
+
+    def request(self, *args, **kwargs):
+        http = self._registry.acquire()
+        try:
+            return http.request(*args, **kwargs)
+        except Exception as e:
+            self._registry.record_error(e)
+            raise
+        finally:
+            self._registry.release(http)
+
+    def close(self):
+        self._registry.close()
+
+
+class GoogleClientRegistry:
+    """
+    Process-wide Google clients: one credentials object and the Sheets/Drive backend selected
+    by `GOOGLE_BACKEND`. The discovery backend gets prebuilt Drive v3 / Sheets v4 resources,
+    a bounded pool of authorized HTTP connections and the thread pool their blocking calls
+    run on; the async backend brings its own connection pool. Created once in the
+    application lifespan and injected into FeedbackService.
+    """
+
+    def __init__(self, credentials=None, pool_size: int = None, timeout: int = None, backend: str = None):
+        self.credentials = credentials or build_credentials()
+        self.pool_size = pool_size or settings.GOOGLE_HTTP_POOL_SIZE
+        self.timeout = timeout or settings.GOOGLE_HTTP_TIMEOUT
+        self._pool = queue.LifoQueue(maxsize=self.pool_size)
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._waits = 0
+        self._errors = 0
+        self._last_error = None
+        self._created_at = time.time()
+        self.ready = False
+        self.warm_up_seconds = None
+        self.warm_up_attempts = 0
+        self.warm_up_error = None
+
+        self.executor = GoogleExecutor()
+        self.sheet_batcher = SheetAppendBatcher()
+        self.scheduler = GoogleCallScheduler()
+
+        if (backend or settings.GOOGLE_BACKEND) == GoogleBackendType.ASYNC:
+            from app.clients.google_async import AsyncGoogleBackend
+
+            self.backend = AsyncGoogleBackend(self.credentials, scheduler=self.scheduler)
+        else:
+            from app.clients.discovery import build_resource
+            from app.clients.google_backends import DiscoveryGoogleBackend
+
+            http = _PooledHttp(self)
+            self.drive = build_resource('drive', 'v3', http, f"{settings.GOOGLE_DRIVE_API_URL}/drive/v3/")
+            self.sheets = build_resource('sheets', 'v4', http, f"{settings.GOOGLE_SHEETS_API_URL}/")
+            self.backend = DiscoveryGoogleBackend(self.sheets, self.drive, self.executor, self.credentials,
+                                                  scheduler=self.scheduler)
+        self.sheet_tabs = SheetTabCache(self.backend)
+        self.sheet_partitions = SheetPartitions(self.backend, self.sheet_tabs)
+        self.drive_folders = DriveFolderCache()
+        self.upload_slots = asyncio.Semaphore(settings.DRIVE_UPLOAD_CONCURRENCY)
+        self.attachment_index = AttachmentIndex() if settings.ATTACHMENT_DEDUP_ENABLED else None
+        self.feedback_mirror = FeedbackMirror() if settings.FEEDBACK_MIRROR_ENABLED else None
+        logger.info(f"Google clients ready (backend={self.backend.name.value}, pool_size={self.pool_size}).")
+
+    def _new_http(self):
+        import google_auth_httplib2
+        import httplib2
+
+        return google_auth_httplib2.AuthorizedHttp(self.credentials, http=httplib2.Http(timeout=self.timeout))
+
+    def acquire(self):
+        try:
+            http = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.pool_size
+                if can_create:
+                    self._created += 1
+                else:
+                    self._waits += 1
+            http = self._new_http() if can_create else self._pool.get()
+        with self._lock:
+            self._in_use += 1
+        return http
+
+    def release(self, http):
+        with self._lock:
+            self._in_use -= 1
+        self._pool.put_nowait(http)
+
+    def record_error(self, error: Exception):
+        with self._lock:
+            self._errors += 1
+            self._last_error = f"{type(error).__name__}: {error}"
+
+    async def warm_up(self):
+        """
+        Fetch the first access token (from the token cache when another worker holds a fresh
+        one) and start its background refresh, preload the spreadsheet tabs and the partition
+        manifest, which also opens the first connection, then mark the registry ready. Until
+        that has all succeeded the worker reports not ready, and the warm-up is retried with
+        backoff, so a worker never runs without its partition manifest.
+        """
+        started = time.perf_counter()
+        self.backend.tokens.start()
+        while True:
+            self.warm_up_attempts += 1
+            try:
+                await self.backend.tokens.refresh()
+                await self.sheet_tabs.refresh(force=True)
+                await self.sheet_partitions.load()
+                break
+            except Exception as e:
+                self.warm_up_error = f"{type(e).__name__}: {e}"
+                delay = min(2 ** self.warm_up_attempts, WARM_UP_MAX_RETRY_DELAY) * (0.5 + random.random() / 2)
+                logger.warning(f"Google clients warm-up failed ({self.warm_up_error}); retrying in {delay:.1f}s.")
+                await asyncio.sleep(delay)
+        self.warm_up_seconds = round(time.perf_counter() - started, 3)
+        self.warm_up_error = None
+        self.ready = True
+        logger.info(f"Google clients warmed up in {self.warm_up_seconds}s.")
+
+    async def aclose(self):
+        await self.sheet_batcher.drain()
+        await self.backend.aclose()
+        self.close()
+
+    def close(self):
+        self.executor.shutdown()
+        if self.attachment_index:
+            self.attachment_index.close()
+        if self.feedback_mirror:
+            self.feedback_mirror.close()
+        while True:
+            try:
+                http = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            close = getattr(http.http, "close", None)
+            if close:
+                close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pool_size": self.pool_size,
+                "connections": self._created,
+                "in_use": self._in_use,
+                "idle": self._pool.qsize(),
+                "waits": self._waits,
+                "errors": self._errors,
+                "last_error": self._last_error,
+                "credentials_valid": self.credentials.valid,
+                "uptime_seconds": round(time.time() - self._created_at, 1),
+                "ready": self.ready,
+                "warm_up_seconds": self.warm_up_seconds,
+                "warm_up_attempts": self.warm_up_attempts,
+                "warm_up_error": self.warm_up_error,
+                **self.backend.stats(),
+                "rate_limits": self.scheduler.stats(),
+                "circuit_breakers": self.scheduler.breaker_stats(),
+                "deadline_exceeded": self.scheduler.deadline_exceeded,
+                "sheet_batcher": self.sheet_batcher.stats(),
+                "sheet_tabs": self.sheet_tabs.stats(),
+                "sheet_partitions": self.sheet_partitions.stats(),
+                "drive_folders": self.drive_folders.stats(),
+                "attachment_index": self.attachment_index.stats() if self.attachment_index else None,
+                "feedback_mirror": self.feedback_mirror.stats() if self.feedback_mirror else None,
+            }
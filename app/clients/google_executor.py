@@ -0,0 +1,63 @@
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core import settings
+
+logger = logging.getLogger(__name__)
+
+
+class GoogleExecutor:
+    """
+    Dedicated bounded thread pool for the blocking googleapiclient/httplib2 calls, so a slow
+    Drive upload never stalls the event loop. Every call gets a timeout and the pool reports
+    how many calls are queued behind the busy workers.
+    """
+
+    def __init__(self, max_workers: int = None, timeout: float = None):
+        self.max_workers = max_workers or settings.GOOGLE_EXECUTOR_MAX_WORKERS
+        self.timeout = timeout or settings.GOOGLE_CALL_TIMEOUT
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="google-api")
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._running = 0
+        self._completed = 0
+        self._timeouts = 0
+
+    def _invoke(self, fn, *args, **kwargs):
+        with self._lock:
+            self._running += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+
+    async def run(self, fn, *args, timeout: float = None, **kwargs):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._submitted += 1
+        future = loop.run_in_executor(self._executor, functools.partial(self._invoke, fn, *args, **kwargs))
+        try:
+            return await asyncio.wait_for(future, timeout or self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._timeouts += 1
+            logger.warning(f"Google call {getattr(fn, '__qualname__', fn)} timed out after {timeout or self.timeout}s")
+            raise
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "running": self._running,
+                "queued": self._submitted - self._completed - self._running,
+                "completed": self._completed,
+                "timeouts": self._timeouts,
+            }
@@ -0,0 +1,240 @@
+import asyncio
+import logging
+import random
+import time
+
+from app.clients.circuit_breaker import CircuitBreaker
+from app.clients.errors import GoogleApiError, GoogleApiTimeout, GoogleDeadlineExceeded
+from app.core import settings
+from app.core.deadline import time_left
+from app.core.metrics import GOOGLE_CALL_DURATION, GOOGLE_CALL_RETRIES
+
+logger = logging.getLogger(__name__)
+
+SHEETS_READ = "sheets_read"
+SHEETS_WRITE = "sheets_write"
+DRIVE = "drive"
+SHEETS = "sheets"
+
+# Seconds an attempt's timeout must be cut by the request's deadline before its timeout is put down
+# to the budget rather than the API
+BUDGET_CAP_SLACK = 1.0
+
+
+def api_name(operation: str) -> str:
+    return DRIVE if operation.startswith("drive.") else SHEETS
+
+
+def quota_bucket(operation: str) -> str:
+    """Map a `<api>.<resource>.<method>` operation name to the quota it counts against."""
+    if operation.startswith("drive."):
+        return DRIVE
+    return SHEETS_READ if operation.endswith(".get") else SHEETS_WRITE
+
+
+def is_idempotent(operation: str) -> bool:
+    return operation.endswith((".get", ".list"))
+
+
+def retry_delay(attempt: int, retry_after: float = None) -> float:
+    """Jittered exponential backoff, never shorter than what the server asked for."""
+    delay = min(settings.GOOGLE_RETRY_BASE_DELAY * 2 ** (attempt - 1), settings.GOOGLE_RETRY_MAX_DELAY)
+    delay *= 0.5 + random.random() / 2
+    return max(delay, retry_after or 0)
+
+
+class TokenBucket:
+    """
+    Paces calls to `rate` per second with bursts of up to `capacity`. Waiters are served in
+    arrival order; `pause()` holds everyone back after the API has pushed back with a 429.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def tokens(self) -> float:
+        self._refill(time.monotonic())
+        return self._tokens
+
+    @property
+    def paused_for(self) -> float:
+        return max(0.0, self._paused_until - time.monotonic())
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> float:
+        """Take one token, returning how long the caller had to wait for it."""
+        started = time.monotonic()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    break
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+        return time.monotonic() - started
+
+
+class _QuotaStats:
+
+    def __init__(self):
+        self.calls = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.retries = 0
+        self.rate_limited = 0
+        self.gave_up = 0
+
+
+class GoogleCallScheduler:
+    """
+    Central pacing and retry for Sheets/Drive calls. Each quota (Sheets reads, Sheets writes,
+    Drive queries) has its own token bucket sized from settings; a rate of 0 disables pacing
+    for that quota. Retryable failures of read-only calls (429, rate-limit 403s, 5xx, timeouts)
+    are retried with jittered exponential backoff that honors Retry-After; writes are only
+    retried when Google provably didn't apply them (rate limits, connection never made), and
+    anything else is raised straight away. Each API also has a CircuitBreaker that refuses calls while
+    it is down, and inside a `deadline()` every attempt, quota wait and backoff is cut to the
+    time left. The buckets are per worker process, so size the quotas for a single worker.
+    """
+
+    def __init__(self):
+        quotas = {
+            SHEETS_READ: (settings.GOOGLE_SHEETS_READS_PER_MINUTE / 60, settings.GOOGLE_SHEETS_BURST),
+            SHEETS_WRITE: (settings.GOOGLE_SHEETS_WRITES_PER_MINUTE / 60, settings.GOOGLE_SHEETS_BURST),
+            DRIVE: (settings.GOOGLE_DRIVE_QUERIES_PER_SECOND, settings.GOOGLE_DRIVE_BURST),
+        }
+        self.buckets = {name: TokenBucket(rate, max(1, burst)) for name, (rate, burst) in quotas.items() if rate > 0}
+        self._stats = {name: _QuotaStats() for name in quotas}
+        self.breakers = {api: CircuitBreaker(api) for api in (SHEETS, DRIVE)}
+        self._deadline_exceeded = 0
+
+    def available(self, *apis: str) -> bool:
+        """Whether calls to all `apis` would be attempted now; the hook for callers that can fall back."""
+        return all(self.breakers[api].available for api in apis)
+
+    def _time_left(self, operation: str) -> float | None:
+        left = time_left()
+        if left is not None and left <= 0:
+            self._deadline_exceeded += 1
+            raise GoogleDeadlineExceeded(operation)
+        return left
+
+    def _should_retry(self, operation: str, error: GoogleApiError) -> bool:
+        if not is_idempotent(operation):
+            # A write that timed out or failed with a 5xx may still have been applied (a duplicate row
+            # or folder if repeated); only retry when Google provably didn't apply it
+            return error.is_rate_limited or error.is_unsent
+        return error.is_retryable
+
+    async def call(self, operation: str, fn, *args, retry: bool = True, **kwargs):
+        """Await `fn(*args, **kwargs)` once a token for `operation`'s quota is available, retrying as needed."""
+        name = quota_bucket(operation)
+        bucket, stats = self.buckets.get(name), self._stats[name]
+        breaker = self.breakers[api_name(operation)]
+        timeout = kwargs.get("timeout")
+        attempt = 0
+        while True:
+            if bucket:
+                left = self._time_left(operation)
+                try:
+                    waited = await asyncio.wait_for(bucket.acquire(), left) if left is not None \
+                        else await bucket.acquire()
+                except asyncio.TimeoutError:
+                    self._deadline_exceeded += 1
+                    raise GoogleDeadlineExceeded(operation)
+                if waited > 0.001:
+                    stats.waited += 1
+                    stats.wait_seconds += waited
+                    stats.max_wait_seconds = max(stats.max_wait_seconds, waited)
+            left = self._time_left(operation)
+            call_timeout = timeout or settings.GOOGLE_CALL_TIMEOUT
+            kwargs["timeout"] = left if left is not None and left < call_timeout else timeout
+            # Only an attempt the budget actually cut short says nothing about the API's health; one that
+            # got (nearly) its full timeout counts against the breaker like any other
+            capped = left is not None and left < call_timeout - BUDGET_CAP_SLACK
+            breaker.before_call(operation)
+            stats.calls += 1
+            started = time.perf_counter()
+            try:
+                result = await fn(*args, **kwargs)
+            except GoogleApiError as e:
+                GOOGLE_CALL_DURATION.labels(operation, "timeout" if isinstance(e, GoogleApiTimeout) else str(e.status)
+                                            ).observe(time.perf_counter() - started)
+                if capped and isinstance(e, GoogleApiTimeout):
+                    breaker.abandon()
+                    self._deadline_exceeded += 1
+                    raise GoogleDeadlineExceeded(operation) from e
+                breaker.record(e)
+                if e.is_rate_limited:
+                    stats.rate_limited += 1
+                retryable = retry and self._should_retry(operation, e)
+                if retryable and attempt + 1 >= settings.GOOGLE_RETRY_MAX_ATTEMPTS:
+                    stats.gave_up += 1
+                    retryable = False
+                attempt += 1
+                delay = retry_delay(attempt, e.retry_after)
+                left = time_left()
+                if retryable and left is not None and delay >= left:
+                    # Waiting would outlast the request's budget
+                    stats.gave_up += 1
+                    retryable = False
+                if not retryable:
+                    GOOGLE_CALL_RETRIES.labels(operation).observe(attempt - 1)
+                    raise
+                if e.is_rate_limited and bucket:
+                    # The quota is exhausted for everyone, not just this caller
+                    bucket.pause(delay)
+                stats.retries += 1
+                logger.warning(f"{e}; retry {attempt}/{settings.GOOGLE_RETRY_MAX_ATTEMPTS - 1} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+            except BaseException:
+                breaker.abandon()
+                raise
+            else:
+                breaker.record()
+                GOOGLE_CALL_DURATION.labels(operation, "ok").observe(time.perf_counter() - started)
+                GOOGLE_CALL_RETRIES.labels(operation).observe(attempt)
+                return result
+
+    @property
+    def deadline_exceeded(self) -> int:
+        return self._deadline_exceeded
+
+    def breaker_stats(self) -> dict:
+        return {api: breaker.stats() for api, breaker in self.breakers.items()}
+
+    def stats(self) -> dict:
+        result = {}
+        for name, stats in self._stats.items():
+            bucket = self.buckets.get(name)
+            result[name] = {
+                "tokens": round(bucket.tokens, 2) if bucket else None,
+                "rate_per_second": round(bucket.rate, 3) if bucket else None,
+                "capacity": bucket.capacity if bucket else None,
+                "paused_seconds": round(bucket.paused_for, 2) if bucket else 0,
+                "calls": stats.calls,
+                "waited": stats.waited,
+                "wait_seconds": round(stats.wait_seconds, 3),
+                "max_wait_seconds": round(stats.max_wait_seconds, 3),
+                "retries": stats.retries,
+                "rate_limited": stats.rate_limited,
+                "gave_up": stats.gave_up,
+            }
+        return result
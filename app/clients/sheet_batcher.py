@@ -0,0 +1,95 @@
+import asyncio
+import contextvars
+import logging
+import time
+
+from app.core import settings
+from app.core.deadline import deadline, time_left
+
+logger = logging.getLogger(__name__)
+
+
+class SheetAppendBatcher:
+    """
+    Coalesces rows bound for the same sheet into a single values.append. A batch is flushed
+    when it reaches `max_rows` or `linger` seconds after its first row arrived, and every
+    caller waiting on it resolves (or fails) together when the append commits. Batches are
+    written by `flush(rows, sheet_name)`, bound once for the whole registry rather than taken
+    from whichever request happened to open the batch. The flush runs in a fresh context, so no
+    waiter's deadline or timing spans govern it; it gets the latest deadline among its waiters.
+    """
+
+    def __init__(self, flush=None, max_rows: int = None, linger: float = None):
+        self.flush = flush
+        self.max_rows = max_rows or settings.SHEETS_BATCH_MAX_ROWS
+        self.linger = settings.SHEETS_BATCH_LINGER if linger is None else linger
+        self._batches: dict[str, list] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._flushing: set[asyncio.Task] = set()
+        self._api_calls = 0
+        self._rows = 0
+
+    async def append(self, sheet_name: str, rows: list[list]):
+        if self.linger <= 0:
+            await self._commit(sheet_name, [(rows, None, None)])
+            return
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        left = time_left()
+        batch = self._batches.setdefault(sheet_name, [])
+        batch.append((rows, future, None if left is None else time.monotonic() + left))
+        if sum(len(item[0]) for item in batch) >= self.max_rows:
+            self._flush(sheet_name)
+        elif sheet_name not in self._timers:
+            self._timers[sheet_name] = loop.call_later(self.linger, self._flush, sheet_name)
+        await future
+
+    def _flush(self, sheet_name: str):
+        timer = self._timers.pop(sheet_name, None)
+        if timer:
+            timer.cancel()
+        batch = self._batches.pop(sheet_name, None)
+        if not batch:
+            return
+        # Called from a timer or the request that filled the batch; either way not the batch's own context
+        task = contextvars.Context().run(asyncio.create_task, self._commit(sheet_name, batch))
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    async def _commit(self, sheet_name: str, batch: list):
+        rows = [row for item_rows, _, _ in batch for row in item_rows]
+        expiries = [expires_at for _, _, expires_at in batch]
+        # Unbounded if any waiter is (e.g. a queued job)
+        budget = None if None in expiries else max(expiries) - time.monotonic()
+        self._api_calls += 1
+        self._rows += len(rows)
+        try:
+            with deadline(budget):
+                await self.flush(rows, sheet_name)
+        except Exception as e:
+            if batch[0][1] is None:
+                raise
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for _, future, _ in batch:
+                if future and not future.done():
+                    future.set_result(None)
+
+    async def drain(self):
+        for sheet_name in list(self._batches):
+            self._flush(sheet_name)
+        if self._flushing:
+            await asyncio.gather(*self._flushing, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "max_rows": self.max_rows,
+            "linger_seconds": self.linger,
+            "pending_rows": sum(len(rows) for batch in self._batches.values() for rows, _, _ in batch),
+            "api_calls": self._api_calls,
+            "rows": self._rows,
+            "rows_per_call": round(self._rows / self._api_calls, 2) if self._api_calls else 0,
+        }
@@ -0,0 +1,288 @@
+import asyncio
+import fcntl
+import logging
+import re
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+
+from app.clients.errors import GoogleApiError
+from app.clients.sheet_tabs import SheetTabCache
+from app.constant import FEEDBACK_SHEET_COLUMNS, FeedbackTypeEnum
+from app.core import settings
+
+logger = logging.getLogger(__name__)
+
+SPREADSHEET_MIME_TYPE = "application/vnd.google-apps.spreadsheet"
+PARTITION_TITLE = re.compile(r"^(?P<kind>[A-Za-z]+)(?:_(?P<year>\d{4})(?:_(?P<month>\d{2}))?)?(?:_(?P<seq>\d{1,3}))?$")
+PERIOD_PATTERNS = {"month": r"_(?P<period>\d{4}_\d{2})", "year": r"_(?P<period>\d{4})"}
+# period and seq are spelled out because a title alone is ambiguous (`Consultation_2026_10` is
+# October 2026 by month, or the 10th tab of 2026 by year); older manifests stop at created_at
+MANIFEST_COLUMNS = ("kind", "title", "spreadsheet_id", "created_at", "period", "seq")
+
+
+def partition_period(now: datetime) -> str:
+    if settings.SHEETS_PARTITION_PERIOD == "month":
+        return now.strftime("%Y_%m")
+    if settings.SHEETS_PARTITION_PERIOD == "year":
+        return now.strftime("%Y")
+    return ""
+
+
+def partition_title(kind: FeedbackTypeEnum, period: str, seq: int) -> str:
+    return "_".join(part for part in (kind.value, period, str(seq) if seq > 1 else "") if part)
+
+
+def partition_kind(title: str) -> FeedbackTypeEnum | None:
+    """Feedback kind of a tab: the legacy `Warranty` tab or a partition such as `Warranty_2026_10_2`."""
+    match = PARTITION_TITLE.match(title)
+    try:
+        return FeedbackTypeEnum(match.group("kind")) if match else None
+    except ValueError:
+        return None
+
+
+def parse_partition_title(title: str) -> tuple[str, int] | None:
+    """(period, seq) of a partition title named under the configured SHEETS_PARTITION_PERIOD."""
+    period_pattern = PERIOD_PATTERNS.get(settings.SHEETS_PARTITION_PERIOD, "")
+    match = re.match(rf"^[A-Za-z]+{period_pattern}(?:_(?P<seq>\d{{1,3}}))?$", title)
+    if match is None:
+        return None
+    return match.groupdict().get("period") or "", int(match.group("seq") or 1)
+
+
+def partition_grid(kind: FeedbackTypeEnum) -> tuple[int, int]:
+    """(rowCount, columnCount) for a new tab: only the schema's columns, and a few rows that appends grow."""
+    return settings.SHEETS_PARTITION_INITIAL_ROWS, len(FEEDBACK_SHEET_COLUMNS[kind])
+
+
+@dataclass
+class SheetPartition:
+    kind: FeedbackTypeEnum
+    title: str
+    spreadsheet_id: str
+    period: str
+    seq: int
+    created_at: str = ""
+
+
+class SheetPartitions:
+    """
+    Routes each feedback kind to its current partition tab (`Warranty_2026_10`, then
+    `Warranty_2026_10_2` once SHEETS_PARTITION_MAX_ROWS is reached) and moves on to a new
+    spreadsheet once the current one holds SHEETS_SPREADSHEET_MAX_CELLS grid cells. Partition and
+    spreadsheet names are deterministic, so workers that roll over at the same time converge on
+    the same tab. Every partition is listed in the SHEETS_MANIFEST_TAB tab of the primary
+    spreadsheet for readers, and served by GET /api/feedbacks/partitions. Rollovers are
+    serialized across gunicorn workers by an flock (SHEETS_PARTITION_LOCK_PATH), under which the
+    manifest is re-read first, so workers adopt each other's new tab, spreadsheet and manifest row
+    instead of adding their own.
+    """
+
+    def __init__(self, backend, sheet_tabs: SheetTabCache):
+        self.backend = backend
+        self.primary_id = sheet_tabs.spreadsheet_id
+        self._tab_caches: dict[str, SheetTabCache] = {self.primary_id: sheet_tabs}
+        self._spreadsheets: list[str] = [self.primary_id]
+        self._manifest: dict[str, SheetPartition] = {}
+        self._current: dict[FeedbackTypeEnum, SheetPartition] = {}
+        self._full: set[str] = set()
+        self._locks = {kind: asyncio.Lock() for kind in FeedbackTypeEnum}
+        self._spreadsheet_lock = asyncio.Lock()
+        self.lock_path = Path(settings.SHEETS_PARTITION_LOCK_PATH)
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        self._tabs_created = 0
+        self._spreadsheet_rollovers = 0
+
+    def tabs(self, spreadsheet_id: str) -> SheetTabCache:
+        if spreadsheet_id not in self._tab_caches:
+            self._tab_caches[spreadsheet_id] = SheetTabCache(self.backend, spreadsheet_id=spreadsheet_id)
+        return self._tab_caches[spreadsheet_id]
+
+    def _lock(self):
+        lock_file = open(self.lock_path, "a")
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    @staticmethod
+    def _unlock(lock_file):
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
+
+    def _remember(self, partition: SheetPartition):
+        self._manifest.setdefault(partition.title, partition)
+        if partition.spreadsheet_id not in self._spreadsheets:
+            self._spreadsheets.append(partition.spreadsheet_id)
+        current = self._current.get(partition.kind)
+        if current is None or (partition.period, partition.seq) > (current.period, current.seq):
+            self._current[partition.kind] = partition
+
+    async def load(self):
+        """Read the manifest tab; the latest partition of each kind becomes its current one."""
+        range_ = f"'{settings.SHEETS_MANIFEST_TAB}'!A1:{chr(ord('A') + len(MANIFEST_COLUMNS) - 1)}"
+        try:
+            rows = (await self.backend.get_values(self.primary_id, range_)).get("values", [])
+        except GoogleApiError as e:
+            if not e.is_missing_range:
+                raise
+            rows = []
+        for row in rows:
+            entry = dict(zip(MANIFEST_COLUMNS, row))
+            kind = partition_kind(entry.get("title", ""))
+            if kind is None or not entry.get("spreadsheet_id"):
+                continue
+            if str(entry.get("seq", "")).isdigit():
+                period, seq = str(entry.get("period", "")), int(entry["seq"])
+            else:
+                parsed = parse_partition_title(entry["title"])
+                if parsed is None:
+                    # Named under another SHEETS_PARTITION_PERIOD; still read, never current again
+                    parsed = ("", 1)
+                period, seq = parsed
+            self._remember(SheetPartition(kind, entry["title"], entry["spreadsheet_id"], period, seq,
+                                          entry.get("created_at", "")))
+
+    def observe(self, partition: SheetPartition, last_row: int | None, rows: int):
+        """Record an append to `partition`; past SHEETS_PARTITION_MAX_ROWS the next resolve rolls over."""
+        self.tabs(partition.spreadsheet_id).grow(partition.title, rows)
+        if last_row and settings.SHEETS_PARTITION_MAX_ROWS and last_row >= settings.SHEETS_PARTITION_MAX_ROWS:
+            self._full.add(partition.title)
+
+    def _has_room(self, spreadsheet_id: str, kind: FeedbackTypeEnum = None) -> bool:
+        """Whether the spreadsheet is under SHEETS_SPREADSHEET_MAX_CELLS, with space for a new `kind` tab if given."""
+        if not settings.SHEETS_SPREADSHEET_MAX_CELLS:
+            return True
+        rows, columns = partition_grid(kind) if kind else (0, 0)
+        return self.tabs(spreadsheet_id).cells() + rows * columns < settings.SHEETS_SPREADSHEET_MAX_CELLS
+
+    def _partition_count(self, spreadsheet_id: str) -> int:
+        return sum(partition.spreadsheet_id == spreadsheet_id for partition in self._manifest.values())
+
+    def _is_current(self, partition: SheetPartition | None, period: str) -> bool:
+        # A spreadsheet whose only partition is this one can't do better by rolling over (the
+        # cell limit is below what a new spreadsheet starts with); the row limit still applies
+        return (partition is not None and partition.period == period and partition.title not in self._full
+                and (self._has_room(partition.spreadsheet_id) or self._partition_count(partition.spreadsheet_id) <= 1))
+
+    async def resolve(self, kind: FeedbackTypeEnum, create, now: datetime = None) -> SheetPartition:
+        """
+        The partition new `kind` rows go to, creating its tab with `create(title, spreadsheet_id,
+        grid)` (and a new spreadsheet and manifest row) when the previous one is out of date or full.
+        """
+        period = partition_period(now or datetime.now())
+        partition = self._current.get(kind)
+        if partition is not None:
+            # No-op until SHEETS_TAB_CACHE_TTL expires; corrects the grid sizes `observe` estimates
+            await self.tabs(partition.spreadsheet_id).refresh()
+        if self._is_current(partition, period):
+            return partition
+        async with self._locks[kind]:
+            partition = self._current.get(kind)
+            if self._is_current(partition, period):
+                return partition
+            lock_file = await asyncio.to_thread(self._lock)
+            try:
+                return await self._roll_over(kind, period, create)
+            finally:
+                await asyncio.to_thread(self._unlock, lock_file)
+
+    async def _roll_over(self, kind: FeedbackTypeEnum, period: str, create) -> SheetPartition:
+        # Another worker may have rolled over while this one waited for the lock
+        await self.load()
+        partition = self._current.get(kind)
+        if self._is_current(partition, period):
+            # Its tab is recreated here if it was deleted
+            spreadsheet_id, seq = partition.spreadsheet_id, partition.seq
+            tabs = self.tabs(spreadsheet_id)
+        else:
+            seq = partition.seq + 1 if partition and partition.period == period else 1
+            spreadsheet_id = self._spreadsheets[-1]
+            tabs = self.tabs(spreadsheet_id)
+            await tabs.refresh()
+            if not self._has_room(spreadsheet_id, kind) and self._partition_count(spreadsheet_id):
+                spreadsheet_id = await self._next_spreadsheet(after=spreadsheet_id)
+                tabs = self.tabs(spreadsheet_id)
+                await tabs.refresh(force=True)
+        title = partition_title(kind, period, seq)
+        grid = partition_grid(kind)
+        await tabs.ensure(title, create=lambda name: create(name, spreadsheet_id, grid))
+        partition = self._manifest.get(title) or SheetPartition(kind, title, spreadsheet_id, period, seq,
+                                                                datetime.now().isoformat(timespec="seconds"))
+        if title not in self._manifest:
+            await self._append_manifest(partition)
+            self._tabs_created += 1
+        self._remember(partition)
+        self._current[kind] = partition
+        logger.info(f"Feedback rows for {kind.value} now go to '{title}' in spreadsheet {spreadsheet_id}.")
+        return partition
+
+    async def _append_manifest(self, partition: SheetPartition):
+        title = settings.SHEETS_MANIFEST_TAB
+        tabs = self.tabs(self.primary_id)
+        sheet_id = await tabs.ensure(title, create=lambda name: self.backend.batch_update(self.primary_id, [{
+            "addSheet": {"properties": {"title": name, "gridProperties": {
+                "rowCount": settings.SHEETS_PARTITION_INITIAL_ROWS, "columnCount": len(MANIFEST_COLUMNS)}}}}]))
+        _, columns = tabs.grid(title) or (0, len(MANIFEST_COLUMNS))
+        if columns < len(MANIFEST_COLUMNS):
+            # A manifest created before the period and seq columns
+            await self.backend.batch_update(self.primary_id, [{"appendDimension": {
+                "sheetId": sheet_id, "dimension": "COLUMNS", "length": len(MANIFEST_COLUMNS) - columns}}])
+            tabs.invalidate()
+        row = [partition.kind.value, partition.title, partition.spreadsheet_id, partition.created_at,
+               partition.period, partition.seq]
+        await self.backend.append_values(self.primary_id, f"'{title}'!A1", [row])
+
+    async def _next_spreadsheet(self, after: str) -> str:
+        """Find or create the spreadsheet following `after` (under the rollover lock), named after its position."""
+        async with self._spreadsheet_lock:
+            if self._spreadsheets[-1] != after:
+                # Another kind rolled over first
+                return self._spreadsheets[-1]
+            return await self._find_or_create_spreadsheet()
+
+    async def _find_or_create_spreadsheet(self) -> str:
+        name = f"{settings.SHEETS_ROLLOVER_SPREADSHEET_NAME} {len(self._spreadsheets) + 1}"
+        parent = settings.SHEETS_ROLLOVER_FOLDER_ID
+        q = f"name = '{name}' and mimeType = '{SPREADSHEET_MIME_TYPE}' and trashed = false"
+        if parent:
+            q += f" and '{parent}' in parents"
+        files = (await self.backend.list_files(q=q)).get("files", [])
+        if files:
+            spreadsheet_id = files[0]["id"]
+        else:
+            metadata = {"name": name, "mimeType": SPREADSHEET_MIME_TYPE, **({"parents": [parent]} if parent else {})}
+            spreadsheet_id = (await self.backend.create_file(metadata))["id"]
+            logger.warning(f"Spreadsheet {self._spreadsheets[-1]} reached {settings.SHEETS_SPREADSHEET_MAX_CELLS} "
+                           f"cells; continuing in new spreadsheet '{name}' ({spreadsheet_id}).")
+        self._spreadsheets.append(spreadsheet_id)
+        self._spreadsheet_rollovers += 1
+        return spreadsheet_id
+
+    def invalidate(self, partition: SheetPartition):
+        """The partition's tab is gone (deleted or renamed in the UI); recreate it on the next resolve."""
+        self.tabs(partition.spreadsheet_id).invalidate()
+        if self._current.get(partition.kind) is partition:
+            del self._current[partition.kind]
+        self._manifest.pop(partition.title, None)
+
+    def sources(self) -> list[tuple[str, str]]:
+        """(spreadsheet_id, tab title) of every feedback tab: legacy tabs of the primary spreadsheet and all partitions."""
+        sources = {(self.primary_id, title) for title in self._tab_caches[self.primary_id].titles()
+                   if partition_kind(title)}
+        sources.update((partition.spreadsheet_id, partition.title) for partition in self._manifest.values())
+        return sorted(sources)
+
+    def partitions(self, kind: FeedbackTypeEnum = None) -> list[dict]:
+        return [{**asdict(partition), "kind": partition.kind.value, "current": self._current.get(partition.kind) is partition}
+                for partition in sorted(self._manifest.values(), key=lambda p: (p.kind.value, p.period, p.seq))
+                if kind is None or partition.kind == kind]
+
+    def stats(self) -> dict:
+        return {
+            "period": settings.SHEETS_PARTITION_PERIOD,
+            "current": {kind.value: partition.title for kind, partition in self._current.items()},
+            "partitions": len(self._manifest),
+            "spreadsheets": {spreadsheet_id: self.tabs(spreadsheet_id).cells() for spreadsheet_id in self._spreadsheets},
+            "tabs_created": self._tabs_created,
+            "spreadsheet_rollovers": self._spreadsheet_rollovers,
+        }
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import time
+
+from app.core import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SheetTabCache:
+    """
+    In-process cache of the spreadsheet's tab titles -> sheetIds, so appends no longer pay a
+    full spreadsheets.get. Refreshes and tab creation are single-flighted: concurrent requests
+    for a brand-new tab share one addSheet call.
+    """
+
+    def __init__(self, backend, spreadsheet_id: str = None, ttl: float = None):
+        self.backend = backend
+        self.spreadsheet_id = spreadsheet_id or settings.GOOGLE_SPREADSHEET_ID
+        self.ttl = settings.SHEETS_TAB_CACHE_TTL if ttl is None else ttl
+        self._tabs: dict[str, int] = {}
+        self._grids: dict[str, tuple[int, int]] = {}
+        self._loaded_at = 0.0
+        self._refresh_lock = asyncio.Lock()
+        self._creating: dict[str, asyncio.Task] = {}
+        self._hits = 0
+        self._refreshes = 0
+
+    def _is_stale(self) -> bool:
+        return time.monotonic() - self._loaded_at > self.ttl
+
+    async def refresh(self, force: bool = False):
+        loaded_at = self._loaded_at
+        async with self._refresh_lock:
+            if self._loaded_at != loaded_at or not (force or self._is_stale()):
+                return
+            metadata = await self.backend.get_spreadsheet(
+                self.spreadsheet_id, fields="sheets.properties(sheetId,title,gridProperties(rowCount,columnCount))")
+            properties = [sheet['properties'] for sheet in metadata.get('sheets', [])]
+            self._tabs = {tab['title']: tab.get('sheetId') for tab in properties}
+            self._grids = {tab['title']: (tab.get('gridProperties', {}).get('rowCount', 0),
+                                          tab.get('gridProperties', {}).get('columnCount', 0)) for tab in properties}
+            self._loaded_at = time.monotonic()
+            self._refreshes += 1
+
+    def add(self, title: str, sheet_id: int = None, grid: tuple[int, int] = (0, 0)):
+        self._tabs[title] = sheet_id
+        self._grids.setdefault(title, grid)
+
+    def grow(self, title: str, rows: int):
+        """Account for rows an INSERT_ROWS append added to the grid, until the next refresh."""
+        row_count, column_count = self._grids.get(title, (0, 0))
+        self._grids[title] = (row_count + rows, column_count)
+
+    def cells(self) -> int:
+        """Grid cells allocated across all tabs, the figure Google's per-spreadsheet cell limit counts."""
+        return sum(row_count * column_count for row_count, column_count in self._grids.values())
+
+    def invalidate(self):
+        self._loaded_at = 0.0
+
+    def get(self, title: str) -> int | None:
+        return self._tabs.get(title)
+
+    def grid(self, title: str) -> tuple[int, int] | None:
+        """(rowCount, columnCount) of `title` as last seen."""
+        return self._grids.get(title)
+
+    def titles(self) -> list[str]:
+        return list(self._tabs)
+
+    async def ensure(self, title: str, create) -> int | None:
+        """Return the sheetId of `title`, calling `create(title)` exactly once if the tab is missing."""
+        if self._is_stale():
+            await self.refresh()
+        if title in self._tabs:
+            self._hits += 1
+            return self._tabs[title]
+
+        task = self._creating.get(title)
+        if task is None:
+            task = asyncio.create_task(self._create(title, create))
+            self._creating[title] = task
+            task.add_done_callback(lambda _: self._creating.pop(title, None))
+        return await asyncio.shield(task)
+
+    async def _create(self, title: str, create) -> int | None:
+        try:
+            reply = await create(title)
+        except Exception:
+            # Another worker may have created the tab in the meantime.
+            await self.refresh(force=True)
+            if title in self._tabs:
+                return self._tabs[title]
+            raise
+        replies = (reply or {}).get('replies') or [{}]
+        properties = replies[0].get('addSheet', {}).get('properties', {})
+        grid = properties.get('gridProperties', {})
+        self.add(title, properties.get('sheetId'), (grid.get('rowCount', 0), grid.get('columnCount', 0)))
+        return properties.get('sheetId')
+
+    def stats(self) -> dict:
+        return {
+            "tabs": len(self._tabs),
+            "cells": self.cells(),
+            "hits": self._hits,
+            "refreshes": self._refreshes,
+            "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None,
+        }
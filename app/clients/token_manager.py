@@ -0,0 +1,165 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import random
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from app.core import settings
+
+logger = logging.getLogger(__name__)
+
+# google-auth refreshes a token inline once it is within 3m45s of expiry; handing out only tokens
+# with more left than this keeps the authorized HTTP connections from ever doing so
+MIN_TOKEN_LIFETIME = 300
+# Spreads the workers' refreshes so one mints and the others find its token in the file
+REFRESH_JITTER = 10
+MAX_RETRY_DELAY = 60
+
+
+class TokenManager:
+    """
+    Keeps the service account's access token fresh so requests never wait on token minting. A
+    background task replaces the token GOOGLE_TOKEN_REFRESH_AHEAD seconds before it expires and
+    applies it to the shared credentials. Refreshes are single-flight within the process and
+    shared across gunicorn workers through a small JSON file guarded by an flock
+    (GOOGLE_TOKEN_CACHE_PATH): the first worker to take the lock calls `mint()` and the others
+    pick its token up from the file. `get()` only mints inline when no usable token exists yet,
+    e.g. while the token endpoint has been failing for longer than the refresh-ahead window.
+    """
+
+    def __init__(self, credentials, mint, path: str = None, refresh_ahead: float = None):
+        self.credentials = credentials
+        self.mint = mint
+        self.path = Path(path or settings.GOOGLE_TOKEN_CACHE_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock_path = self.path.with_suffix(self.path.suffix + ".lock")
+        self.refresh_ahead = max(settings.GOOGLE_TOKEN_REFRESH_AHEAD if refresh_ahead is None else refresh_ahead,
+                                 MIN_TOKEN_LIFETIME)
+        self._token = None
+        self._expires_at = 0.0
+        self._refreshing: asyncio.Task | None = None
+        self._task: asyncio.Task | None = None
+        self._minted = 0
+        self._shared = 0
+        self._waits = 0
+        self._failures = 0
+        self._last_error = None
+
+    def _key(self) -> str:
+        scopes = " ".join(sorted(self.credentials.scopes or []))
+        return f"{self.credentials.service_account_email} {scopes}"
+
+    @property
+    def expires_in(self) -> float:
+        return self._expires_at - time.time()
+
+    def _due(self, entry: dict | None) -> bool:
+        return not entry or entry["expires_at"] - time.time() <= self.refresh_ahead
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write(self, tokens: dict):
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        # Access tokens are credentials; keep them readable by the service user only
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with open(fd, "w", encoding="utf-8") as f:
+            json.dump(tokens, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def _lock(self):
+        lock_file = open(self.lock_path, "a")
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    @staticmethod
+    def _unlock(lock_file):
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
+
+    def _apply(self, entry: dict):
+        self._token, self._expires_at = entry["token"], entry["expires_at"]
+        self.credentials.token = self._token
+        # google-auth keeps naive UTC expiries
+        self.credentials.expiry = datetime.fromtimestamp(self._expires_at, tz=timezone.utc).replace(tzinfo=None)
+
+    async def get(self) -> str:
+        """The current access token; only waits for a refresh when there is no usable one."""
+        if self._token is None or self.expires_in <= MIN_TOKEN_LIFETIME:
+            self._waits += 1
+            await self.refresh()
+        return self._token
+
+    async def refresh(self):
+        """Replace the token unless it has more than `refresh_ahead` seconds left; concurrent callers share one refresh."""
+        if self._refreshing is None:
+            self._refreshing = asyncio.create_task(self._refresh())
+            self._refreshing.add_done_callback(lambda _: setattr(self, "_refreshing", None))
+        await asyncio.shield(self._refreshing)
+
+    async def _refresh(self):
+        key = self._key()
+        entry = (await asyncio.to_thread(self._read)).get(key)
+        if self._due(entry):
+            lock_file = await asyncio.to_thread(self._lock)
+            try:
+                tokens = await asyncio.to_thread(self._read)
+                entry = tokens.get(key)
+                if self._due(entry):
+                    token, expires_at = await self.mint()
+                    entry = tokens[key] = {"token": token, "expires_at": expires_at}
+                    await asyncio.to_thread(self._write, tokens)
+                    self._minted += 1
+                    logger.info(f"Minted a Google access token valid for {round(expires_at - time.time())}s.")
+                else:
+                    self._shared += 1
+            finally:
+                await asyncio.to_thread(self._unlock, lock_file)
+        elif entry["token"] != self._token:
+            self._shared += 1
+        self._apply(entry)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_forever())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _refresh_forever(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                self._failures += 1
+                self._last_error = f"{type(e).__name__}: {e}"
+                delay = min(2 ** self._failures, MAX_RETRY_DELAY)
+                logger.warning(f"Could not refresh the Google access token ({self._last_error}); retrying in {delay}s.")
+            else:
+                self._failures = 0
+                # Wake just after the refresh is due, so a worker that finds another's token in the file adopts it
+                delay = max(self.expires_in - self.refresh_ahead, 1) + random.uniform(0, REFRESH_JITTER)
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {
+            "expires_in_seconds": round(self.expires_in) if self._token else None,
+            "minted": self._minted,
+            "shared": self._shared,
+            "waits": self._waits,
+            "consecutive_failures": self._failures,
+            "last_error": self._last_error,
+        }
@@ -0,0 +1,25 @@
+import random
+
+from app.clients.errors import RETRYABLE_STATUSES
+from app.core import settings
+
+UPLOAD_CHUNK_GRANULARITY = 256 * 1024
+RETRYABLE_UPLOAD_STATUSES = RETRYABLE_STATUSES
+
+
+def upload_chunk_size() -> int:
+    """GOOGLE_UPLOAD_CHUNK_SIZE rounded down to the 256 KiB multiple resumable uploads require."""
+    return max(UPLOAD_CHUNK_GRANULARITY,
+               settings.GOOGLE_UPLOAD_CHUNK_SIZE // UPLOAD_CHUNK_GRANULARITY * UPLOAD_CHUNK_GRANULARITY)
+
+
+def stream_size(stream) -> int:
+    position = stream.tell()
+    stream.seek(0, 2)
+    size = stream.tell() - position
+    stream.seek(position)
+    return size
+
+
+def chunk_retry_delay(attempt: int) -> float:
+    return min(2 ** attempt, 32) * (0.5 + random.random() / 2)
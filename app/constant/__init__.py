@@ -1,3 +1,4 @@
 from .app_status import AppStatus
-from .feedback_constants import GOOGLE_SCOPES, FeedbackStatus, FEEDBACK_FIELD_LABELS, ServiceEnum, UrgencyLevelEnum
+from .feedback_constants import GOOGLE_SCOPES, FeedbackStatus, FEEDBACK_FIELD_LABELS, ServiceEnum, UrgencyLevelEnum, \
+    GoogleBackendType, FeedbackTypeEnum, FeedbackJobStatus, FEEDBACK_SHEET_COLUMNS, CircuitState
 from .master import ProjectBuildTypes, SwaggerPaths, BasePath
\ No newline at end of file
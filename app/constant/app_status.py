@@ -7,6 +7,11 @@ class AppStatus(Enum):
 
     ERROR_400_BAD_REQUEST = status.HTTP_400_BAD_REQUEST, 'BAD_REQUEST', 'Yêu cầu không hợp lệ.'
     ERROR_400_INVALID_DATA = status.HTTP_400_BAD_REQUEST, 'INVALID_DATA', 'Dữ liệu vào không hợp lệ: {description}'
+    ERROR_400_UNSUPPORTED_FILE_TYPE = status.HTTP_400_BAD_REQUEST, 'UNSUPPORTED_FILE_TYPE', 'Định dạng tệp không được hỗ trợ: {description}'
+    ERROR_404_NOT_FOUND = status.HTTP_404_NOT_FOUND, 'NOT_FOUND', 'Không tìm thấy dữ liệu: {description}'
+    ERROR_409_REQUEST_IN_PROGRESS = status.HTTP_409_CONFLICT, 'REQUEST_IN_PROGRESS', 'Yêu cầu với Idempotency-Key này đang được xử lý, vui lòng thử lại sau.'
+    ERROR_413_PAYLOAD_TOO_LARGE = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, 'PAYLOAD_TOO_LARGE', 'Dữ liệu tải lên quá lớn: {description}'
+    ERROR_422_IDEMPOTENCY_KEY_REUSED = status.HTTP_422_UNPROCESSABLE_ENTITY, 'IDEMPOTENCY_KEY_REUSED', 'Idempotency-Key đã được dùng cho một yêu cầu có nội dung khác.'
 
     ERROR_500_INTERNAL_SERVER_ERROR = status.HTTP_500_INTERNAL_SERVER_ERROR, 'INTERNAL_SERVER_ERROR', ('Đã xảy ra lỗi '
                                                                                                        'máy chủ nội '
@@ -40,6 +45,10 @@ class AppStatus(Enum):
                                                                                                        'Cảm ơn bạn đã '
                                                                                                        'kiên nhẫn.')
 
+    ERROR_503_SERVICE_UNAVAILABLE = status.HTTP_503_SERVICE_UNAVAILABLE, 'SERVICE_UNAVAILABLE', 'Dịch vụ Google đang quá tải, vui lòng thử lại sau: {description}'
+    ERROR_503_NOT_READY = status.HTTP_503_SERVICE_UNAVAILABLE, 'NOT_READY', 'Dịch vụ đang khởi động, vui lòng thử lại sau.'
+    ERROR_504_GATEWAY_TIMEOUT = status.HTTP_504_GATEWAY_TIMEOUT, 'GATEWAY_TIMEOUT', 'Hết thời gian chờ dịch vụ Google: {description}'
+
     @property
     def status_code(self):
         return self.value[0]
@@ -7,10 +7,40 @@ FEEDBACK_FIELD_LABELS = {
     "issue": "Vấn đề"
 }
 
+class GoogleBackendType(str, Enum):
+    DISCOVERY = "discovery"
+    ASYNC = "async"
+
+class CircuitState(str, Enum):
+    CLOSED = "CLOSED"
+    HALF_OPEN = "HALF_OPEN"
+    OPEN = "OPEN"
+
 class FeedbackStatus(str, Enum):
     OPEN = "OPEN"
     CLOSED = "CLOSED"
 
+class FeedbackTypeEnum(str, Enum):
+    CONSULTATION = "Consultation"
+    WARRANTY = "Warranty"
+    COMPLAINT = "Complaint"
+
+# Column order of each feedback sheet (FeedbackService writes rows in schema field order + created_at)
+FEEDBACK_SHEET_COLUMNS = {
+    FeedbackTypeEnum.CONSULTATION: ("full_name", "phone_number", "email", "conversation_code", "product_interest",
+                                    "conversation_summary", "created_at"),
+    FeedbackTypeEnum.WARRANTY: ("full_name", "phone_number", "email", "conversation_code", "product_type",
+                                "start_date", "issue_description", "image_urls", "created_at"),
+    FeedbackTypeEnum.COMPLAINT: ("full_name", "phone_number", "email", "conversation_code", "complaint_issue",
+                                 "image_urls", "urgency_level", "created_at"),
+}
+
+class FeedbackJobStatus(str, Enum):
+    PENDING = "PENDING"
+    PROCESSING = "PROCESSING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+
 class ServiceEnum(str, Enum):
     CHATBOT = "Chatbot"
     RETAIL = "Retail"
@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from .exceptions import validation_exception_handler, error_exception_handler
+from .exceptions import validation_exception_handler, error_exception_handler, google_api_exception_handler, \
+    google_error_status, app_exception_handler, internal_error_handler, AppHTTPException
+from .responses import FastJSONResponse, encode_response_object
 from .logger import *
 from .settings import settings
@@ -0,0 +1,30 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_deadline: ContextVar[float | None] = ContextVar("google_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: float):
+    """
+    Give the enclosed block (and tasks it spawns, through the context) `seconds` for its Google
+    calls, or less if an enclosing deadline ends sooner. GoogleCallScheduler caps every attempt,
+    quota wait and backoff to what is left; 0 or None leaves the block unbounded.
+    """
+    if not seconds:
+        yield
+        return
+    expires_at = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(expires_at if current is None else min(current, expires_at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def time_left() -> float | None:
+    """Seconds until the current deadline (negative once it has passed), or None outside one."""
+    expires_at = _deadline.get()
+    return None if expires_at is None else expires_at - time.monotonic()
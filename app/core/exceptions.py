@@ -1,19 +1,30 @@
-from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError, HTTPException
 from starlette.requests import Request
-from starlette.responses import JSONResponse
 
 from app.constant import AppStatus
+from app.core.responses import FastJSONResponse, STATIC_ERROR_BODIES, encode_error
 
 
-def make_error_response(app_status=AppStatus.ERROR_500_INTERNAL_SERVER_ERROR, detail=None):
-    if detail is None:
-        detail = {}
+class AppHTTPException(HTTPException):
+    """
+    HTTPException for an AppStatus, raised through `error_exception_handler`. Its body is the
+    pre-encoded one for statuses without a {description}, and is only encoded when it is sent
+    otherwise (services catch some of these and never send them).
+    """
 
-    return JSONResponse(
-        status_code=app_status.status_code,
-        content=jsonable_encoder({"detail": detail}),
-    )
+    def __init__(self, app_status: AppStatus, **kwargs):
+        message = app_status.message if app_status in STATIC_ERROR_BODIES else app_status.message.format(**kwargs)
+        super().__init__(status_code=app_status.status_code, detail={"name": app_status.name, "message": message})
+        self.app_status = app_status
+
+    @property
+    def body(self) -> bytes:
+        return STATIC_ERROR_BODIES.get(self.app_status) or encode_error(self.app_status, self.detail)
+
+
+def make_error_response(app_status=AppStatus.ERROR_500_INTERNAL_SERVER_ERROR, detail=None, **kwargs):
+    """Error response with `detail`, or the AppStatus name and message formatted with `kwargs`."""
+    return FastJSONResponse(status_code=app_status.status_code, content=encode_error(app_status, detail, **kwargs))
 
 
 def make_response_object(data, meta={}):
@@ -35,10 +46,26 @@ async def validation_exception_handler(request: Request, validation_error: Reque
 
 
 def error_exception_handler(app_status: AppStatus, **kwargs):
-    return HTTPException(
-        status_code=app_status.status_code,
-        detail={
-            "name": app_status.name,
-            "message": app_status.message.format(**kwargs),
-        }
-    )
+    return AppHTTPException(app_status, **kwargs)
+
+
+async def app_exception_handler(request: Request, app_error: AppHTTPException):
+    return FastJSONResponse(status_code=app_error.status_code, content=app_error.body, headers=app_error.headers)
+
+
+def google_error_status(error: Exception) -> AppStatus:
+    if getattr(error, "status", None) == 504:
+        return AppStatus.ERROR_504_GATEWAY_TIMEOUT
+    if getattr(error, "is_retryable", False):
+        # Still failing after the scheduler's retries
+        return AppStatus.ERROR_503_SERVICE_UNAVAILABLE
+    return AppStatus.ERROR_400_INVALID_DATA
+
+
+async def internal_error_handler(request: Request, error: Exception):
+    # Starlette logs the exception and re-raises it once the response is sent
+    return make_error_response(app_status=AppStatus.ERROR_500_INTERNAL_SERVER_ERROR)
+
+
+async def google_api_exception_handler(request: Request, google_error: Exception):
+    return make_error_response(app_status=google_error_status(google_error), description=str(google_error))
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import os
+import resource
+
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# prometheus_client picks its value backend when it is imported, so the multiprocess directory
+# has to be in the environment first (gunicorn.conf.py clears it when the master starts)
+if settings.PROMETHEUS_MULTIPROC_DIR:
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", settings.PROMETHEUS_MULTIPROC_DIR)
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+try:
+    from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+                                   generate_latest, multiprocess)
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+METRICS_ENABLED = settings.METRICS_ENABLED and PROMETHEUS_AVAILABLE
+
+HTTP_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+GOOGLE_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+RETRY_BUCKETS = (0, 1, 2, 3, 4, 5, 10)
+
+
+class _NoopMetric:
+    """Stand-in used when metrics are disabled, so call sites don't need to check."""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+
+if METRICS_ENABLED:
+    HTTP_REQUEST_DURATION = Histogram("reflectly_http_request_duration_seconds", "API request latency by route.",
+                                      ["method", "route", "status"], buckets=HTTP_BUCKETS)
+    HTTP_REQUESTS_IN_PROGRESS = Gauge("reflectly_http_requests_in_progress", "API requests being served.",
+                                      multiprocess_mode="livesum")
+    GOOGLE_CALL_DURATION = Histogram("reflectly_google_api_call_duration_seconds",
+                                     "Latency of each Sheets/Drive call attempt by operation and outcome.",
+                                     ["operation", "status"], buckets=GOOGLE_BUCKETS)
+    GOOGLE_CALL_RETRIES = Histogram("reflectly_google_api_call_retries", "Retries needed per Sheets/Drive call.",
+                                    ["operation"], buckets=RETRY_BUCKETS)
+    DRIVE_UPLOADED_BYTES = Counter("reflectly_drive_uploaded_bytes", "Attachment bytes uploaded to Drive.")
+    GOOGLE_CIRCUIT_STATE = Gauge("reflectly_google_circuit_state",
+                                 "Circuit breaker state per Google API (0 closed, 1 half-open, 2 open).", ["api"],
+                                 multiprocess_mode="liveall")
+    EVENT_LOOP_LAG = Gauge("reflectly_event_loop_lag_seconds", "How late the event loop ran a scheduled wake-up.",
+                           multiprocess_mode="liveall")
+    PROCESS_RSS = Gauge("reflectly_process_resident_memory_bytes", "Resident set size of the worker process.",
+                        multiprocess_mode="liveall")
+else:
+    HTTP_REQUEST_DURATION = HTTP_REQUESTS_IN_PROGRESS = GOOGLE_CALL_DURATION = GOOGLE_CALL_RETRIES = \
+        DRIVE_UPLOADED_BYTES = GOOGLE_CIRCUIT_STATE = EVENT_LOOP_LAG = PROCESS_RSS = _NoopMetric()
+
+
+def process_rss() -> int:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # No procfs: fall back to the peak RSS (kilobytes on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+async def monitor_process(interval: float = None):
+    """Sample event-loop lag and RSS every `interval` seconds until cancelled."""
+    interval = interval or settings.METRICS_SAMPLE_INTERVAL
+    loop = asyncio.get_running_loop()
+    while True:
+        scheduled = loop.time() + interval
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.set(max(0.0, loop.time() - scheduled))
+        PROCESS_RSS.set(process_rss())
+
+
+def render_metrics() -> tuple[bytes, str]:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
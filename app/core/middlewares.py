@@ -0,0 +1,254 @@
+import logging
+import time
+
+from multipart.multipart import MultipartParser, parse_options_header
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.constant import AppStatus
+from app.core.exceptions import error_exception_handler, make_error_response
+from app.core.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_PROGRESS
+from app.core.settings import settings
+from app.core.timing import start_request_timing, stop_request_timing
+from app.utils import sniff_mime_type, MIME_SNIFF_BYTES
+
+logger = logging.getLogger(__name__)
+access_logger = logging.getLogger("app.access")
+
+# Multipart framing (boundaries, part headers) on top of the file bytes themselves
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class _MultipartGuard:
+    """
+    Incremental multipart parser fed with the raw request body as it arrives. It only inspects
+    the stream (part headers, file sizes, leading bytes) and raises as soon as a limit is crossed.
+    """
+
+    def __init__(self, boundary: bytes):
+        self.total_bytes = 0
+        self.files = 0
+        self._header_field = b""
+        self._header_value = b""
+        self._headers = {}
+        self._filename = None
+        self._file_bytes = 0
+        self._head = b""
+        self._sniffed = False
+        self._parser = MultipartParser(boundary, callbacks={
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def feed(self, chunk: bytes):
+        self.total_bytes += len(chunk)
+        if self.total_bytes > settings.UPLOAD_MAX_TOTAL_SIZE + MULTIPART_OVERHEAD:
+            raise error_exception_handler(app_status=AppStatus.ERROR_413_PAYLOAD_TOO_LARGE,
+                                          description=f"tổng dung lượng vượt quá {settings.UPLOAD_MAX_TOTAL_SIZE} bytes")
+        self._parser.write(chunk)
+
+    def _on_part_begin(self):
+        self._headers, self._filename, self._file_bytes, self._head, self._sniffed = {}, None, 0, b"", False
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field, self._header_value = b"", b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        filename = options.get(b"filename")
+        if not filename:
+            return
+        self._filename = filename.decode("utf-8", "replace")
+        self.files += 1
+        if self.files > settings.UPLOAD_MAX_FILES:
+            raise error_exception_handler(app_status=AppStatus.ERROR_413_PAYLOAD_TOO_LARGE,
+                                          description=f"tối đa {settings.UPLOAD_MAX_FILES} tệp")
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._filename is None:
+            return
+        self._file_bytes += end - start
+        if self._file_bytes > settings.UPLOAD_MAX_FILE_SIZE:
+            raise error_exception_handler(app_status=AppStatus.ERROR_413_PAYLOAD_TOO_LARGE,
+                                          description=f"tệp '{self._filename}' vượt quá "
+                                                      f"{settings.UPLOAD_MAX_FILE_SIZE} bytes")
+        if not self._sniffed:
+            self._head += data[start:min(end, start + MIME_SNIFF_BYTES)]
+            if len(self._head) >= MIME_SNIFF_BYTES:
+                self._check_type()
+
+    def _on_part_end(self):
+        if self._filename is not None and not self._sniffed and self._file_bytes:
+            self._check_type()
+
+    def _check_type(self):
+        self._sniffed = True
+        allowed = settings.UPLOAD_ALLOWED_MIME_TYPES
+        mime_type = sniff_mime_type(self._head)
+        if allowed and mime_type not in allowed:
+            raise error_exception_handler(app_status=AppStatus.ERROR_400_UNSUPPORTED_FILE_TYPE,
+                                          description=f"'{self._filename}' ({mime_type or 'không xác định'})")
+
+
+class MultipartLimitMiddleware:
+    """
+    Enforces the upload limits in Settings on multipart POSTs to `paths` while the body is
+    still streaming in, so an oversized or disallowed upload is rejected before Starlette has
+    spooled the whole body to disk.
+    """
+
+    def __init__(self, app: ASGIApp, paths: list[str]):
+        self.app = app
+        self.paths = set(paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        content_type, params = parse_options_header(headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = headers.get("content-length")
+        if content_length and content_length.isdigit() and \
+                int(content_length) > settings.UPLOAD_MAX_TOTAL_SIZE + MULTIPART_OVERHEAD:
+            response = make_error_response(app_status=AppStatus.ERROR_413_PAYLOAD_TOO_LARGE,
+                                           description=f"tổng dung lượng vượt quá {settings.UPLOAD_MAX_TOTAL_SIZE} bytes")
+            await response(scope, receive, send)
+            return
+
+        guard = _MultipartGuard(params[b"boundary"])
+
+        async def guarded_receive() -> Message:
+            message = await receive()
+            if message["type"] == "http.request" and message.get("body"):
+                guard.feed(message["body"])
+            return message
+
+        await self.app(scope, guarded_receive, send)
+
+
+class MetricsMiddleware:
+    """
+    Records request latency per route template (so path parameters don't explode the label
+    set) and the number of requests in flight. `skip_paths` are not measured.
+    """
+
+    def __init__(self, app: ASGIApp, skip_paths: list[str] = ()):
+        self.app = app
+        self.skip_paths = set(skip_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(scope["method"], route.path if route else "unmatched",
+                                         str(status_code)).observe(time.perf_counter() - started)
+
+
+class AccessLogMiddleware:
+    """
+    Emits one `app.access` record per request once the response has started, carrying the
+    scope, status and elapsed time for JsonAccessFormatter. The response headers are kept on
+    `scope["response_headers"]` so the formatter can read X-Server-Time.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not access_logger.isEnabledFor(logging.INFO):
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                scope["response_headers"] = message.get("headers", [])
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            access_logger.info("%s %s %d", scope["method"], scope["path"], status_code, extra={
+                "scope": scope,
+                "status_code": status_code,
+                "request_time_ms": round((time.perf_counter() - started) * 1000, 1),
+            })
+
+
+class TimingMiddleware:
+    """
+    Sets up the per-request RequestTiming that `span()` records into, adds `X-Server-Time`
+    (milliseconds until the response started) and a `Server-Timing` breakdown to the
+    response, and logs the breakdown of requests slower than SLOW_REQUEST_THRESHOLD_MS.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing, token = start_request_timing()
+
+        async def timed_receive() -> Message:
+            message = await receive()
+            if message["type"] == "http.request" and not message.get("more_body", False):
+                timing.body_received = time.perf_counter()
+            return message
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-server-time", f"{timing.elapsed_ms():.1f}".encode()),
+                    (b"server-timing", timing.server_timing().encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, timed_receive, send_wrapper)
+        finally:
+            stop_request_timing(token)
+            elapsed_ms = timing.elapsed_ms()
+            if settings.SLOW_REQUEST_THRESHOLD_MS and elapsed_ms > settings.SLOW_REQUEST_THRESHOLD_MS:
+                logger.warning(f"Slow request {scope['method']} {scope['path']} took {elapsed_ms:.1f}ms: "
+                               f"{timing.breakdown()}")
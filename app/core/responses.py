@@ -0,0 +1,52 @@
+import functools
+
+import orjson
+from fastapi.responses import ORJSONResponse
+
+from app.constant import AppStatus
+
+
+class FastJSONResponse(ORJSONResponse):
+    """
+    The application's default response class: content is encoded with orjson, and content that
+    is already `bytes` (a pre-encoded body from `encode_response_object` or `encode_error`) is
+    sent as-is. Returning an instance from an endpoint also skips FastAPI's `jsonable_encoder`
+    pass, which only pays off for content made of plain JSON types.
+    """
+
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return super().render(content)
+
+
+def _error_detail(app_status: AppStatus, message: str) -> dict:
+    return {"name": app_status.name, "message": message}
+
+
+# Error bodies of the AppStatus values whose message has no {description} to fill in
+STATIC_ERROR_BODIES: dict[AppStatus, bytes] = {
+    app_status: orjson.dumps({"detail": _error_detail(app_status, app_status.message)})
+    for app_status in AppStatus if app_status is not AppStatus.SUCCESS and "{" not in app_status.message
+}
+
+
+def encode_error(app_status: AppStatus, detail: dict = None, **kwargs) -> bytes:
+    """`{"detail": detail}`, by default the AppStatus name and message formatted with `kwargs`."""
+    if detail is None:
+        if app_status in STATIC_ERROR_BODIES:
+            return STATIC_ERROR_BODIES[app_status]
+        detail = _error_detail(app_status, app_status.message.format(**kwargs))
+    return orjson.dumps({"detail": detail})
+
+
+@functools.lru_cache(maxsize=64)
+def _encode_message(message: str) -> bytes:
+    return orjson.dumps({"data": message, "meta": {}})
+
+
+def encode_response_object(data, meta: dict = None) -> bytes:
+    """The encoded `make_response_object(data, meta)`; bodies that are just a message are encoded once."""
+    if not meta and isinstance(data, str):
+        return _encode_message(data)
+    return orjson.dumps({"data": data, "meta": meta or {}}, option=orjson.OPT_NON_STR_KEYS)
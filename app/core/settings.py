@@ -1,8 +1,8 @@
 import os
 
-from pydantic import BaseSettings
+from pydantic import BaseSettings, root_validator
 
-from app.constant import ProjectBuildTypes
+from app.constant import ProjectBuildTypes, GoogleBackendType
 
 
 class Settings(BaseSettings):
@@ -22,6 +22,121 @@ class Settings(BaseSettings):
     GOOGLE_SPREADSHEET_ID: str = "your-google-spreadsheet-id"
     GOOGLE_API_KEY: str = "your-google-api-key"
     GOOGLE_DRIVE_FOLDER_ID: str = "your-google-drive-folder-id"
+    GOOGLE_TOKEN_URI: str = "https://oauth2.googleapis.com/token"
+    GOOGLE_SHEETS_API_URL: str = "https://sheets.googleapis.com"
+    GOOGLE_DRIVE_API_URL: str = "https://www.googleapis.com"
+    GOOGLE_BACKEND: str = GoogleBackendType.DISCOVERY
+    GOOGLE_HTTP_POOL_SIZE: int = 10
+    GOOGLE_HTTP_TIMEOUT: int = 60
+    GOOGLE_EXECUTOR_MAX_WORKERS: int = 10
+    GOOGLE_CALL_TIMEOUT: float = 30
+    GOOGLE_UPLOAD_TIMEOUT: float = 300
+    GOOGLE_MULTIPART_UPLOAD_MAX_SIZE: int = 5 * 1024 * 1024
+    GOOGLE_UPLOAD_CHUNK_SIZE: int = 8 * 1024 * 1024
+    GOOGLE_UPLOAD_MAX_CHUNK_RETRIES: int = 5
+    # Per-worker API quotas (0 disables pacing) and retry backoff
+    GOOGLE_SHEETS_READS_PER_MINUTE: float = 60
+    GOOGLE_SHEETS_WRITES_PER_MINUTE: float = 60
+    GOOGLE_SHEETS_BURST: int = 10
+    GOOGLE_DRIVE_QUERIES_PER_SECOND: float = 20
+    GOOGLE_DRIVE_BURST: int = 20
+    GOOGLE_RETRY_MAX_ATTEMPTS: int = 5
+    GOOGLE_RETRY_BASE_DELAY: float = 0.5
+    GOOGLE_RETRY_MAX_DELAY: float = 32
+    # Time a feedback request may spend on Google calls, retries and backoff included (multipart
+    # submissions get the upload budget), and per-API circuit breakers: open after
+    # GOOGLE_BREAKER_FAILURE_THRESHOLD consecutive timeouts/5xx (0 disables), probe again after
+    # GOOGLE_BREAKER_RESET_TIMEOUT seconds. A budget must outlast its per-call timeout, or every
+    # timed-out attempt looks cut short by the budget and never reaches the breaker
+    GOOGLE_REQUEST_BUDGET: float = 45
+    GOOGLE_UPLOAD_REQUEST_BUDGET: float = 360
+    GOOGLE_BREAKER_FAILURE_THRESHOLD: int = 5
+    GOOGLE_BREAKER_RESET_TIMEOUT: float = 30
+    # Access tokens are replaced in the background this long before they expire, and shared by
+    # every worker through the token cache file
+    GOOGLE_TOKEN_REFRESH_AHEAD: float = 600
+    GOOGLE_TOKEN_CACHE_PATH: str = "data/google_token.json"
+    DRIVE_UPLOAD_CONCURRENCY: int = 16
+    DRIVE_UPLOAD_CONCURRENCY_PER_REQUEST: int = 4
+    ATTACHMENT_DEDUP_ENABLED: bool = True
+    ATTACHMENT_INDEX_PATH: str = "data/attachments.db"
+    ATTACHMENT_INDEX_MAX_ENTRIES: int = 100_000
+    ATTACHMENT_INDEX_TTL: float = 90 * 24 * 3600
+    SHEETS_BATCH_MAX_ROWS: int = 100
+    SHEETS_BATCH_LINGER: float = 0.05
+    # NDJSON consultation import
+    CONSULTATION_BATCH_APPEND_ROWS: int = 500
+    CONSULTATION_BATCH_MAX_LINE_BYTES: int = 64 * 1024
+    CONSULTATION_BATCH_RESULT_SPOOL_SIZE: int = 1024 * 1024
+    SHEETS_TAB_CACHE_TTL: float = 300
+    # Feedback tab partitions: one tab per kind and SHEETS_PARTITION_PERIOD ("month", "year" or "none"),
+    # a numbered follow-up tab past SHEETS_PARTITION_MAX_ROWS and a new spreadsheet past
+    # SHEETS_SPREADSHEET_MAX_CELLS (Google's limit is 10M cells, and a new spreadsheet starts with a
+    # 26,000-cell Sheet1); 0 disables either rollover
+    SHEETS_PARTITION_PERIOD: str = "month"
+    SHEETS_PARTITION_MAX_ROWS: int = 100_000
+    SHEETS_PARTITION_INITIAL_ROWS: int = 100
+    SHEETS_SPREADSHEET_MAX_CELLS: int = 9_000_000
+    SHEETS_MANIFEST_TAB: str = "_partitions"
+    SHEETS_ROLLOVER_SPREADSHEET_NAME: str = "Reflectly feedback"
+    SHEETS_ROLLOVER_FOLDER_ID: str | None = None
+    # flock serializing rollovers (new tabs, spreadsheets and manifest rows) across gunicorn workers
+    SHEETS_PARTITION_LOCK_PATH: str = "data/sheet_partitions.lock"
+    DRIVE_FOLDER_CACHE_PATH: str = "data/drive_folders.json"
+    # Attachment limits for /warranty and /complaint
+    UPLOAD_MAX_FILES: int = 10
+    UPLOAD_MAX_FILE_SIZE: int = 25 * 1024 * 1024
+    UPLOAD_MAX_TOTAL_SIZE: int = 100 * 1024 * 1024
+    UPLOAD_ALLOWED_MIME_TYPES: list[str] = ["image/jpeg", "image/png", "image/gif", "image/webp", "image/heic",
+                                            "image/heif", "image/avif", "application/pdf", "video/mp4",
+                                            "video/quicktime", "video/3gpp", "video/3gpp2"]
+    # Image attachment preprocessing (requires Pillow)
+    IMAGE_PREPROCESS_ENABLED: bool = False
+    IMAGE_PREPROCESS_WORKERS: int = 2
+    IMAGE_PREPROCESS_MIN_SIZE: int = 512 * 1024
+    IMAGE_MAX_DIMENSION: int = 2048
+    IMAGE_QUALITY: int = 82
+    # Write-behind feedback queue
+    FEEDBACK_QUEUE_ENABLED: bool = False
+    FEEDBACK_QUEUE_DIR: str = "data/feedback_queue"
+    FEEDBACK_QUEUE_WORKERS: int = 4
+    FEEDBACK_QUEUE_MAX_ATTEMPTS: int = 10
+    FEEDBACK_QUEUE_RETRY_DELAY: float = 5
+    FEEDBACK_QUEUE_POLL_INTERVAL: float = 1
+    # Seconds a worker owns a claimed job; other workers only take it over once the lease has
+    # expired or the owning process is gone
+    FEEDBACK_QUEUE_LEASE: float = 900
+    # Journal submissions (202 + ticket) while a Google circuit breaker is open, even when the queue is off
+    FEEDBACK_QUEUE_FALLBACK: bool = True
+    # JSON access log, written from a background thread (run uvicorn with --no-access-log)
+    ACCESS_LOG_ENABLED: bool = True
+    ACCESS_LOG_FILE: str | None = None
+    # Requests slower than this log their phase breakdown (0 disables)
+    SLOW_REQUEST_THRESHOLD_MS: float = 2000
+    # Prometheus metrics (requires prometheus-client); set the directory when running several workers
+    METRICS_ENABLED: bool = True
+    METRICS_SAMPLE_INTERVAL: float = 1
+    PROMETHEUS_MULTIPROC_DIR: str | None = None
+    # Idempotent feedback submission; responses are shared by all workers through the store
+    IDEMPOTENCY_STORE_PATH: str = "data/idempotency.db"
+    IDEMPOTENCY_MAX_ENTRIES: int = 10_000
+    IDEMPOTENCY_TTL: float = 24 * 60 * 60
+    # Local SQLite mirror of the feedback sheets, served by GET /api/feedbacks
+    FEEDBACK_MIRROR_ENABLED: bool = True
+    FEEDBACK_MIRROR_PATH: str = "data/feedbacks.db"
+    FEEDBACK_MIRROR_SYNC_INTERVAL: float = 300
+    FEEDBACK_MIRROR_SYNC_PAGE_ROWS: int = 1000
+    FEEDBACK_MIRROR_PAGE_SIZE: int = 50
+    FEEDBACK_MIRROR_MAX_PAGE_SIZE: int = 500
+
+    @root_validator(skip_on_failure=True)
+    def budgets_outlast_call_timeouts(cls, values):
+        for budget, timeout in (("GOOGLE_REQUEST_BUDGET", "GOOGLE_CALL_TIMEOUT"),
+                                ("GOOGLE_UPLOAD_REQUEST_BUDGET", "GOOGLE_UPLOAD_TIMEOUT")):
+            if values[budget] and values[budget] <= values[timeout]:
+                raise ValueError(f"{budget} ({values[budget]}s) must be 0 or longer than {timeout} "
+                                 f"({values[timeout]}s)")
+        return values
 
 env_file = os.getenv('ENV_FILE', '.env.dev')
 settings = Settings(_env_file=env_file, _env_file_encoding='utf-8')
@@ -0,0 +1,115 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from fastapi.routing import APIRoute
+
+_request_timing: ContextVar["RequestTiming | None"] = ContextVar("request_timing", default=None)
+
+
+class RequestTiming:
+    """
+    Per-request phase durations. Spans with the same name add up (e.g. one `drive_upload` per
+    attachment), and tasks spawned by the request inherit it through the context, so
+    concurrent phases can sum to more than the wall time.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.body_received = None
+        self.phases: dict[str, list] = {}
+
+    def add(self, name: str, seconds: float):
+        phase = self.phases.setdefault(name, [0.0, 0])
+        phase[0] += seconds
+        phase[1] += 1
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self) -> str:
+        metrics = [f"{name};dur={total * 1000:.1f}" + (f';desc="x{count}"' if count > 1 else "")
+                   for name, (total, count) in self.phases.items()]
+        metrics.append(f"total;dur={self.elapsed_ms():.1f}")
+        return ", ".join(metrics)
+
+    def breakdown(self) -> str:
+        return " ".join(f"{name}={total * 1000:.1f}ms" + (f"(x{count})" if count > 1 else "")
+                        for name, (total, count) in self.phases.items())
+
+
+def start_request_timing():
+    timing = RequestTiming()
+    return timing, _request_timing.set(timing)
+
+
+def stop_request_timing(token):
+    _request_timing.reset(token)
+
+
+def record_phase(name: str, seconds: float):
+    timing = _request_timing.get()
+    if timing is not None:
+        timing.add(name, seconds)
+
+
+@contextmanager
+def span(name: str):
+    """Time the enclosed block as phase `name` of the current request; a no-op outside requests."""
+    timing = _request_timing.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, time.perf_counter() - started)
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute that splits the time before the endpoint runs into `body` (receiving and, for
+    multipart, streaming-parsing the request) and `validate` (dependencies and pydantic), and
+    times the endpoint itself as `handler`.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, endpoint, **kwargs)
+        # The request handler built above calls `dependant.call` at request time, awaiting it or running
+        # it in the threadpool depending on what the endpoint was; the wrapper has to be the same kind
+        call = self.dependant.call
+
+        def start(timing: RequestTiming) -> float:
+            started = time.perf_counter()
+            body_received = timing.body_received or timing.started
+            timing.add("body", body_received - timing.started)
+            timing.add("validate", started - body_received)
+            return started
+
+        if asyncio.iscoroutinefunction(call):
+            @wraps(call)
+            async def timed_call(*args, **kwargs):
+                timing = _request_timing.get()
+                if timing is None:
+                    return await call(*args, **kwargs)
+                started = start(timing)
+                try:
+                    return await call(*args, **kwargs)
+                finally:
+                    timing.add("handler", time.perf_counter() - started)
+        else:
+            @wraps(call)
+            def timed_call(*args, **kwargs):
+                timing = _request_timing.get()
+                if timing is None:
+                    return call(*args, **kwargs)
+                started = start(timing)
+                try:
+                    return call(*args, **kwargs)
+                finally:
+                    timing.add("handler", time.perf_counter() - started)
+
+        self.dependant.call = timed_call
@@ -1,14 +1,66 @@
+import asyncio
 import logging
-from pathlib import Path
+from contextlib import asynccontextmanager
 
 import uvicorn
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.apis.endpoints import metrics_routes
+from app.clients import GoogleClientRegistry, GoogleApiError
 from app.constant import ProjectBuildTypes, SwaggerPaths, BasePath
-from app.core import settings, validation_exception_handler
+from app.core import settings, validation_exception_handler, google_api_exception_handler, setup_access_logging, \
+    setup_logging, app_exception_handler, internal_error_handler, AppHTTPException, FastJSONResponse
+from app.core.metrics import METRICS_ENABLED, PROMETHEUS_AVAILABLE, monitor_process
+from app.core.middlewares import AccessLogMiddleware, MetricsMiddleware, MultipartLimitMiddleware, TimingMiddleware
 from app.routers import main_router
+from app.services import FeedbackQueue, FeedbackService, IdempotencyCache, ImagePreprocessor, PILLOW_AVAILABLE
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_logging()
+    # The listener thread has to start in the worker process, after gunicorn has forked
+    access_log = setup_access_logging(settings.ACCESS_LOG_FILE) if settings.ACCESS_LOG_ENABLED else None
+    app.state.google_clients = GoogleClientRegistry()
+    # Batched appends are written by one registry-wide service, not by the request that opened the batch
+    app.state.google_clients.sheet_batcher.flush = FeedbackService(clients=app.state.google_clients).append_rows
+    # Start serving (liveness) straight away; /health/ready reports 503 until the warm-up is done
+    warm_up = asyncio.create_task(app.state.google_clients.warm_up())
+    feedback_mirror = app.state.google_clients.feedback_mirror
+    mirror_sync = asyncio.create_task(feedback_mirror.sync_forever(app.state.google_clients.backend,
+                                                                   app.state.google_clients.sheet_partitions)) \
+        if feedback_mirror else None
+    app.state.idempotency_cache = IdempotencyCache()
+    if settings.METRICS_ENABLED and not PROMETHEUS_AVAILABLE:
+        logger.warning("METRICS_ENABLED is set but prometheus-client is not installed; /metrics is disabled.")
+    process_monitor = asyncio.create_task(monitor_process()) if METRICS_ENABLED else None
+    app.state.image_preprocessor = None
+    if settings.IMAGE_PREPROCESS_ENABLED:
+        if PILLOW_AVAILABLE:
+            app.state.image_preprocessor = ImagePreprocessor()
+        else:
+            logger.warning("IMAGE_PREPROCESS_ENABLED is set but Pillow is not installed; uploading images as-is.")
+    app.state.feedback_queue = None
+    if settings.FEEDBACK_QUEUE_ENABLED or settings.FEEDBACK_QUEUE_FALLBACK:
+        app.state.feedback_queue = FeedbackQueue(app.state.google_clients,
+                                                 image_preprocessor=app.state.image_preprocessor)
+        await app.state.feedback_queue.start()
+    yield
+    warm_up.cancel()
+    if mirror_sync:
+        mirror_sync.cancel()
+    if process_monitor:
+        process_monitor.cancel()
+    if app.state.feedback_queue:
+        await app.state.feedback_queue.stop()
+    if app.state.image_preprocessor:
+        app.state.image_preprocessor.shutdown()
+    await app.state.google_clients.aclose()
+    app.state.idempotency_cache.close()
+    if access_log:
+        access_log.stop()
 
 
 main_app = FastAPI(title=settings.PROJECT_NAME,
@@ -18,28 +70,39 @@ main_app = FastAPI(title=settings.PROJECT_NAME,
                    docs_url=None if settings.PROJECT_BUILD_TYPE == ProjectBuildTypes.PRODUCTION else
                    SwaggerPaths.DOCS,
                    redoc_url=None if settings.PROJECT_BUILD_TYPE == ProjectBuildTypes.PRODUCTION else
-                   SwaggerPaths.RE_DOC)
+                   SwaggerPaths.RE_DOC,
+                   default_response_class=FastJSONResponse,
+                   lifespan=lifespan)
 
 # Routers
 main_app.include_router(main_router, prefix=BasePath)
+if METRICS_ENABLED:
+    main_app.include_router(metrics_routes)
 
 # Middlewares
+main_app.add_middleware(MultipartLimitMiddleware, paths=[f"{BasePath}/feedbacks/warranty",
+                                                         f"{BasePath}/feedbacks/complaint"])
 main_app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.ALLOW_ORIGINS or ["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Server-Time", "Server-Timing"],
 )
-# Setup loggers
-LOGGING_CONFIG = Path(__file__).parent / 'core/logging.conf'
-logging.config.fileConfig(LOGGING_CONFIG, disable_existing_loggers=False)
-
+main_app.add_middleware(TimingMiddleware)
+if METRICS_ENABLED:
+    main_app.add_middleware(MetricsMiddleware, skip_paths=["/metrics"])
+if settings.ACCESS_LOG_ENABLED:
+    main_app.add_middleware(AccessLogMiddleware)
 # Get root logger
 logger = logging.getLogger(__name__)
 
 # Exception handlers
 main_app.add_exception_handler(RequestValidationError, validation_exception_handler)
+main_app.add_exception_handler(GoogleApiError, google_api_exception_handler)
+main_app.add_exception_handler(AppHTTPException, app_exception_handler)
+main_app.add_exception_handler(Exception, internal_error_handler)
 
 if __name__ == "__main__":
     uvicorn.run("main:main_app", host="0.0.0.0", reload=True)
@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 
-from app.apis.endpoints import feedback_routes
+from app.apis.endpoints import feedback_routes, health_routes
 
 main_router = APIRouter()
 main_router.include_router(feedback_routes, prefix="/feedbacks", tags=["feedback"])
+main_router.include_router(health_routes, prefix="/health", tags=["health"])
@@ -1 +1,2 @@
-from .feedback_schemas import FeedbackBase
\ No newline at end of file
+from .feedback_schemas import FeedbackBase
+from .upload_schemas import FileUploadResult
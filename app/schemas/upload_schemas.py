@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+
+
+class FileUploadResult(BaseModel):
+    filename: str | None
+    file_id: str | None = None
+    folder_id: str | None = None
+    size: int | None = None
+    original_size: int | None = None
+    preprocess_ms: float = 0
+    sha256: str | None = None
+    deduplicated: bool = False
+    wait_ms: float = 0
+    elapsed_ms: float = 0
+    error: str | None = None
+
+    class Config:
+        orm_mode = True
@@ -1 +1,4 @@
-from .feedback_service import FeedbackService
\ No newline at end of file
+from .image_preprocessor import ImagePreprocessor, PILLOW_AVAILABLE
+from .feedback_service import FeedbackService
+from .feedback_queue import FeedbackQueue, FeedbackJournal
+from .idempotency import IdempotencyCache, make_idempotency_key, payload_digest
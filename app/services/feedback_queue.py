@@ -0,0 +1,324 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from fastapi import UploadFile
+from pydantic import BaseModel
+
+from app.clients import GoogleClientRegistry
+from app.clients.rate_limiter import SHEETS
+from app.constant import FeedbackJobStatus, FeedbackTypeEnum
+from app.core import settings
+from app.schemas.feedback_schemas import ConsultationCreate, WarrantyCreate, ComplaintCreate
+from app.services.feedback_service import FeedbackService
+from app.services.image_preprocessor import ImagePreprocessor
+
+logger = logging.getLogger(__name__)
+
+FEEDBACK_SCHEMAS = {
+    FeedbackTypeEnum.CONSULTATION: ConsultationCreate,
+    FeedbackTypeEnum.WARRANTY: WarrantyCreate,
+    FeedbackTypeEnum.COMPLAINT: ComplaintCreate,
+}
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class FeedbackJournal:
+    """
+    Durable local journal of accepted feedback (SQLite in WAL mode). Attachments are spooled
+    next to the database so a job can be replayed after a crash or restart. The journal is
+    shared by every worker: a claimed job records its owner and a lease, and is only handed
+    back to the queue once that lease expires or the owning process is gone.
+    """
+
+    def __init__(self, directory: str = None):
+        self.directory = Path(directory or settings.FEEDBACK_QUEUE_DIR)
+        self.attachments_dir = self.directory / "attachments"
+        self.attachments_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # pid plus a per-journal token, so a restarted worker that gets its old pid back can tell
+        # its predecessor's jobs from its own
+        self.owner = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._conn = sqlite3.connect(self.directory / "journal.db", check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS feedback_jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                attachments TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                available_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                claimed_by TEXT,
+                lease_until REAL,
+                folder_id TEXT
+            )""")
+        self._migrate()
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_feedback_jobs_status ON feedback_jobs (status, available_at)")
+
+    def _migrate(self):
+        """Add the lease and folder columns to journals created before they existed."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(feedback_jobs)")}
+            for column, column_type in (("claimed_by", "TEXT"), ("lease_until", "REAL"), ("folder_id", "TEXT")):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE feedback_jobs ADD COLUMN {column} {column_type}")
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _spool(self, ticket_id: str, files: list[UploadFile]) -> list[dict]:
+        attachments = []
+        if not files:
+            return attachments
+        job_dir = self.attachments_dir / ticket_id
+        job_dir.mkdir()
+        for index, file in enumerate(files):
+            path = job_dir / str(index)
+            with open(path, "wb") as out:
+                shutil.copyfileobj(file.file, out, settings.GOOGLE_UPLOAD_CHUNK_SIZE)
+                out.flush()
+                os.fsync(out.fileno())
+            attachments.append({"filename": file.filename, "content_type": file.content_type, "path": str(path)})
+        return attachments
+
+    def enqueue(self, kind: FeedbackTypeEnum, feedback_data: BaseModel, files: list[UploadFile] = None) -> str:
+        ticket_id = uuid.uuid4().hex
+        attachments = self._spool(ticket_id, files)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO feedback_jobs (id, kind, payload, attachments, status, created_at, available_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (ticket_id, kind.value, feedback_data.json(exclude={"image_urls"}), json.dumps(attachments),
+                 FeedbackJobStatus.PENDING.value, now, now, now))
+        return ticket_id
+
+    def claim(self, limit: int) -> list[sqlite3.Row]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            rows = self._conn.execute(
+                "SELECT id, kind, payload, attachments, attempts, created_at, folder_id FROM feedback_jobs"
+                " WHERE status = ? AND available_at <= ? ORDER BY created_at LIMIT ?",
+                (FeedbackJobStatus.PENDING.value, now, limit)).fetchall()
+            self._conn.executemany(
+                "UPDATE feedback_jobs SET status = ?, attempts = attempts + 1, updated_at = ?, claimed_by = ?,"
+                " lease_until = ? WHERE id = ?",
+                [(FeedbackJobStatus.PROCESSING.value, now, self.owner, now + settings.FEEDBACK_QUEUE_LEASE, row[0])
+                 for row in rows])
+            self._conn.execute("COMMIT")
+        return rows
+
+    def complete(self, ticket_id: str):
+        with self._lock:
+            self._conn.execute("UPDATE feedback_jobs SET status = ?, last_error = NULL, updated_at = ? WHERE id = ?",
+                               (FeedbackJobStatus.DONE.value, time.time(), ticket_id))
+        shutil.rmtree(self.attachments_dir / ticket_id, ignore_errors=True)
+
+    def fail(self, ticket_id: str, error: str, attempts: int):
+        now = time.time()
+        if attempts >= settings.FEEDBACK_QUEUE_MAX_ATTEMPTS:
+            status, available_at = FeedbackJobStatus.FAILED, now
+        else:
+            status = FeedbackJobStatus.PENDING
+            available_at = now + min(settings.FEEDBACK_QUEUE_RETRY_DELAY * 2 ** (attempts - 1), 300)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE feedback_jobs SET status = ?, last_error = ?, available_at = ?, updated_at = ? WHERE id = ?",
+                (status.value, error, available_at, now, ticket_id))
+
+    def _abandoned(self, owner: str | None, lease_until: float | None, now: float) -> bool:
+        if not owner or not lease_until or lease_until <= now:
+            return True
+        pid, _, _ = owner.partition(":")
+        if not pid.isdigit():
+            return True
+        if int(pid) == os.getpid():
+            return owner != self.owner
+        return not _process_alive(int(pid))
+
+    def retry_attachments(self, ticket_id: str, attachments: list[dict], folder_id: str, error: str, attempts: int):
+        """
+        The row is written but `attachments` failed to upload: keep only those spooled files and
+        retry them into `folder_id`, instead of replaying (and duplicating) the whole submission.
+        """
+        keep = {item["path"] for item in attachments}
+        for path in (self.attachments_dir / ticket_id).glob("*"):
+            if str(path) not in keep:
+                path.unlink(missing_ok=True)
+        with self._lock:
+            self._conn.execute("UPDATE feedback_jobs SET attachments = ?, folder_id = ? WHERE id = ?",
+                               (json.dumps(attachments), folder_id, ticket_id))
+        self.fail(ticket_id, error, attempts)
+
+    def requeue_in_flight(self) -> int:
+        """Hand jobs left in PROCESSING by a crashed/stopped worker (or past their lease) back to the queue."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute("SELECT id, claimed_by, lease_until FROM feedback_jobs WHERE status = ?",
+                                          (FeedbackJobStatus.PROCESSING.value,)).fetchall()
+                abandoned = [ticket_id for ticket_id, owner, lease_until in rows
+                             if self._abandoned(owner, lease_until, now)]
+                self._conn.executemany(
+                    "UPDATE feedback_jobs SET status = ?, available_at = ?, claimed_by = NULL, lease_until = NULL"
+                    " WHERE id = ? AND status = ?",
+                    [(FeedbackJobStatus.PENDING.value, now, ticket_id, FeedbackJobStatus.PROCESSING.value)
+                     for ticket_id in abandoned])
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(abandoned)
+
+    def get(self, ticket_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, kind, status, attempts, last_error, created_at, updated_at FROM feedback_jobs WHERE id = ?",
+                (ticket_id,)).fetchone()
+        if not row:
+            return None
+        return dict(zip(("ticket_id", "kind", "status", "attempts", "last_error", "created_at", "updated_at"), row))
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM feedback_jobs GROUP BY status").fetchall())
+            oldest = self._conn.execute("SELECT MIN(created_at) FROM feedback_jobs WHERE status IN (?, ?)",
+                                        (FeedbackJobStatus.PENDING.value,
+                                         FeedbackJobStatus.PROCESSING.value)).fetchone()[0]
+        return {
+            "depth": counts.get(FeedbackJobStatus.PENDING.value, 0) + counts.get(FeedbackJobStatus.PROCESSING.value, 0),
+            "lag_seconds": round(time.time() - oldest, 3) if oldest else 0,
+            **{status.value.lower(): counts.get(status.value, 0) for status in FeedbackJobStatus},
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class FeedbackQueue:
+    """
+    Accept-and-enqueue front for the feedback endpoints plus the background worker that drains
+    the journal into Sheets/Drive. Delivery is at-least-once: a job is only marked done after
+    FeedbackService returns, and jobs whose worker died mid-flight are taken over by the next
+    worker to start or go idle.
+    """
+
+    def __init__(self, clients: GoogleClientRegistry, journal: FeedbackJournal = None,
+                 image_preprocessor: ImagePreprocessor | None = None):
+        self.clients = clients
+        self.image_preprocessor = image_preprocessor
+        self.journal = journal or FeedbackJournal()
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    async def enqueue(self, kind: FeedbackTypeEnum, feedback_data: BaseModel, files: list[UploadFile] = None) -> str:
+        ticket_id = await asyncio.to_thread(self.journal.enqueue, kind, feedback_data, files)
+        self._wakeup.set()
+        return ticket_id
+
+    async def start(self):
+        replayed = await asyncio.to_thread(self.journal.requeue_in_flight)
+        if replayed:
+            logger.info(f"Replaying {replayed} feedback job(s) interrupted before shutdown.")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self.journal.close()
+
+    async def _run(self):
+        while True:
+            # Leave jobs in the journal while Sheets is failing fast, rather than spending their attempts
+            rows = await asyncio.to_thread(self.journal.claim, settings.FEEDBACK_QUEUE_WORKERS) \
+                if self.clients.scheduler.available(SHEETS) else None
+            if rows:
+                await asyncio.gather(*(self._process(*row) for row in rows))
+                continue
+            replayed = await asyncio.to_thread(self.journal.requeue_in_flight)
+            if replayed:
+                logger.info(f"Taking over {replayed} feedback job(s) from a worker that is gone.")
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), settings.FEEDBACK_QUEUE_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _process(self, ticket_id: str, kind: str, payload: str, attachments: str, attempts: int,
+                       created_at: float, folder_id: str | None):
+        kind = FeedbackTypeEnum(kind)
+        attachments = json.loads(attachments)
+        files = [UploadFile(open(item["path"], "rb"), size=os.path.getsize(item["path"]), filename=item["filename"])
+                 for item in attachments]
+        feedback_service = FeedbackService(clients=self.clients, image_preprocessor=self.image_preprocessor)
+        try:
+            if folder_id:
+                # The row went in on an earlier attempt; only the attachments that failed are left
+                upload_results = await feedback_service.upload_to_folder(folder_id, files)
+            else:
+                feedback_data = FEEDBACK_SCHEMAS[kind].parse_raw(payload)
+                # Rows carry the time the submission was accepted, not when the queue got to it
+                upload_results = await self.dispatch(feedback_service, kind, feedback_data, files,
+                                                     created_at=datetime.fromtimestamp(created_at))
+        except Exception as e:
+            logger.warning(f"Feedback job {ticket_id} ({kind.value}) failed on attempt {attempts + 1}: {e}")
+            await asyncio.to_thread(self.journal.fail, ticket_id, str(e), attempts + 1)
+        else:
+            failed = [(item, result) for item, result in zip(attachments, upload_results or []) if result.error]
+            if failed:
+                error = "; ".join(f"{result.filename}: {result.error}" for _, result in failed)
+                logger.warning(f"Feedback job {ticket_id} ({kind.value}): {len(failed)} attachment(s) failed on "
+                               f"attempt {attempts + 1}, retrying them: {error}")
+                await asyncio.to_thread(self.journal.retry_attachments, ticket_id, [item for item, _ in failed],
+                                        failed[0][1].folder_id, error, attempts + 1)
+            else:
+                await asyncio.to_thread(self.journal.complete, ticket_id)
+        finally:
+            for file in files:
+                file.file.close()
+
+    @staticmethod
+    async def dispatch(feedback_service: FeedbackService, kind: FeedbackTypeEnum, feedback_data: BaseModel,
+                       files: list[UploadFile] = None, created_at: datetime = None):
+        if kind == FeedbackTypeEnum.CONSULTATION:
+            await feedback_service.create_consultation(feedback_data=feedback_data, created_at=created_at)
+            return []
+        if kind == FeedbackTypeEnum.WARRANTY:
+            return await feedback_service.create_warranty(feedback_data=feedback_data, files=files, created_at=created_at)
+        return await feedback_service.create_complaint(feedback_data=feedback_data, files=files, created_at=created_at)
+
+    async def get(self, ticket_id: str) -> dict | None:
+        return await asyncio.to_thread(self.journal.get, ticket_id)
+
+    async def stats(self) -> dict:
+        return await asyncio.to_thread(self.journal.stats)
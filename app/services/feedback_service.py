@@ -1,98 +1,200 @@
+import asyncio
+import json
 import logging
+import time
 from datetime import datetime
+from typing import AsyncIterator
 
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
+from fastapi import HTTPException, UploadFile
+from pydantic import ValidationError
 
-from app.constant import GOOGLE_SCOPES, AppStatus
-from app.core import settings, error_exception_handler
+from app.clients import GoogleClientRegistry, GoogleApiError, GoogleApiTimeout
+from app.clients.feedback_mirror import first_updated_row
+from app.clients.rate_limiter import DRIVE, SHEETS
+from app.clients.uploads import stream_size
+from app.constant import AppStatus, FeedbackTypeEnum
+from app.core import settings, error_exception_handler, google_error_status
+from app.core.metrics import DRIVE_UPLOADED_BYTES
+from app.core.timing import record_phase, span
 from app.schemas.feedback_schemas import ConsultationCreate, WarrantyCreate, ComplaintCreate
+from app.schemas.upload_schemas import FileUploadResult
+from app.services.image_preprocessor import ImagePreprocessor, PreparedAttachment
 from app.utils import convert_datetime_to_str
-from googleapiclient.http import MediaIoBaseUpload
-import io
-from fastapi import UploadFile
 logger = logging.getLogger(__name__)
 
 class FeedbackService:
-    def __init__(self):
-        self.drive_service = self._get_service('drive', 'v3')
-        self.sheet_service = self._get_service('sheets', 'v4')
+    def __init__(self, clients: GoogleClientRegistry, image_preprocessor: ImagePreprocessor | None = None):
+        self.backend = clients.backend
+        self.sheet_batcher = clients.sheet_batcher
+        self.sheet_partitions = clients.sheet_partitions
+        self.drive_folders = clients.drive_folders
+        self.upload_slots = clients.upload_slots
+        self.image_preprocessor = image_preprocessor
+        self.attachment_index = clients.attachment_index
+        self.feedback_mirror = clients.feedback_mirror
+        self.scheduler = clients.scheduler
 
-    @staticmethod
-    def _get_service(api, version):
-        creds = Credentials.from_service_account_info(
-            {
-                "type": "service_account",
-                "project_id": settings.GOOGLE_PROJECT_ID,
-                "private_key_id": settings.GOOGLE_PRIVATE_KEY_ID,
-                "private_key": settings.GOOGLE_PRIVATE_KEY.replace('\\n', '\n'),
-                "client_email": settings.GOOGLE_CLIENT_EMAIL,
-                "client_id": settings.GOOGLE_CLIENT_ID,
-                "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                "token_uri": "https://oauth2.googleapis.com/token",
-                "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
-                "client_x509_cert_url": settings.GOOGLE_CLIENT_X509_CERT_URL,
-                "universe_domain": "googleapis.com"
-            },
-            scopes=GOOGLE_SCOPES
-        )
-        return build(api, version, credentials=creds, cache_discovery=False)
-
-    def insert_data_to_sheet(self, values: list[list[str]], sheet_name: str):
-        try:
-            sheet_metadata = self.sheet_service.spreadsheets().get(
-                spreadsheetId=settings.GOOGLE_SPREADSHEET_ID).execute()
-            sheets = sheet_metadata.get('sheets', [])
+    def google_available(self, files: list[UploadFile] = None) -> bool:
+        """Whether the Google APIs a submission needs would be called now, i.e. no circuit breaker is open."""
+        return self.scheduler.available(SHEETS, *([DRIVE] if files else []))
 
-            sheet_names = [sheet['properties']['title'] for sheet in sheets]
-            if sheet_name not in sheet_names:
-                self.create_sheet(sheet_name)
+    async def insert_data_to_sheet(self, values: list[list[str]], sheet_name: str):
+        with span("sheets_append"):
+            await self.sheet_batcher.append(sheet_name, values)
 
-            range_ = f"{sheet_name}!A1"
-
-            body = {'values': values}
+    async def append_rows(self, values: list[list[str]], sheet_name: str):
+        kind = FeedbackTypeEnum(sheet_name)
+        try:
+            partition = await self.sheet_partitions.resolve(kind, create=self.create_sheet)
 
-            request = self.sheet_service.spreadsheets().values().append(
-                spreadsheetId=settings.GOOGLE_SPREADSHEET_ID,
-                range=range_,
-                valueInputOption="USER_ENTERED",
-                body=body,
-                insertDataOption="INSERT_ROWS"
-            )
-            request.execute()
+            try:
+                response = await self.backend.append_values(partition.spreadsheet_id, f"'{partition.title}'!A1", values)
+            except GoogleApiError as e:
+                if not e.is_missing_range:
+                    raise
+                # The tab was deleted or renamed behind the cache's back
+                self.sheet_partitions.invalidate(partition)
+                partition = await self.sheet_partitions.resolve(kind, create=self.create_sheet)
+                response = await self.backend.append_values(partition.spreadsheet_id, f"'{partition.title}'!A1", values)
+            self.sheet_partitions.observe(partition, first_updated_row(response), len(values))
 
+        except HTTPException:
+            raise
+        except GoogleApiTimeout as e:
+            raise error_exception_handler(app_status=AppStatus.ERROR_504_GATEWAY_TIMEOUT, description=e.operation)
         except Exception as e:
             logger.error(f"Error while inserting data to sheet: {e}", exc_info=True)
-            raise error_exception_handler(app_status=AppStatus.ERROR_400_INVALID_DATA, description=str(e))
+            raise error_exception_handler(app_status=google_error_status(e), description=str(e))
 
-    def upload_multiple_to_drive(self, parent_folder_id: str, folder_name: str, files: list[UploadFile]):
+        if self.feedback_mirror:
+            try:
+                await self.feedback_mirror.record(partition.title, values, first_updated_row(response))
+            except Exception as e:
+                # The rows are in the sheet; the next backfill picks them up
+                logger.warning(f"Could not mirror {len(values)} rows of '{partition.title}': {e}")
+
+    async def _create_submission_folder(self, parent_folder_id: str, folder_name: str,
+                                        parent_folder_name: str = None) -> str:
         folder_metadata = {
             'name': folder_name,
             'mimeType': 'application/vnd.google-apps.folder',
             'parents': [parent_folder_id]
         }
-        folder = self.drive_service.files().create(body=folder_metadata, fields='id').execute()
-        folder_id = folder.get('id')
-
-        for file in files:
-            file_data = io.BytesIO(file.file.read())
-            media = MediaIoBaseUpload(file_data, mimetype='application/octet-stream')
-            file_metadata = {
-                'name': file.filename,
-                'parents': [folder_id]
-            }
-            self.drive_service.files().create(body=file_metadata, media_body=media, fields='id, webViewLink').execute()
+        with span("drive_folder_create"):
+            try:
+                folder = await self.backend.create_file(folder_metadata, fields='id')
+            except GoogleApiError as e:
+                if e.status != 404 or not parent_folder_name:
+                    raise
+                # Cached parent folder was deleted in Drive
+                await self.drive_folders.invalidate(parent_folder_name)
+                folder_metadata['parents'] = [await self.create_parent_folder(parent_folder_name)]
+                folder = await self.backend.create_file(folder_metadata, fields='id')
+        return folder.get('id')
+
+    async def _prepare_attachment(self, file: UploadFile, preprocess: bool = True) -> PreparedAttachment:
+        size = file.size if file.size is not None else stream_size(file.file)
+        if not preprocess or self.image_preprocessor is None:
+            return PreparedAttachment(stream=file.file, size=size, original_size=size)
+        return await self.image_preprocessor.prepare(file.file, size)
+
+    async def _link_duplicate(self, folder_id: str, filename: str, sha256: str, file_id: str) -> str | None:
+        shortcut_metadata = {
+            'name': filename,
+            'mimeType': 'application/vnd.google-apps.shortcut',
+            'shortcutDetails': {'targetId': file_id},
+            'parents': [folder_id]
+        }
+        try:
+            shortcut = await self.backend.create_file(shortcut_metadata, fields='id')
+        except GoogleApiError as e:
+            if e.status != 404:
+                raise
+            # The original was deleted from Drive; forget it and upload again
+            await self.attachment_index.evict(sha256)
+            return None
+        return shortcut.get('id')
+
+    async def _upload_to_folder(self, folder_task: asyncio.Future, file: UploadFile,
+                                request_slots: asyncio.Semaphore) -> FileUploadResult:
+        # Hashing, the index lookup and preprocessing run while the submission folder is still being created
+        with span("attachment_hash"):
+            sha256 = await self.attachment_index.hash(file.file) if self.attachment_index else None
+            duplicate_of = await self.attachment_index.get(sha256) if sha256 else None
+        with span("image_preprocess"):
+            prepared = await self._prepare_attachment(file, preprocess=duplicate_of is None)
+        try:
+            folder_id = await asyncio.shield(folder_task)
+            queued_at = time.perf_counter()
+            async with request_slots, self.upload_slots:
+                started_at = time.perf_counter()
+                record_phase("upload_wait", started_at - queued_at)
+                result = FileUploadResult(filename=file.filename, folder_id=folder_id, size=prepared.size,
+                                          original_size=prepared.original_size,
+                                          preprocess_ms=prepared.preprocess_ms, sha256=sha256,
+                                          wait_ms=round((started_at - queued_at) * 1000, 1))
+                file_metadata = {
+                    'name': file.filename,
+                    'parents': [folder_id]
+                }
+                try:
+                    if duplicate_of:
+                        result.file_id = await self._link_duplicate(folder_id, file.filename, sha256, duplicate_of)
+                        result.deduplicated = result.file_id is not None
+                    if not result.deduplicated:
+                        if duplicate_of:
+                            prepared = await self._prepare_attachment(file)
+                        uploaded = await self.backend.upload_file(file_metadata, prepared.stream, size=prepared.size)
+                        result.file_id = uploaded.get('id')
+                        DRIVE_UPLOADED_BYTES.inc(prepared.size)
+                        if sha256:
+                            await self.attachment_index.put(sha256, result.file_id, prepared.original_size)
+                except Exception as e:
+                    logger.error(f"Error while uploading '{file.filename}' to drive: {e}", exc_info=True)
+                    result.error = str(e)
+                elapsed = time.perf_counter() - started_at
+                record_phase("drive_upload", elapsed)
+                result.elapsed_ms = round(elapsed * 1000, 1)
+        finally:
+            prepared.close()
+        return result
+
+    async def upload_multiple_to_drive(self, parent_folder_id: str, folder_name: str, files: list[UploadFile],
+                                       parent_folder_name: str = None):
+        """
+        Create the submission folder and upload `files` into it as one pipeline: uploads are
+        queued while the folder is being created, then run concurrently within the per-request
+        and global caps. A failed file is reported in its result instead of failing the rest.
+        """
+        folder_task = asyncio.create_task(self._create_submission_folder(parent_folder_id, folder_name,
+                                                                         parent_folder_name))
+        request_slots = asyncio.Semaphore(settings.DRIVE_UPLOAD_CONCURRENCY_PER_REQUEST)
+        results = await asyncio.gather(*(self._upload_to_folder(folder_task, file, request_slots) for file in files))
+        folder_id = folder_task.result()
 
         folder_link = f'https://drive.google.com/drive/folders/{folder_id}'
-        return folder_link
+        return folder_link, list(results)
+
+    async def upload_to_folder(self, folder_id: str, files: list[UploadFile]) -> list[FileUploadResult]:
+        """Upload `files` into an existing submission folder, e.g. the ones a queued job failed to upload earlier."""
+        folder = asyncio.get_running_loop().create_future()
+        folder.set_result(folder_id)
+        request_slots = asyncio.Semaphore(settings.DRIVE_UPLOAD_CONCURRENCY_PER_REQUEST)
+        return list(await asyncio.gather(*(self._upload_to_folder(folder, file, request_slots) for file in files)))
 
-    def create_parent_folder(self, parent_folder_name: str):
-        parent_folder_id = self.get_or_create_folder(parent_folder_name)
+    async def create_parent_folder(self, parent_folder_name: str):
+        with span("drive_folder_lookup"):
+            parent_folder_id = await self.get_or_create_folder(parent_folder_name)
         return parent_folder_id
 
-    def get_or_create_folder(self, folder_name: str):
-        query = f"mimeType='application/vnd.google-apps.folder' and name='{folder_name}'"
-        results = self.drive_service.files().list(q=query, fields="files(id, name)").execute()
+    async def get_or_create_folder(self, folder_name: str):
+        return await self.drive_folders.get_or_create(folder_name, resolve=self._find_or_create_folder)
+
+    async def _find_or_create_folder(self, folder_name: str):
+        escaped_name = folder_name.replace("\\", "\\\\").replace("'", "\\'")
+        query = (f"mimeType='application/vnd.google-apps.folder' and name='{escaped_name}' "
+                 f"and '{settings.GOOGLE_DRIVE_FOLDER_ID}' in parents and trashed=false")
+        results = await self.backend.list_files(q=query, fields="files(id, name)")
         folders = results.get('files', [])
         if not folders:
             folder_metadata = {
@@ -100,75 +202,135 @@ class FeedbackService:
                 'mimeType': 'application/vnd.google-apps.folder',
                 'parents': [settings.GOOGLE_DRIVE_FOLDER_ID]
             }
-            folder = self.drive_service.files().create(body=folder_metadata, fields='id').execute()
+            folder = await self.backend.create_file(folder_metadata, fields='id')
             folder_id = folder.get('id')
         else:
             folder_id = folders[0]['id']
 
         return folder_id
 
-    def create_sheet(self, sheet_name: str):
+    async def create_sheet(self, sheet_name: str, spreadsheet_id: str = None, grid: tuple[int, int] = (1000, 26)):
         try:
             requests = [{
                 "addSheet": {
                     "properties": {
                         "title": sheet_name,
                         "gridProperties": {
-                            "rowCount": 1000,
-                            "columnCount": 26
+                            "rowCount": grid[0],
+                            "columnCount": grid[1]
                         }
                     }
                 }
             }]
 
-            batch_update_request = {
-                'requests': requests
-            }
-
-            self.sheet_service.spreadsheets().batchUpdate(
-                spreadsheetId=settings.GOOGLE_SPREADSHEET_ID,
-                body=batch_update_request
-            ).execute()
+            reply = await self.backend.batch_update(spreadsheet_id or settings.GOOGLE_SPREADSHEET_ID, requests)
 
             logger.info(f"Sheet '{sheet_name}' created successfully.")
+            return reply
+        except GoogleApiTimeout as e:
+            raise error_exception_handler(app_status=AppStatus.ERROR_504_GATEWAY_TIMEOUT, description=e.operation)
         except Exception as e:
             logger.error(f"Error while creating sheet: {e}", exc_info=True)
-            raise error_exception_handler(app_status=AppStatus.ERROR_400_INVALID_DATA, description=str(e))
+            raise error_exception_handler(app_status=google_error_status(e), description=str(e))
 
-    async def create_consultation(self, feedback_data: ConsultationCreate):
+    @staticmethod
+    def _consultation_row(feedback_data: ConsultationCreate, created_at: datetime = None) -> list:
         values = {
             **feedback_data.dict(),
-            "created_at": convert_datetime_to_str(datetime.now()),
+            "created_at": convert_datetime_to_str(created_at or datetime.now()),
         }
-        self.insert_data_to_sheet(values=[list(values.values())], sheet_name="Consultation")
+        return list(values.values())
+
+    async def create_consultation(self, feedback_data: ConsultationCreate, created_at: datetime = None):
+        await self.insert_data_to_sheet(values=[self._consultation_row(feedback_data, created_at)],
+                                        sheet_name="Consultation")
+
+    @staticmethod
+    def _parse_consultation(line: bytes) -> ConsultationCreate:
+        try:
+            return ConsultationCreate(**json.loads(line))
+        except HTTPException as e:
+            raise ValueError(e.detail.get("message") if isinstance(e.detail, dict) else e.detail)
+        except ValidationError as e:
+            detail = e.errors()[0]
+            raise ValueError(f"{detail.get('msg')}: {detail.get('loc')[-1]}")
+        except (TypeError, UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise ValueError(f"Dòng không phải là đối tượng JSON hợp lệ: {e}")
+
+    async def import_consultations(self, lines: AsyncIterator[tuple[int, bytes | None]]) -> AsyncIterator[dict]:
+        """
+        Validate NDJSON consultation lines and append the valid ones to the Consultation sheet
+        CONSULTATION_BATCH_APPEND_ROWS at a time. Yields one result per line: rejected lines
+        right away, accepted (or failed) lines once their append has committed.
+        """
+        pending_lines, pending_rows = [], []
+
+        async def append_pending():
+            try:
+                await self.insert_data_to_sheet(values=pending_rows, sheet_name="Consultation")
+                results = [{"line": line_number, "status": "accepted"} for line_number in pending_lines]
+            except HTTPException as e:
+                message = e.detail.get("message") if isinstance(e.detail, dict) else str(e.detail)
+                results = [{"line": line_number, "status": "failed", "error": message}
+                           for line_number in pending_lines]
+            pending_lines.clear()
+            pending_rows.clear()
+            return results
+
+        async for line_number, line in lines:
+            if line is None:
+                yield {"line": line_number, "status": "rejected",
+                       "error": f"Dòng vượt quá {settings.CONSULTATION_BATCH_MAX_LINE_BYTES} bytes"}
+                continue
+            try:
+                feedback_data = self._parse_consultation(line)
+            except ValueError as e:
+                yield {"line": line_number, "status": "rejected", "error": str(e)}
+                continue
+            pending_lines.append(line_number)
+            pending_rows.append(self._consultation_row(feedback_data))
+            if len(pending_rows) >= settings.CONSULTATION_BATCH_APPEND_ROWS:
+                for result in await append_pending():
+                    yield result
+        if pending_rows:
+            for result in await append_pending():
+                yield result
 
-    async def create_warranty(self, feedback_data: WarrantyCreate, files: list[UploadFile] | None = None):
-        folder_name = f"warranty_{feedback_data.conversation_code}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        parent_folder_id = self.create_parent_folder("Warranty")
+    async def create_warranty(self, feedback_data: WarrantyCreate, files: list[UploadFile] | None = None,
+                             created_at: datetime = None):
+        created_at = created_at or datetime.now()
+        folder_name = f"warranty_{feedback_data.conversation_code}_{created_at.strftime('%Y%m%d%H%M%S')}"
+        parent_folder_id = await self.create_parent_folder("Warranty")
 
-        folder_link = None
+        folder_link, upload_results = None, []
         if files:
-            folder_link = self.upload_multiple_to_drive(parent_folder_id=parent_folder_id, folder_name=folder_name, files=files)
+            folder_link, upload_results = await self.upload_multiple_to_drive(parent_folder_id=parent_folder_id, folder_name=folder_name, files=files,
+                                                                              parent_folder_name="Warranty")
 
         values = {
             **feedback_data.dict(),
             "image_urls": f'=HYPERLINK("{folder_link}"; "Đường dẫn đến thư mục ảnh")' if folder_link else "",
-            "created_at": convert_datetime_to_str(datetime.now()),
+            "created_at": convert_datetime_to_str(created_at),
         }
 
-        self.insert_data_to_sheet(values=[list(values.values())], sheet_name="Warranty")
+        await self.insert_data_to_sheet(values=[list(values.values())], sheet_name="Warranty")
+        return upload_results
 
-    async def create_complaint(self, feedback_data: ComplaintCreate, files: list[UploadFile] | None = None):
-        folder_name = f"complaint_{feedback_data.conversation_code}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        parent_folder_id = self.create_parent_folder("Complaint")
+    async def create_complaint(self, feedback_data: ComplaintCreate, files: list[UploadFile] | None = None,
+                             created_at: datetime = None):
+        created_at = created_at or datetime.now()
+        folder_name = f"complaint_{feedback_data.conversation_code}_{created_at.strftime('%Y%m%d%H%M%S')}"
+        parent_folder_id = await self.create_parent_folder("Complaint")
 
         # Upload ảnh nếu có
-        folder_link = None
+        folder_link, upload_results = None, []
         if files:
-            folder_link = self.upload_multiple_to_drive(parent_folder_id=parent_folder_id, folder_name=folder_name, files=files)
+            folder_link, upload_results = await self.upload_multiple_to_drive(parent_folder_id=parent_folder_id, folder_name=folder_name, files=files,
+                                                                              parent_folder_name="Complaint")
         values = {
             **feedback_data.dict(),
             "image_urls": f'=HYPERLINK("{folder_link}"; "Đường dẫn đến thư mục ảnh")' if folder_link else "",
-            "created_at": convert_datetime_to_str(datetime.now()),
+            "created_at": convert_datetime_to_str(created_at),
         }
-        self.insert_data_to_sheet(values=[list(values.values())], sheet_name="Complaint")
+        await self.insert_data_to_sheet(values=[list(values.values())], sheet_name="Complaint")
+        return upload_results
@@ -0,0 +1,214 @@
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+from fastapi import UploadFile
+from pydantic import BaseModel
+
+from app.clients.attachment_index import hash_upload
+from app.constant import AppStatus, FeedbackTypeEnum
+from app.core import error_exception_handler, settings
+
+logger = logging.getLogger(__name__)
+
+
+async def payload_digest(feedback_data: BaseModel, files: list[UploadFile] | None = None) -> str:
+    """sha256 of the submitted fields and of each attachment's name and content."""
+    digest = hashlib.sha256(feedback_data.json(exclude={"image_urls"}, sort_keys=True).encode())
+    file_digests = await asyncio.gather(*(hash_upload(file.file) for file in files or []))
+    for file, file_digest in zip(files or [], file_digests):
+        digest.update(f"\0{file.filename}\0{file_digest}".encode())
+    return digest.hexdigest()
+
+
+def make_idempotency_key(kind: FeedbackTypeEnum, idempotency_key: str | None, feedback_data: BaseModel,
+                         digest: str) -> str:
+    """Client-supplied Idempotency-Key, or conversation_code plus the payload digest."""
+    if idempotency_key:
+        return f"{kind.value}:key:{idempotency_key}"
+    return f"{kind.value}:{feedback_data.conversation_code}:{digest}"
+
+
+class IdempotencyCache:
+    """
+    TTL cache of feedback responses keyed by idempotency key, each stored with the digest of the
+    payload it answered: reusing a key for a different payload is refused with 422. Completed
+    responses also go to a small SQLite store shared by all gunicorn workers
+    (IDEMPOTENCY_STORE_PATH), so a retry routed to another worker is replayed as well. A duplicate
+    that arrives while the first attempt is running waits for its result in the same process, and
+    gets 409 (retry later) on another worker. Failed attempts are not stored, so the client can retry.
+    """
+
+    def __init__(self, path: str = None, max_entries: int = None, ttl: float = None):
+        self.max_entries = max_entries or settings.IDEMPOTENCY_MAX_ENTRIES
+        self.ttl = ttl or settings.IDEMPOTENCY_TTL
+        # An attempt can't outlive the longest request budget; a reservation older than that was abandoned
+        self.lease = settings.GOOGLE_UPLOAD_REQUEST_BUDGET
+        # Only one attempt per key runs in a process, so a reservation of ours found by `_claim` is a stale one
+        self.owner = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.path = Path(path or settings.IDEMPOTENCY_STORE_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                status_code INTEGER,
+                body BLOB,
+                owner TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                lease_until REAL NOT NULL
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_responses_created ON responses (created_at)")
+        self._entries: OrderedDict[str, tuple[float, str, asyncio.Future]] = OrderedDict()
+        self._replays = 0
+        self._shared_replays = 0
+        self._joined = 0
+        self._misses = 0
+        self._conflicts = 0
+        self._key_reuses = 0
+
+    def _lookup(self, key: str) -> tuple[str, asyncio.Future] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        created_at, digest, future = entry
+        if time.monotonic() - created_at > self.ttl:
+            del self._entries[key]
+            return None
+        return digest, future
+
+    def _evict(self):
+        # Entries are kept in insertion order, so the oldest (first to expire) sit at the front
+        now = time.monotonic()
+        while self._entries:
+            created_at, _, _ = next(iter(self._entries.values()))
+            if len(self._entries) <= self.max_entries and now - created_at <= self.ttl:
+                break
+            self._entries.popitem(last=False)
+
+    def _claim(self, key: str, digest: str) -> tuple | None:
+        """The stored (digest, status_code, body) for `key`, or None once it is reserved for this attempt."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT digest, status_code, body, owner, created_at, lease_until "
+                                         "FROM responses WHERE key = ?", (key,)).fetchone()
+                if row and now - row[4] <= self.ttl and (row[1] is not None or (row[5] > now and row[3] != self.owner)):
+                    return row[:3]
+                self._conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, NULL, NULL, ?, ?, ?)",
+                                   (key, digest, self.owner, now, now + self.lease))
+                return None
+            finally:
+                self._conn.execute("COMMIT")
+
+    def _store(self, key: str, status_code: int, body: bytes):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("UPDATE responses SET status_code = ?, body = ? WHERE key = ? AND owner = ?",
+                               (status_code, body, key, self.owner))
+            self._conn.execute(
+                "DELETE FROM responses WHERE created_at < ? OR key IN ("
+                " SELECT key FROM responses ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (now - self.ttl, self.max_entries))
+
+    def _release(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ? AND owner = ? AND status_code IS NULL",
+                               (key, self.owner))
+
+    async def _release_quietly(self, key: str):
+        try:
+            await asyncio.to_thread(self._release, key)
+        except sqlite3.Error as e:
+            # The reservation expires with its lease
+            logger.warning(f"Could not release idempotency key {key}: {e}")
+
+    async def run(self, key: str, digest: str, handler) -> tuple[tuple[int, bytes], bool]:
+        """
+        Return ((status_code, body) from `await handler()` or the stored response for `key`, whether
+        it was replayed). Raises 422 when `key` answered a payload other than `digest`, and 409 while
+        another worker is still running it.
+        """
+        while (entry := self._lookup(key)) is not None:
+            entry_digest, future = entry
+            if entry_digest != digest:
+                self._key_reuses += 1
+                raise error_exception_handler(AppStatus.ERROR_422_IDEMPOTENCY_KEY_REUSED)
+            if future.done() and not future.cancelled():
+                self._replays += 1
+                return future.result(), True
+            self._joined += 1
+            try:
+                return await asyncio.shield(future), True
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The original attempt was abandoned (client went away); run it ourselves
+
+        future = asyncio.get_running_loop().create_future()
+        self._entries[key] = (time.monotonic(), digest, future)
+        self._evict()
+        claimed = False
+        try:
+            stored = await asyncio.to_thread(self._claim, key, digest)
+            claimed = stored is None
+            if claimed:
+                self._misses += 1
+                result = await handler()
+            elif stored[0] != digest:
+                self._key_reuses += 1
+                raise error_exception_handler(AppStatus.ERROR_422_IDEMPOTENCY_KEY_REUSED)
+            elif stored[1] is None:
+                self._conflicts += 1
+                raise error_exception_handler(AppStatus.ERROR_409_REQUEST_IN_PROGRESS)
+            else:
+                self._shared_replays += 1
+                result = (stored[1], stored[2])
+        except BaseException as e:
+            self._entries.pop(key, None)
+            if isinstance(e, Exception):
+                future.set_exception(e)
+                # Mark retrieved so waiter-less failures don't log "exception was never retrieved"
+                future.exception()
+            else:
+                future.cancel()
+            if claimed:
+                await self._release_quietly(key)
+            raise
+        future.set_result(result)
+        if not claimed:
+            return result, True
+        try:
+            await asyncio.to_thread(self._store, key, *result)
+        except sqlite3.Error as e:
+            # Still replayed by this worker from memory
+            logger.warning(f"Could not store the response for idempotency key {key}: {e}")
+            await self._release_quietly(key)
+        return result, False
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "replays": self._replays,
+            "shared_replays": self._shared_replays,
+            "joined_in_flight": self._joined,
+            "conflicts": self._conflicts,
+            "key_reuses": self._key_reuses,
+            "misses": self._misses,
+        }
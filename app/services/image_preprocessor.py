@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+
+from app.core import settings
+from app.utils import sniff_mime_type, MIME_SNIFF_BYTES
+from app.utils.image_util import RESIZABLE_IMAGE_FORMATS, downscale_image
+
+logger = logging.getLogger(__name__)
+
+try:
+    import PIL  # noqa: F401
+    PILLOW_AVAILABLE = True
+except ImportError:
+    PILLOW_AVAILABLE = False
+
+
+@dataclass
+class PreparedAttachment:
+    stream: object
+    size: int
+    original_size: int
+    preprocess_ms: float = 0
+    owns_stream: bool = False
+    temp_paths: list[str] = field(default_factory=list)
+
+    def close(self):
+        if self.owns_stream:
+            self.stream.close()
+        for path in self.temp_paths:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+class ImagePreprocessor:
+    """
+    Optional stage in front of the Drive upload that downscales and re-encodes large photos.
+    Decoding runs in a ProcessPoolExecutor, so it never competes with the event loop for the GIL.
+    A pool broken by a dying worker (e.g. OOM-killed on a huge image) is replaced on the spot.
+    """
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers or settings.IMAGE_PREPROCESS_WORKERS
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        self._restarts = 0
+        self._images = 0
+        self._resized = 0
+        self._bytes_in = 0
+        self._bytes_saved = 0
+        self._elapsed_ms = 0.0
+
+    @staticmethod
+    def _sniff(stream) -> str | None:
+        position = stream.tell()
+        head = stream.read(MIME_SNIFF_BYTES)
+        stream.seek(position)
+        return sniff_mime_type(head)
+
+    @staticmethod
+    def _disk_path(stream) -> str | None:
+        """A path the worker process can read the whole attachment from without copying it, if there is one."""
+        if stream.tell() != 0:
+            return None
+        name = getattr(stream, "name", None)
+        if isinstance(name, str) and os.path.isfile(name):
+            # Journal spool files of queued submissions
+            return name
+        try:
+            # Upload bodies spooled to an unnamed temporary file are reachable through /proc on Linux
+            stream.flush()
+            path = f"/proc/{os.getpid()}/fd/{stream.fileno()}"
+        except (AttributeError, OSError):
+            return None
+        return path if os.path.exists(path) else None
+
+    @staticmethod
+    def _spool_to_disk(stream) -> str:
+        position = stream.tell()
+        with tempfile.NamedTemporaryFile(delete=False, prefix="attachment-") as out:
+            shutil.copyfileobj(stream, out, 1024 * 1024)
+        stream.seek(position)
+        return out.name
+
+    def _replace_executor(self, broken: ProcessPoolExecutor):
+        # Concurrent images fail together on a broken pool; only the first replaces it
+        if self._executor is broken:
+            self._restarts += 1
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+    async def prepare(self, stream, size: int) -> PreparedAttachment:
+        prepared = PreparedAttachment(stream=stream, size=size, original_size=size)
+        if size < settings.IMAGE_PREPROCESS_MIN_SIZE:
+            return prepared
+        mime_type = await asyncio.to_thread(self._sniff, stream)
+        if mime_type not in RESIZABLE_IMAGE_FORMATS:
+            return prepared
+
+        started_at = time.perf_counter()
+        src_path = await asyncio.to_thread(self._disk_path, stream)
+        if src_path is None:
+            src_path = await asyncio.to_thread(self._spool_to_disk, stream)
+            prepared.temp_paths.append(src_path)
+        fd, dst_path = tempfile.mkstemp(prefix="attachment-", suffix=".out")
+        os.close(fd)
+        prepared.temp_paths.append(dst_path)
+        executor = self._executor
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(executor, downscale_image, src_path, dst_path, mime_type,
+                                       settings.IMAGE_MAX_DIMENSION, settings.IMAGE_QUALITY)
+            new_size = os.path.getsize(dst_path)
+        except BrokenProcessPool as e:
+            logger.warning(f"Image preprocessing pool broke, restarting it and uploading original: {e}")
+            self._replace_executor(executor)
+            prepared.close()
+            prepared.temp_paths = []
+            return prepared
+        except Exception as e:
+            logger.warning(f"Image preprocessing failed, uploading original: {e}")
+            prepared.close()
+            prepared.temp_paths = []
+            return prepared
+
+        prepared.preprocess_ms = round((time.perf_counter() - started_at) * 1000, 1)
+        self._images += 1
+        self._bytes_in += size
+        self._elapsed_ms += prepared.preprocess_ms
+        if new_size < size:
+            self._resized += 1
+            self._bytes_saved += size - new_size
+            prepared.stream = open(dst_path, "rb")
+            prepared.owns_stream = True
+            prepared.size = new_size
+        return prepared
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "pool_restarts": self._restarts,
+            "images": self._images,
+            "resized": self._resized,
+            "bytes_in": self._bytes_in,
+            "bytes_saved": self._bytes_saved,
+            "avg_ms_per_image": round(self._elapsed_ms / self._images, 1) if self._images else 0,
+        }
@@ -1 +1,3 @@
-from .convert_util import convert_datetime_to_str
\ No newline at end of file
+from .convert_util import convert_datetime_to_str
+from .file_util import sniff_mime_type, MIME_SNIFF_BYTES
+from .ndjson_util import iter_ndjson_lines
@@ -0,0 +1,58 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Enough for an ftyp box's major brand and its first several compatible brands
+MIME_SNIFF_BYTES = 64
+
+# ISO base media (ftyp) brands by family, most specific first: a file is typed by its major brand
+# when that names a format, otherwise by the first compatible brand that does
+_ISO_MEDIA_FAMILIES = (
+    ("image/heic", (b"heic", b"heix", b"heim", b"heis", b"hevc", b"hevx", b"hevm", b"hevs")),
+    ("image/avif", (b"avif", b"avis")),
+    ("video/quicktime", (b"qt  ",)),
+    ("audio/mp4", (b"M4A", b"M4B", b"M4P")),
+    ("video/3gpp2", (b"3g2",)),
+    ("video/3gpp", (b"3gp", b"3gs", b"3ge", b"3gg", b"3gr")),
+    ("video/mp4", (b"mp41", b"mp42", b"mp71", b"avc1", b"M4V", b"f4v", b"dash", b"mmp4", b"MSNV", b"NDAS")),
+    ("image/heif", (b"mif1", b"msf1", b"mif2", b"miaf")),
+    ("video/mp4", (b"isom", b"iso")),
+)
+# Brands that only say which version of the container spec a file follows
+_GENERIC_ISO_BRANDS = (b"isom", b"iso", b"mif1", b"msf1", b"mif2", b"miaf")
+
+
+def _iso_media_family(brand: bytes) -> str | None:
+    for mime_type, prefixes in _ISO_MEDIA_FAMILIES:
+        if brand.startswith(prefixes):
+            return mime_type
+    return None
+
+
+def _sniff_iso_media(head: bytes) -> str | None:
+    box_size = int.from_bytes(head[:4], "big")
+    major = head[8:12]
+    compatible = [head[i:i + 4] for i in range(16, min(box_size or len(head), len(head)) - 3, 4)]
+    if not major.startswith(_GENERIC_ISO_BRANDS) and (mime_type := _iso_media_family(major)):
+        return mime_type
+    for mime_type, prefixes in _ISO_MEDIA_FAMILIES:
+        if any(brand.startswith(prefixes) for brand in compatible):
+            return mime_type
+    return _iso_media_family(major)
+
+
+def sniff_mime_type(head: bytes) -> str | None:
+    """Detect the MIME type of a file from its first bytes (magic numbers) instead of trusting the client."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head.startswith(b"%PDF-"):
+        return "application/pdf"
+    if head[4:8] == b"ftyp":
+        return _sniff_iso_media(head)
+    return None
@@ -0,0 +1,33 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Formats Pillow can re-encode without losing anything triage needs (animated GIFs and
+# HEIC are left as they are)
+RESIZABLE_IMAGE_FORMATS = {"image/jpeg": "JPEG", "image/png": "PNG", "image/webp": "WEBP"}
+
+
+def downscale_image(src_path: str, dst_path: str, mime_type: str, max_dimension: int, quality: int) -> dict:
+    """
+    Downscale the image at `src_path` so its longest side is at most `max_dimension` and re-encode
+    it to `dst_path`. Runs inside a worker process; returns plain data so it pickles cheaply.
+    """
+    from PIL import Image, ImageOps
+
+    started_at = time.perf_counter()
+    with Image.open(src_path) as image:
+        image = ImageOps.exif_transpose(image)
+        original_dimensions = image.size
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        image_format = RESIZABLE_IMAGE_FORMATS[mime_type]
+        if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        options = {"optimize": True} if image_format == "PNG" else {"quality": quality, "optimize": True}
+        image.save(dst_path, format=image_format, **options)
+        dimensions = image.size
+    return {
+        "original_dimensions": original_dimensions,
+        "dimensions": dimensions,
+        "elapsed_ms": round((time.perf_counter() - started_at) * 1000, 1),
+    }
@@ -0,0 +1,35 @@
+from typing import AsyncIterable, AsyncIterator
+
+
+async def iter_ndjson_lines(chunks: AsyncIterable[bytes], max_line_bytes: int
+                            ) -> AsyncIterator[tuple[int, bytes | None]]:
+    """
+    Split a streamed newline-delimited body into `(line_number, line)` pairs, holding at most
+    one line in memory. Lines longer than `max_line_bytes` are skipped and yielded as None;
+    blank lines are skipped silently.
+    """
+    buffer = bytearray()
+    line_number = 0
+    oversized = False
+    async for chunk in chunks:
+        start = 0
+        while (end := chunk.find(b"\n", start)) != -1:
+            line_number += 1
+            if oversized or len(buffer) + end - start > max_line_bytes:
+                yield line_number, None
+            else:
+                buffer += chunk[start:end]
+                if buffer.strip():
+                    yield line_number, bytes(buffer)
+            buffer.clear()
+            oversized = False
+            start = end + 1
+        if not oversized:
+            buffer += chunk[start:]
+            if len(buffer) > max_line_bytes:
+                oversized = True
+                buffer.clear()
+    if oversized:
+        yield line_number + 1, None
+    elif buffer.strip():
+        yield line_number + 1, bytes(buffer)
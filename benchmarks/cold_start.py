@@ -0,0 +1,204 @@
+"""
+Cold-start benchmark: how long a fresh API process takes to import `app.main`, to accept
+connections, to report ready on /api/health/ready (lifespan warm-up done) and to answer its
+first feedback request, plus its RSS once ready. Each run starts a new uvicorn process against
+the fake Google server, so nothing is cached between runs except the OS page cache:
+
+    python -m benchmarks.cold_start --runs 5 --backends discovery,async
+    python -m benchmarks.cold_start --importtime          # also list the slowest imports
+    python -m benchmarks.cold_start --compare benchmarks/results/<earlier run>.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+from benchmarks.fake_google import add_config_arguments
+from benchmarks.load_test import (ROOT, RESULTS_DIR, FeedbackPayloads, app_command, app_environment,
+                                  fake_google_command, free_port, git_revision, read_rss_kb, wait_until_ready)
+
+BACKENDS = ("discovery", "async")
+METRICS = ("import_ms", "listening_ms", "ready_ms", "first_request_ms", "second_request_ms", "rss_mb")
+POLL_INTERVAL = 0.005
+
+IMPORT_SCRIPT = "import time; started = time.perf_counter(); import app.main; print((time.perf_counter() - started) * 1000)"
+
+
+def measure_import(env: dict) -> float:
+    output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def slowest_imports(env: dict, count: int) -> list[tuple[str, float]]:
+    """Top-level-ish modules by cumulative import time, from `python -X importtime`."""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Two levels deep is enough to attribute the cost to a package
+        if len(name) - len(name.lstrip()) <= 3:
+            modules.append((name.strip(), int(cumulative) / 1000))
+    return sorted(modules, key=lambda item: item[1], reverse=True)[:count]
+
+
+def wait_for(client: httpx.Client, url: str, process: subprocess.Popen, ok, timeout: float) -> float:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"API exited with {process.returncode}")
+        try:
+            if ok(client.get(url)):
+                return time.monotonic()
+        except httpx.TransportError:
+            pass
+        time.sleep(POLL_INTERVAL)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+def measure_startup(env: dict, payloads: FeedbackPayloads, log, timeout: float) -> dict:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.monotonic()
+    process = subprocess.Popen(app_command(port), cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        with httpx.Client(base_url=base_url, timeout=timeout) as client:
+            listening = wait_for(client, "/api/health/ready", process, lambda r: True, timeout)
+            ready = wait_for(client, "/api/health/ready", process, lambda r: r.status_code == 200, timeout)
+            rss = read_rss_kb(process.pid)
+            latencies = []
+            for _ in range(2):
+                request_started = time.perf_counter()
+                response = client.post("/api/feedbacks/consultation", **payloads.build("consultation"))
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - request_started) * 1000)
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return {
+        "listening_ms": round((listening - started) * 1000, 1),
+        "ready_ms": round((ready - started) * 1000, 1),
+        "first_request_ms": round(latencies[0], 1),
+        "second_request_ms": round(latencies[1], 1),
+        "rss_mb": round(rss["VmRSS"] / 1024, 1) if "VmRSS" in rss else None,
+    }
+
+
+def summarize(runs: list[dict]) -> dict:
+    summary = {}
+    for metric in METRICS:
+        values = [run[metric] for run in runs if run.get(metric) is not None]
+        if values:
+            summary[metric] = {"median": round(statistics.median(values), 1), "min": round(min(values), 1),
+                               "max": round(max(values), 1)}
+    return summary
+
+
+def print_summary(backend: str, summary: dict):
+    print(f"{backend:<10} " + "  ".join(f"{metric.removesuffix('_ms').removesuffix('_mb')} "
+                                         f"{values['median']:>7.1f}{' MB' if metric == 'rss_mb' else ' ms'}"
+                                         for metric, values in summary.items()))
+
+
+def compare(current: dict, baseline: dict):
+    print(f"\nCompared with {baseline['git'].get('commit')} ({baseline['timestamp']}), medians:")
+    for backend, summary in current["backends"].items():
+        before = baseline["backends"].get(backend)
+        if not before:
+            continue
+        deltas = []
+        for metric, values in summary.items():
+            then = before.get(metric, {}).get("median")
+            if then:
+                deltas.append(f"{metric.removesuffix('_ms').removesuffix('_mb')} "
+                              f"{(values['median'] - then) / then * 100:+.1f}%")
+        print(f"  {backend:<10} " + "  ".join(deltas))
+
+
+def run(args) -> dict:
+    fake_port = free_port()
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="reflectly-cold-start-") as workdir:
+        workdir = Path(workdir)
+        log = open(workdir / "servers.log", "wb")
+        fake = subprocess.Popen(fake_google_command(args, fake_port), cwd=ROOT, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            asyncio.run(wait_until_ready(f"http://127.0.0.1:{fake_port}/_state", fake))
+            payloads = FeedbackPayloads(0, 0)
+            for backend in args.backends:
+                env = {**app_environment(args, workdir, f"http://127.0.0.1:{fake_port}"), "GOOGLE_BACKEND": backend}
+                if args.importtime:
+                    print(f"Slowest imports ({backend}):")
+                    for name, cumulative in slowest_imports(env, args.importtime):
+                        print(f"  {cumulative:>8.1f} ms  {name}")
+                runs = []
+                for _ in range(args.runs):
+                    runs.append({"import_ms": round(measure_import(env), 1),
+                                 **measure_startup(env, payloads, log, args.timeout)})
+                results[backend] = summarize(runs)
+                print_summary(backend, results[backend])
+        except BaseException:
+            log.flush()
+            print(f"Server output:\n{(workdir / 'servers.log').read_text(errors='replace')[-4000:]}", file=sys.stderr)
+            raise
+        finally:
+            fake.terminate()
+            fake.wait(10)
+            log.close()
+
+    return {
+        "label": args.label,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {"runs": args.runs, "app_env": args.app_env, "latency_ms": args.latency_ms},
+        "backends": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per backend")
+    parser.add_argument("--backends", type=lambda v: v.split(","), default=list(BACKENDS))
+    parser.add_argument("--importtime", type=int, nargs="?", const=15, default=0, metavar="COUNT",
+                        help="print the COUNT slowest imports of app.main")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE")
+    parser.add_argument("--label", default=None)
+    parser.add_argument("--output", type=Path, default=None, help="results file (default: benchmarks/results/)")
+    parser.add_argument("--compare", type=Path, default=None, help="earlier results file to diff against")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    unknown = set(args.backends) - set(BACKENDS)
+    if unknown:
+        parser.error(f"unknown backends: {', '.join(sorted(unknown))}")
+
+    results = run(args)
+
+    output = args.output or (RESULTS_DIR /
+                             f"{datetime.now():%Y%m%d-%H%M%S}-{results['git']['commit'] or 'nogit'}-cold-start.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2, ensure_ascii=False))
+    print(f"\nSaved {output}")
+    if args.compare:
+        compare(results, json.loads(args.compare.read_text()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+In-memory stand-in for the slice of Sheets v4 / Drive v3 REST (plus the OAuth token endpoint)
+that FeedbackService uses, with configurable latency, error injection and per-API quota
+simulation. Point GOOGLE_TOKEN_URI, GOOGLE_SHEETS_API_URL and GOOGLE_DRIVE_API_URL at it:
+
+    python -m benchmarks.fake_google --port 8765 --latency-ms 80 --error-rate 0.01
+
+Uploaded file bodies are counted, not kept, so long runs don't grow the server's memory much;
+appended sheet rows are kept so values.get can serve them back. Each spreadsheet id gets its own
+set of tabs on first use, and files created with the spreadsheet MIME type start with a
+1000x26 Sheet1 like real ones.
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, asdict
+from urllib.parse import unquote
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+SHEETS_READ = "sheets_read"
+SHEETS_WRITE = "sheets_write"
+DRIVE = "drive"
+
+CONTENT_RANGE = re.compile(r"bytes (?:(\d+)-(\d+)|\*)/(\d+|\*)")
+A1_RANGE = re.compile(r"^'?(.*?)'?!([A-Z]+)(\d+)(?::([A-Z]+)(\d+)?)?$")
+SPREADSHEET_MIME_TYPE = "application/vnd.google-apps.spreadsheet"
+DEFAULT_GRID = {"rowCount": 1000, "columnCount": 26}
+
+
+@dataclass
+class Tab:
+    sheet_id: int
+    grid: dict
+    rows: list[list]
+
+
+@dataclass
+class FakeGoogleConfig:
+    latency_ms: float = 50
+    jitter_ms: float = 20
+    error_rate: float = 0.0
+    # 0 disables the quota; Google's defaults per user are 60/min for Sheets and ~200/s for Drive
+    sheets_reads_per_minute: int = 0
+    sheets_writes_per_minute: int = 0
+    drive_queries_per_second: int = 0
+
+
+def google_error(status: int, message: str, reason: str, headers: dict = None) -> JSONResponse:
+    return JSONResponse({"error": {"code": status, "message": message, "errors": [{"reason": reason}]}},
+                        status_code=status, headers=headers)
+
+
+class SlidingWindowQuota:
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self._calls = deque()
+
+    def take(self) -> float | None:
+        """Record a call, or return the seconds until one is allowed if the quota is used up."""
+        now = time.monotonic()
+        while self._calls and now - self._calls[0] >= self.window:
+            self._calls.popleft()
+        if len(self._calls) >= self.limit:
+            return self.window - (now - self._calls[0])
+        self._calls.append(now)
+        return None
+
+
+class FakeGoogle:
+
+    def __init__(self, config: FakeGoogleConfig):
+        self.config = config
+        self.quotas = {
+            name: SlidingWindowQuota(limit, window) for name, limit, window in (
+                (SHEETS_READ, config.sheets_reads_per_minute, 60),
+                (SHEETS_WRITE, config.sheets_writes_per_minute, 60),
+                (DRIVE, config.drive_queries_per_second, 1),
+            ) if limit
+        }
+        self.reset()
+
+    def reset(self):
+        self.spreadsheets: dict[str, dict[str, Tab]] = {}
+        self.files: dict[str, dict] = {}
+        self.sessions: dict[str, dict] = {}
+        self.calls: dict[str, int] = {}
+        self.errors: dict[str, int] = {}
+        self.uploaded_bytes = 0
+
+    async def _admit(self, api: str | None, operation: str) -> Response | None:
+        self.calls[operation] = self.calls.get(operation, 0) + 1
+        delay = self.config.latency_ms + random.uniform(-1, 1) * self.config.jitter_ms
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        quota = self.quotas.get(api)
+        retry_after = quota.take() if quota else None
+        if retry_after is not None:
+            self.errors["429"] = self.errors.get("429", 0) + 1
+            return google_error(429, f"Quota exceeded for {api}", "rateLimitExceeded",
+                                headers={"Retry-After": str(max(1, round(retry_after)))})
+        if self.config.error_rate and random.random() < self.config.error_rate:
+            self.errors["503"] = self.errors.get("503", 0) + 1
+            return google_error(503, "The service is currently unavailable.", "backendError")
+        return None
+
+    # OAuth
+
+    async def token(self, request: Request):
+        await self._admit(None, "oauth2.token")
+        return JSONResponse({"access_token": uuid.uuid4().hex, "expires_in": 3600, "token_type": "Bearer"})
+
+    # Sheets v4
+
+    def _tabs(self, request: Request) -> dict[str, Tab]:
+        return self.spreadsheets.setdefault(request.path_params["spreadsheet_id"], {})
+
+    async def get_spreadsheet(self, request: Request):
+        if error := await self._admit(SHEETS_READ, "sheets.spreadsheets.get"):
+            return error
+        return JSONResponse({"sheets": [{"properties": {"title": title, "sheetId": tab.sheet_id,
+                                                        "gridProperties": tab.grid}}
+                                        for title, tab in self._tabs(request).items()]})
+
+    async def batch_update(self, request: Request):
+        if error := await self._admit(SHEETS_WRITE, "sheets.spreadsheets.batchUpdate"):
+            return error
+        tabs = self._tabs(request)
+        replies = []
+        for item in (await request.json()).get("requests", []):
+            properties = item.get("addSheet", {}).get("properties")
+            if properties is None:
+                replies.append({})
+                continue
+            title = properties["title"]
+            if title in tabs:
+                return google_error(400, f'Invalid requests[0].addSheet: A sheet with the name "{title}" '
+                                         f'already exists. Please enter another name.', "badRequest")
+            tabs[title] = Tab(len(tabs) + 1, {**DEFAULT_GRID, **properties.get("gridProperties", {})}, [])
+            replies.append({"addSheet": {"properties": {**properties, "sheetId": tabs[title].sheet_id,
+                                                        "gridProperties": tabs[title].grid}}})
+        return JSONResponse({"replies": replies})
+
+    async def append_values(self, request: Request):
+        if error := await self._admit(SHEETS_WRITE, "sheets.spreadsheets.values.append"):
+            return error
+        range_ = unquote(request.path_params["range"])
+        title = range_.split("!")[0].strip("'")
+        tab = self._tabs(request).get(title)
+        if tab is None:
+            return google_error(400, f"Unable to parse range: {range_}", "badRequest")
+        values = (await request.json()).get("values", [])
+        start = len(tab.rows) + 1
+        tab.rows.extend(values)
+        # INSERT_ROWS
+        tab.grid["rowCount"] += len(values)
+        end_column = chr(ord("A") + max(1, max(map(len, values), default=1)) - 1)
+        updated_range = f"{title}!A{start}:{end_column}{start + len(values) - 1}"
+        return JSONResponse({"updates": {"updatedRange": updated_range, "updatedRows": len(values)}})
+
+    async def get_values(self, request: Request):
+        if error := await self._admit(SHEETS_READ, "sheets.spreadsheets.values.get"):
+            return error
+        range_ = unquote(request.path_params["range"])
+        match = A1_RANGE.match(range_)
+        tab = self._tabs(request).get(match.group(1)) if match else None
+        if tab is None:
+            return google_error(400, f"Unable to parse range: {range_}", "badRequest")
+        first = int(match.group(3))
+        last = int(match.group(5)) if match.group(5) else first if not match.group(4) else len(tab.rows)
+        values = tab.rows[first - 1:last]
+        return JSONResponse({"range": range_, "majorDimension": "ROWS", **({"values": values} if values else {})})
+
+    # Drive v3
+
+    async def list_files(self, request: Request):
+        if error := await self._admit(DRIVE, "drive.files.list"):
+            return error
+        q = request.query_params.get("q", "")
+        name = re.search(r"name\s*=\s*'((?:[^'\\]|\\.)*)'", q)
+        parent = re.search(r"'([^']+)'\s+in\s+parents", q)
+        files = [
+            {"id": file_id, "name": file["name"]} for file_id, file in self.files.items()
+            if (not name or file["name"] == name.group(1).replace("\\'", "'"))
+            and (not parent or parent.group(1) in file.get("parents", []))
+        ]
+        return JSONResponse({"files": files})
+
+    def _add_file(self, metadata: dict, size: int = 0) -> dict:
+        file_id = uuid.uuid4().hex[:16]
+        self.files[file_id] = {"name": metadata.get("name", "Untitled"), "parents": metadata.get("parents", []),
+                               "mimeType": metadata.get("mimeType"), "size": size}
+        self.uploaded_bytes += size
+        if metadata.get("mimeType") == SPREADSHEET_MIME_TYPE:
+            self.spreadsheets[file_id] = {"Sheet1": Tab(0, dict(DEFAULT_GRID), [])}
+        return {"id": file_id, "webViewLink": f"https://drive.example/file/d/{file_id}/view"}
+
+    async def create_file(self, request: Request):
+        if error := await self._admit(DRIVE, "drive.files.create"):
+            return error
+        return JSONResponse(self._add_file(await request.json()))
+
+    async def upload_file(self, request: Request):
+        if error := await self._admit(DRIVE, "drive.files.upload"):
+            return error
+        upload_type = request.query_params.get("uploadType")
+        if upload_type == "resumable":
+            session_id = uuid.uuid4().hex
+            self.sessions[session_id] = {"metadata": await request.json(), "received": 0}
+            location = request.url.include_query_params(upload_id=session_id)
+            return Response(headers={"Location": str(location)})
+        body = await request.body()
+        boundary = request.headers.get("content-type", "").partition("boundary=")[2].strip('"')
+        parts = body.split(f"--{boundary}".encode()) if boundary else []
+        metadata = json.loads(parts[1].split(b"\r\n\r\n", 1)[1]) if len(parts) > 2 else {}
+        media = parts[2].split(b"\r\n\r\n", 1)[1][:-2] if len(parts) > 2 else body
+        return JSONResponse(self._add_file(metadata, len(media)))
+
+    async def upload_chunk(self, request: Request):
+        session = self.sessions.get(request.query_params.get("upload_id"))
+        if session is None:
+            return google_error(404, "Upload session not found", "notFound")
+        if error := await self._admit(DRIVE, "drive.files.upload"):
+            return error
+        match = CONTENT_RANGE.match(request.headers.get("content-range", ""))
+        if not match:
+            return google_error(400, "Missing Content-Range", "badRequest")
+        start, _, total = match.groups()
+        chunk = await request.body()
+        if start is not None and int(start) == session["received"]:
+            session["received"] += len(chunk)
+        if total != "*" and session["received"] >= int(total):
+            del self.sessions[request.query_params["upload_id"]]
+            return JSONResponse(self._add_file(session["metadata"], session["received"]))
+        headers = {"Range": f"bytes=0-{session['received'] - 1}"} if session["received"] else {}
+        return Response(status_code=308, headers=headers)
+
+    # Control
+
+    async def state(self, request: Request):
+        return JSONResponse({
+            "config": asdict(self.config),
+            "calls": self.calls,
+            "errors": self.errors,
+            "rows": {spreadsheet_id: {title: len(tab.rows) for title, tab in tabs.items()}
+                     for spreadsheet_id, tabs in self.spreadsheets.items()},
+            "files": len(self.files),
+            "uploaded_bytes": self.uploaded_bytes,
+            "open_upload_sessions": len(self.sessions),
+        })
+
+    async def reset_state(self, request: Request):
+        self.reset()
+        return JSONResponse({})
+
+    async def update_config(self, request: Request):
+        """Change latency/error injection mid-run, e.g. `{"error_rate": 1}` to simulate an outage."""
+        for name, value in (await request.json()).items():
+            if hasattr(self.config, name):
+                setattr(self.config, name, type(getattr(self.config, name))(value))
+        return JSONResponse(asdict(self.config))
+
+
+def create_app(config: FakeGoogleConfig = None) -> Starlette:
+    fake = FakeGoogle(config or FakeGoogleConfig())
+    return Starlette(routes=[
+        Route("/token", fake.token, methods=["POST"]),
+        Route("/v4/spreadsheets/{spreadsheet_id}", fake.get_spreadsheet, methods=["GET"]),
+        Route("/v4/spreadsheets/{spreadsheet_id}:batchUpdate", fake.batch_update, methods=["POST"]),
+        Route("/v4/spreadsheets/{spreadsheet_id}/values/{range}:append", fake.append_values, methods=["POST"]),
+        Route("/v4/spreadsheets/{spreadsheet_id}/values/{range}", fake.get_values, methods=["GET"]),
+        Route("/drive/v3/files", fake.list_files, methods=["GET"]),
+        Route("/drive/v3/files", fake.create_file, methods=["POST"]),
+        Route("/upload/drive/v3/files", fake.upload_file, methods=["POST"]),
+        Route("/upload/drive/v3/files", fake.upload_chunk, methods=["PUT"]),
+        Route("/_state", fake.state, methods=["GET"]),
+        Route("/_reset", fake.reset_state, methods=["POST"]),
+        Route("/_config", fake.update_config, methods=["POST"]),
+    ])
+
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    defaults = FakeGoogleConfig()
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=defaults.jitter_ms)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate,
+                        help="fraction of calls answered with 503 backendError")
+    parser.add_argument("--sheets-reads-per-minute", type=int, default=defaults.sheets_reads_per_minute)
+    parser.add_argument("--sheets-writes-per-minute", type=int, default=defaults.sheets_writes_per_minute)
+    parser.add_argument("--drive-queries-per-second", type=int, default=defaults.drive_queries_per_second)
+
+
+def config_from_arguments(args: argparse.Namespace) -> FakeGoogleConfig:
+    return FakeGoogleConfig(**{field: getattr(args, field) for field in asdict(FakeGoogleConfig())})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(config_from_arguments(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+End-to-end load benchmark for the feedback endpoints. Starts the fake Google server and the API
+(uvicorn, one worker) as subprocesses, drives /consultation, /warranty (with attachments) and
+/complaint at fixed concurrency levels, and reports throughput, p50/p95/p99 latency and the API
+process's peak RSS. Results are saved as JSON under benchmarks/results/ so runs can be compared
+across commits:
+
+    python -m benchmarks.load_test --concurrency 1,8,32 --requests 200
+    python -m benchmarks.load_test --compare benchmarks/results/<earlier run>.json
+
+Extra API settings can be passed with --app-env KEY=VALUE (e.g. GOOGLE_BACKEND=discovery; the
+discovery backend's media uploads need https, so attachments only work with the async backend).
+Client-side quota pacing is off unless re-enabled that way.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+from benchmarks.fake_google import add_config_arguments, config_from_arguments
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+ENDPOINTS = ("consultation", "warranty", "complaint")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def generate_private_key() -> str:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                             serialization.NoEncryption()).decode()
+
+
+def git_revision() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(git("status", "--porcelain", "--", "app"))}
+
+
+def read_rss_kb(pid: int) -> dict:
+    """Current and peak resident set size of `pid` from /proc (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            fields = dict(line.split(":", 1) for line in status if line.startswith(("VmRSS", "VmHWM")))
+    except OSError:
+        return {}
+    return {name: int(value.split()[0]) for name, value in fields.items()}
+
+
+def reset_peak_rss(pid: int):
+    # Writing 5 to clear_refs resets VmHWM to the current RSS (Linux >= 4.0)
+    try:
+        with open(f"/proc/{pid}/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        pass
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def wait_until_ready(url: str, process: subprocess.Popen, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"{process.args} exited with {process.returncode}")
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+class FeedbackPayloads:
+    """Unique submissions per request, so idempotency replays and attachment dedup don't skew the numbers."""
+
+    def __init__(self, attachments: int, attachment_size: int):
+        from app.constant import ServiceEnum, UrgencyLevelEnum
+
+        self.attachments = attachments
+        self.attachment_size = attachment_size
+        self.service = next(iter(ServiceEnum)).value
+        self.urgency = next(iter(UrgencyLevelEnum)).value
+
+    def _attachment(self, index: int) -> tuple:
+        body = b"%PDF-1.4\n" + os.urandom(max(0, self.attachment_size - 9))
+        return "files", (f"attachment_{index}.pdf", body, "application/pdf")
+
+    def build(self, endpoint: str) -> dict:
+        code = uuid.uuid4().hex[:12]
+        if endpoint == "consultation":
+            return {"json": {"full_name": "Benchmark", "conversation_code": code,
+                             "product_interest": self.service, "conversation_summary": "Load test"}}
+        if endpoint == "warranty":
+            return {"data": {"full_name": "Benchmark", "conversation_code": code, "product_type": "Load test",
+                             "start_date": "01/01/2026", "issue_description": "Load test"},
+                    "files": [self._attachment(i) for i in range(self.attachments)] or None}
+        return {"data": {"full_name": "Benchmark", "conversation_code": code, "complaint_issue": "Load test",
+                         "urgency_level": self.urgency}}
+
+
+async def run_scenario(client: httpx.AsyncClient, app_pid: int, endpoint: str, concurrency: int, requests: int,
+                       payloads: FeedbackPayloads) -> dict:
+    url = f"/api/feedbacks/{endpoint}"
+    latencies, statuses = [], {}
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            payload = payloads.build(endpoint)
+            started = time.perf_counter()
+            try:
+                status = (await client.post(url, **payload)).status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    reset_peak_rss(app_pid)
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    rss = read_rss_kb(app_pid)
+    ok = sum(count for status, count in statuses.items() if status.startswith("2"))
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": requests,
+        "ok": ok,
+        "statuses": statuses,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(ok / elapsed, 2),
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 1),
+            "p50": round(percentile(latencies, 50) * 1000, 1),
+            "p95": round(percentile(latencies, 95) * 1000, 1),
+            "p99": round(percentile(latencies, 99) * 1000, 1),
+            "max": round(max(latencies) * 1000, 1),
+        },
+        "peak_rss_mb": round(rss["VmHWM"] / 1024, 1) if "VmHWM" in rss else None,
+    }
+
+
+def fake_google_command(args, port: int) -> list[str]:
+    command = [sys.executable, "-m", "benchmarks.fake_google", "--port", str(port)]
+    for field, value in vars(config_from_arguments(args)).items():
+        command += [f"--{field.replace('_', '-')}", str(value)]
+    return command
+
+
+def app_environment(args, workdir: Path, fake_url: str) -> dict:
+    env = {
+        **os.environ,
+        "ENV_FILE": os.devnull,
+        "ALLOW_ORIGINS": '["*"]',
+        "GOOGLE_CLIENT_EMAIL": "benchmark@example.iam.gserviceaccount.com",
+        "GOOGLE_PRIVATE_KEY": generate_private_key(),
+        "GOOGLE_TOKEN_URI": f"{fake_url}/token",
+        "GOOGLE_SHEETS_API_URL": fake_url,
+        "GOOGLE_DRIVE_API_URL": fake_url,
+        "GOOGLE_BACKEND": "async",
+        # Measure the service rather than the client-side pacing; pair --app-env quotas with the fake's
+        # --sheets-writes-per-minute etc. to benchmark quota behaviour
+        "GOOGLE_SHEETS_READS_PER_MINUTE": "0",
+        "GOOGLE_SHEETS_WRITES_PER_MINUTE": "0",
+        "GOOGLE_DRIVE_QUERIES_PER_SECOND": "0",
+        "GOOGLE_TOKEN_CACHE_PATH": str(workdir / "google_token.json"),
+        "ATTACHMENT_INDEX_PATH": str(workdir / "attachments.db"),
+        "DRIVE_FOLDER_CACHE_PATH": str(workdir / "drive_folders.json"),
+        "FEEDBACK_QUEUE_DIR": str(workdir / "feedback_queue"),
+        "FEEDBACK_MIRROR_PATH": str(workdir / "feedbacks.db"),
+        "SHEETS_PARTITION_LOCK_PATH": str(workdir / "sheet_partitions.lock"),
+        "IDEMPOTENCY_STORE_PATH": str(workdir / "idempotency.db"),
+    }
+    for item in args.app_env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    return env
+
+
+def app_command(port: int) -> list[str]:
+    return [sys.executable, "-m", "uvicorn", "app.main:main_app", "--port", str(port), "--log-level", "warning"]
+
+
+def start_servers(args, workdir: Path, fake_port: int, app_port: int) -> tuple:
+    env = app_environment(args, workdir, f"http://127.0.0.1:{fake_port}")
+    log = open(workdir / "servers.log", "wb")
+    fake = subprocess.Popen(fake_google_command(args, fake_port), cwd=ROOT, stdout=log, stderr=subprocess.STDOUT)
+    app = subprocess.Popen(app_command(app_port), cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    return fake, app, env
+
+
+async def run(args) -> dict:
+    fake_port, app_port = free_port(), free_port()
+    with tempfile.TemporaryDirectory(prefix="reflectly-bench-") as workdir:
+        fake, app, env = start_servers(args, Path(workdir), fake_port, app_port)
+        try:
+            await wait_until_ready(f"http://127.0.0.1:{fake_port}/_state", fake)
+            await wait_until_ready(f"http://127.0.0.1:{app_port}/api/health/ready", app)
+            payloads = FeedbackPayloads(args.attachments, args.attachment_size)
+            limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+            scenarios = []
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{app_port}", limits=limits,
+                                         timeout=args.timeout) as client:
+                for endpoint in args.endpoints:
+                    # Warm up: sheet tab creation, folder cache, token minting, connection pools
+                    await run_scenario(client, app.pid, endpoint, 1, args.warmup, payloads)
+                    for concurrency in args.concurrency:
+                        result = await run_scenario(client, app.pid, endpoint, concurrency, args.requests, payloads)
+                        print_result(result)
+                        scenarios.append(result)
+                fake_state = (await client.get(f"http://127.0.0.1:{fake_port}/_state")).json()
+                app_stats = (await client.get("/api/health/google")).json()["data"]
+        except BaseException:
+            print(f"Server output:\n{(Path(workdir) / 'servers.log').read_text(errors='replace')[-4000:]}",
+                  file=sys.stderr)
+            raise
+        finally:
+            for process in (app, fake):
+                process.terminate()
+                try:
+                    process.wait(10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+    return {
+        "label": args.label,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backend": env["GOOGLE_BACKEND"],
+        "settings": {"requests": args.requests, "warmup": args.warmup, "attachments": args.attachments,
+                     "attachment_size": args.attachment_size, "app_env": args.app_env},
+        "fake_google": fake_state,
+        "app_stats": app_stats,
+        "scenarios": scenarios,
+    }
+
+
+def print_result(result: dict):
+    latency = result["latency_ms"]
+    errors = result["requests"] - result["ok"]
+    print(f"{result['endpoint']:<13} c={result['concurrency']:<4} {result['throughput_rps']:>8.1f} req/s  "
+          f"p50 {latency['p50']:>7.1f}  p95 {latency['p95']:>7.1f}  p99 {latency['p99']:>7.1f} ms  "
+          f"rss {result['peak_rss_mb'] or '-':>6} MB" + (f"  errors {errors} {result['statuses']}" if errors else ""))
+
+
+def compare(current: dict, baseline: dict):
+    previous = {(s["endpoint"], s["concurrency"]): s for s in baseline["scenarios"]}
+    print(f"\nCompared with {baseline['git'].get('commit')} ({baseline['timestamp']}):")
+    for scenario in current["scenarios"]:
+        before = previous.get((scenario["endpoint"], scenario["concurrency"]))
+        if not before:
+            continue
+        deltas = []
+        for label, now, then in (
+                ("rps", scenario["throughput_rps"], before["throughput_rps"]),
+                ("p50", scenario["latency_ms"]["p50"], before["latency_ms"]["p50"]),
+                ("p99", scenario["latency_ms"]["p99"], before["latency_ms"]["p99"]),
+                ("rss", scenario["peak_rss_mb"], before["peak_rss_mb"])):
+            if now is not None and then:
+                deltas.append(f"{label} {(now - then) / then * 100:+.1f}%")
+        print(f"  {scenario['endpoint']:<13} c={scenario['concurrency']:<4} " + "  ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", type=lambda v: v.split(","), default=list(ENDPOINTS))
+    parser.add_argument("--concurrency", type=lambda v: [int(c) for c in v.split(",")], default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint and concurrency level")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--attachments", type=int, default=2, help="files per /warranty request")
+    parser.add_argument("--attachment-size", type=int, default=256 * 1024)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE")
+    parser.add_argument("--label", default=None)
+    parser.add_argument("--output", type=Path, default=None, help="results file (default: benchmarks/results/)")
+    parser.add_argument("--compare", type=Path, default=None, help="earlier results file to diff against")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    unknown = set(args.endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+
+    results = asyncio.run(run(args))
+
+    output = args.output or RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{results['git']['commit'] or 'nogit'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2, ensure_ascii=False))
+    print(f"\nSaved {output}")
+    if args.compare:
+        compare(results, json.loads(args.compare.read_text()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Access-log formatter micro-benchmark: records/sec for the existing CustomFormatter (Apache-style
+atoms) against JsonAccessFormatter, plus the time a request spends in `logger.info()` when the
+handler writes synchronously versus through the DeferredQueueHandler/QueueListener pair.
+
+    python -m benchmarks.logging_formatters --records 50000
+"""
+import argparse
+import logging
+import os
+import queue
+import tempfile
+import time
+from logging.handlers import QueueListener
+
+os.environ.setdefault("ENV_FILE", os.devnull)
+os.environ.setdefault("ALLOW_ORIGINS", '["*"]')
+
+from app.core.logger import CustomFormatter, DeferredQueueHandler, JsonAccessFormatter  # noqa: E402
+
+# The atoms the production access log format uses
+CUSTOM_FORMAT = ('%(h)s %(l)s %(u)s %(t)s "%(m)s %(U)s %(q)s" %(s)s "%(f)s" "%(a)s" '
+                 '%(x-session-id)s %(x-google-id)s %(x-server-time)s %(p)s')
+
+
+def make_scope() -> dict:
+    return {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/api/feedbacks/warranty",
+        "root_path": "",
+        "query_string": b"",
+        "client": ("10.0.0.12", 53124),
+        "headers": [
+            (b"host", b"api.example.com"),
+            (b"user-agent", b"Reflectly/2.4.1 (iPhone; iOS 17.5; Scale/3.00)"),
+            (b"accept", b"application/json"),
+            (b"accept-encoding", b"gzip, deflate, br"),
+            (b"content-type", b"multipart/form-data; boundary=----reflectly"),
+            (b"content-length", b"482133"),
+            (b"x-session-id", b"6f1c2d6e-6a43-4a35-9b2e-3d1f0f0f2c11"),
+            (b"x-google-id", b"108437612093481724133"),
+            (b"idempotency-key", b"0d1f6f1a-2b6c-4a0e-9f4b-1f2b3c4d5e6f"),
+        ],
+        "response_headers": [
+            (b"content-type", b"application/json"),
+            (b"x-server-time", b"412.7"),
+        ],
+    }
+
+
+def make_record(scope: dict) -> logging.LogRecord:
+    record = logging.LogRecord("app.access", logging.INFO, __file__, 0, "%s %s %d",
+                               (scope["method"], scope["path"], 200), None)
+    record.scope = scope
+    record.status_code = 200
+    record.request_time_ms = 412.7
+    return record
+
+
+def bench_formatter(formatter: logging.Formatter, records: int) -> float:
+    record = make_record(make_scope())
+    started = time.perf_counter()
+    for _ in range(records):
+        formatter.format(record)
+    return records / (time.perf_counter() - started)
+
+
+def bench_logger(handler: logging.Handler, records: int) -> float:
+    """Mean microseconds spent inside logger.info() per request."""
+    logger = logging.getLogger(f"benchmark.{id(handler)}")
+    logger.handlers = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    scope = make_scope()
+    started = time.perf_counter()
+    for _ in range(records):
+        logger.info("%s %s %d", scope["method"], scope["path"], 200,
+                    extra={"scope": scope, "status_code": 200, "request_time_ms": 412.7})
+    return (time.perf_counter() - started) / records * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=50_000)
+    args = parser.parse_args()
+
+    formatters = {
+        "CustomFormatter": CustomFormatter(fmt=CUSTOM_FORMAT, use_colors=False),
+        "CustomFormatter (colours)": CustomFormatter(fmt=CUSTOM_FORMAT, use_colors=True),
+        "JsonAccessFormatter": JsonAccessFormatter(),
+    }
+    print(f"Formatting {args.records} records:")
+    for name, formatter in formatters.items():
+        print(f"  {name:<28} {bench_formatter(formatter, args.records):>10,.0f} records/s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print("\nTime in logger.info() per request, writing to a file:")
+        sync_handler = logging.FileHandler(os.path.join(tmp, "sync.log"))
+        sync_handler.setFormatter(formatters["CustomFormatter"])
+        print(f"  {'FileHandler + CustomFormatter':<44} {bench_logger(sync_handler, args.records):>7.1f} µs")
+        sync_handler.close()
+
+        json_handler = logging.FileHandler(os.path.join(tmp, "json.log"))
+        json_handler.setFormatter(JsonAccessFormatter())
+        print(f"  {'FileHandler + JsonAccessFormatter':<44} {bench_logger(json_handler, args.records):>7.1f} µs")
+
+        records = queue.SimpleQueue()
+        listener = QueueListener(records, json_handler)
+        listener.start()
+        per_call = bench_logger(DeferredQueueHandler(records), args.records)
+        drain_started = time.perf_counter()
+        listener.stop()
+        print(f"  {'DeferredQueueHandler -> JsonAccessFormatter':<44} {per_call:>7.1f} µs "
+              f"(listener drained the backlog in {time.perf_counter() - drain_started:.2f}s)")
+        json_handler.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Response encoding micro-benchmark: microseconds to build each kind of response the API sends,
+the way FastAPI did it before (jsonable_encoder + json.dumps via JSONResponse, and the default
+HTTPException handler) against FastJSONResponse with pre-encoded bodies.
+
+    python -m benchmarks.response_encoding --iterations 50000
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("ENV_FILE", os.devnull)
+os.environ.setdefault("ALLOW_ORIGINS", '["*"]')
+
+from fastapi import HTTPException  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.exception_handlers import http_exception_handler  # noqa: E402
+from starlette.responses import JSONResponse  # noqa: E402
+
+from app.constant import AppStatus  # noqa: E402
+from app.core import FastJSONResponse, app_exception_handler, encode_response_object, \
+    error_exception_handler  # noqa: E402
+from app.core.exceptions import make_response_object  # noqa: E402
+
+MESSAGE = "Gửi phản hồi tư vấn dịch vụ thành công"
+TICKET_META = {"ticket_id": "0d1f6f1a2b6c4a0e9f4b1f2b3c4d5e6f"}
+MIRROR_ITEM = {"id": 1204, "kind": "Complaint", "sheet": "Complaint_2026_10", "sheet_row": 1205,
+               "full_name": "Nguyễn Văn An", "phone_number": "0901234567", "email": "an.nguyen@example.com",
+               "conversation_code": "CONV-20261018-0042", "complaint_issue": "Ứng dụng bị treo khi tải ảnh lên",
+               "image_urls": "https://drive.example/drive/folders/1a2b3c", "urgency_level": "Cao",
+               "created_at": "09:41:27 18/10/2026"}
+
+
+def legacy_error(app_status: AppStatus, **kwargs) -> HTTPException:
+    return HTTPException(status_code=app_status.status_code,
+                         detail={"name": app_status.name, "message": app_status.message.format(**kwargs)})
+
+
+def cases() -> dict[str, tuple]:
+    page = make_response_object(data=[dict(MIRROR_ITEM, id=i) for i in range(50)],
+                                meta={"count": 50, "next_cursor": "WzE3NjA3NzUyODcuMCwgMTE1NV0="})
+    return {
+        "success message": (
+            lambda: JSONResponse(jsonable_encoder(make_response_object(data=MESSAGE))),
+            lambda: FastJSONResponse(encode_response_object(data=MESSAGE))),
+        "success + ticket_id": (
+            lambda: JSONResponse(jsonable_encoder(make_response_object(data=MESSAGE, meta=TICKET_META))),
+            lambda: FastJSONResponse(encode_response_object(data=MESSAGE, meta=TICKET_META))),
+        "GET /feedbacks (50 rows)": (
+            lambda: JSONResponse(jsonable_encoder(page)),
+            lambda: FastJSONResponse(page)),
+        "error 500 (static)": (
+            lambda: http_exception_handler(None, legacy_error(AppStatus.ERROR_500_INTERNAL_SERVER_ERROR)),
+            lambda: app_exception_handler(None, error_exception_handler(AppStatus.ERROR_500_INTERNAL_SERVER_ERROR))),
+        "error 503 not ready (static)": (
+            lambda: http_exception_handler(None, legacy_error(AppStatus.ERROR_503_NOT_READY)),
+            lambda: app_exception_handler(None, error_exception_handler(AppStatus.ERROR_503_NOT_READY))),
+        "error 504 (description)": (
+            lambda: http_exception_handler(None, legacy_error(AppStatus.ERROR_504_GATEWAY_TIMEOUT,
+                                                              description="sheets.spreadsheets.values.append")),
+            lambda: app_exception_handler(None, error_exception_handler(AppStatus.ERROR_504_GATEWAY_TIMEOUT,
+                                                                        description="sheets.spreadsheets.values.append"))),
+    }
+
+
+def body(build) -> bytes:
+    response = build()
+    if asyncio.iscoroutine(response):
+        response = asyncio.run(response)
+    return response.body
+
+
+def bench(build, iterations: int) -> float:
+    """Mean microseconds per response; exception handlers are coroutines and are awaited."""
+    async def run():
+        started = time.perf_counter()
+        for _ in range(iterations):
+            response = build()
+            if asyncio.iscoroutine(response):
+                await response
+        return (time.perf_counter() - started) / iterations * 1e6
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50_000)
+    args = parser.parse_args()
+
+    print(f"{'':<30} {'before':>9} {'after':>9}")
+    for name, (before, after) in cases().items():
+        assert json.loads(body(before)) == json.loads(body(after)), name
+        legacy, fast = bench(before, args.iterations), bench(after, args.iterations)
+        print(f"{name:<30} {legacy:>7.2f}µs {fast:>7.2f}µs  {legacy / fast:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+# Loaded automatically by `gunicorn app.main:main_app -k uvicorn.workers.UvicornWorker`.
+# With several workers, set PROMETHEUS_MULTIPROC_DIR (environment or .env) so /metrics aggregates all of them.
+import os
+import shutil
+
+
+def on_starting(server):
+    # Same precedence as app/core/metrics.py (environment first, then Settings/.env); exported so the
+    # workers inherit it and child_exit sees it
+    from app.core import settings
+    multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR") or settings.PROMETHEUS_MULTIPROC_DIR
+    if multiproc_dir:
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = multiproc_dir
+        # Stale files from a previous run would be reported as live workers
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+        os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
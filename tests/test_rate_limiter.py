@@ -0,0 +1,49 @@
+import asyncio
+import os
+
+os.environ.setdefault("ALLOW_ORIGINS", '["*"]')
+
+from app.clients.errors import GoogleApiTimeout, GoogleDeadlineExceeded  # noqa: E402
+from app.clients.rate_limiter import SHEETS, GoogleCallScheduler  # noqa: E402
+from app.constant import CircuitState  # noqa: E402
+from app.core import settings  # noqa: E402
+from app.core.deadline import deadline  # noqa: E402
+
+OPERATION = "sheets.values.append"
+
+
+async def _hang(timeout=None):
+    raise GoogleApiTimeout(OPERATION, timeout)
+
+
+async def _call_under_budget(scheduler: GoogleCallScheduler, budget: float):
+    with deadline(budget):
+        await scheduler.call(OPERATION, _hang)
+
+
+def test_request_path_timeouts_open_breaker():
+    async def run():
+        scheduler = GoogleCallScheduler()
+        for _ in range(settings.GOOGLE_BREAKER_FAILURE_THRESHOLD):
+            try:
+                await _call_under_budget(scheduler, settings.GOOGLE_REQUEST_BUDGET)
+            except GoogleDeadlineExceeded:
+                raise AssertionError("a full-length timeout was put down to the request budget")
+            except GoogleApiTimeout:
+                pass
+        return scheduler.breakers[SHEETS].state
+
+    assert asyncio.run(run()) is CircuitState.OPEN
+
+
+def test_budget_capped_timeouts_leave_breaker_closed():
+    async def run():
+        scheduler = GoogleCallScheduler()
+        for _ in range(settings.GOOGLE_BREAKER_FAILURE_THRESHOLD):
+            try:
+                await _call_under_budget(scheduler, settings.GOOGLE_CALL_TIMEOUT / 2)
+            except GoogleDeadlineExceeded:
+                pass
+        return scheduler.breakers[SHEETS].state
+
+    assert asyncio.run(run()) is CircuitState.CLOSED